@@ -2,8 +2,9 @@
 Configuración del admin de Django para modelos de common.
 """
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import Contacto, SuscripcionNewsletter
+from .models import ClaveIdempotencia, Contacto, EmailSaliente, EventoDominio, SuscripcionNewsletter
 
 
 @admin.register(Contacto)
@@ -35,3 +36,52 @@ class SuscripcionNewsletterAdmin(admin.ModelAdmin):
     search_fields = ['email']
     list_editable = ['activo']
     ordering = ['-created_at']
+
+
+@admin.register(EmailSaliente)
+class EmailSalienteAdmin(admin.ModelAdmin):
+    list_display = [
+        'destinatario_email', 'asunto', 'template_id', 'estado',
+        'intentos', 'proximo_intento', 'created_at', 'enviado_at',
+    ]
+    list_filter = ['estado', 'template_id']
+    search_fields = ['destinatario_email', 'asunto', 'message_id']
+    readonly_fields = [
+        'destinatario_email', 'destinatario_nombre', 'asunto', 'contenido_html',
+        'template_id', 'params', 'intentos', 'ultimo_error', 'message_id',
+        'created_at', 'updated_at', 'enviado_at',
+    ]
+    ordering = ['-created_at']
+
+
+@admin.register(ClaveIdempotencia)
+class ClaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ['ambito', 'clave', 'propietario', 'estado', 'status_code', 'created_at', 'expires_at']
+    list_filter = ['ambito', 'estado']
+    search_fields = ['clave', 'propietario']
+    readonly_fields = [
+        'ambito', 'propietario', 'clave', 'huella', 'estado',
+        'status_code', 'respuesta', 'created_at', 'expires_at',
+    ]
+    ordering = ['-created_at']
+
+
+@admin.register(EventoDominio)
+class EventoDominioAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'intentos', 'proximo_intento', 'created_at', 'procesado_at']
+    list_filter = ['tipo', 'estado']
+    actions = ['reintentar']
+    readonly_fields = [
+        'tipo', 'payload', 'completados', 'intentos', 'ultimo_error',
+        'created_at', 'updated_at', 'procesado_at',
+    ]
+    ordering = ['-created_at']
+
+    @admin.action(description='Reintentar eventos fallidos')
+    def reintentar(self, request, queryset):
+        actualizados = queryset.filter(estado=EventoDominio.EstadoChoices.FALLIDO).update(
+            estado=EventoDominio.EstadoChoices.PENDIENTE,
+            intentos=0,
+            proximo_intento=timezone.now(),
+        )
+        self.message_user(request, f'{actualizados} evento(s) reencolado(s).')
@@ -0,0 +1,24 @@
+"""
+Management command: despachar_eventos
+
+Entrega la bandeja de eventos de dominio (EventoDominio) a los suscriptores
+de settings.EVENTOS_SUSCRIPTORES (venta, uso de cupón y email de
+confirmación de un pedido pagado, etc.). Los errores se reintentan con
+backoff exponencial.
+
+Se pueden correr varios workers en paralelo (SKIP LOCKED).
+
+Uso:
+    python manage.py despachar_eventos                 # un lote y termina (cron)
+    python manage.py despachar_eventos --continuo      # worker de larga duración
+    python manage.py despachar_eventos --lote 200 --intervalo 1
+"""
+from utils.bandeja import ComandoBandeja
+
+
+class Command(ComandoBandeja):
+    help = 'Despacha los eventos de dominio pendientes a sus suscriptores.'
+    procesar = 'apps.common.servicios.eventos.procesar_pendientes'
+    nombre = 'Eventos'
+    etiquetas = [('procesado', 'procesados'), ('reintento', 'reintento'), ('fallido', 'fallidos')]
+    intervalo = 2
@@ -0,0 +1,21 @@
+"""
+Management command: enviar_emails
+
+Entrega la bandeja de salida de emails (EmailSaliente) vía Brevo con un
+solo cliente por lote. Los errores se reintentan con backoff exponencial.
+
+Se pueden correr varios workers en paralelo (SKIP LOCKED).
+
+Uso:
+    python manage.py enviar_emails                 # un lote y termina (cron)
+    python manage.py enviar_emails --continuo      # worker de larga duración
+    python manage.py enviar_emails --lote 100 --intervalo 2
+"""
+from utils.bandeja import ComandoBandeja
+
+
+class Command(ComandoBandeja):
+    help = 'Envía los emails encolados en la bandeja de salida.'
+    procesar = 'apps.common.servicios.email_service.procesar_pendientes'
+    nombre = 'Emails'
+    etiquetas = [('enviado', 'enviados'), ('reintento', 'reintento'), ('fallido', 'fallidos')]
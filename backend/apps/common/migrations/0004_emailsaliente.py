@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_contacto_estado_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario_email', models.EmailField(max_length=254, verbose_name='email del destinatario')),
+                ('destinatario_nombre', models.CharField(blank=True, default='', max_length=200, verbose_name='nombre del destinatario')),
+                ('asunto', models.CharField(blank=True, default='', max_length=300, verbose_name='asunto')),
+                ('contenido_html', models.TextField(blank=True, default='', verbose_name='contenido HTML')),
+                ('template_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='template de Brevo')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='parámetros del template')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='próximo intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='último error')),
+                ('message_id', models.CharField(blank=True, default='', max_length=255, verbose_name='message ID de Brevo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+                ('enviado_at', models.DateTimeField(blank=True, null=True, verbose_name='fecha de envío')),
+            ],
+            options={
+                'verbose_name': 'email saliente',
+                'verbose_name_plural': 'emails salientes',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='common_emai_estado_9b43c7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:25
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_emailsaliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ambito', models.CharField(max_length=50, verbose_name='ámbito')),
+                ('propietario', models.CharField(max_length=50, verbose_name='propietario')),
+                ('clave', models.CharField(max_length=255, verbose_name='clave')),
+                ('huella', models.CharField(max_length=64, verbose_name='huella del cuerpo')),
+                ('estado', models.CharField(choices=[('en_proceso', 'En proceso'), ('completada', 'Completada')], default='en_proceso', max_length=20, verbose_name='estado')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='código de estado')),
+                ('respuesta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='respuesta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expira')),
+            ],
+            options={
+                'verbose_name': 'clave de idempotencia',
+                'verbose_name_plural': 'claves de idempotencia',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('ambito', 'propietario', 'clave'), name='unique_clave_idempotencia')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:30
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0005_claveidempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoDominio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=100, verbose_name='tipo')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='datos')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesado', 'Procesado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='estado')),
+                ('completados', models.JSONField(blank=True, default=list, verbose_name='suscriptores completados')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='próximo intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+                ('procesado_at', models.DateTimeField(blank=True, null=True, verbose_name='fecha de procesamiento')),
+            ],
+            options={
+                'verbose_name': 'evento de dominio',
+                'verbose_name_plural': 'eventos de dominio',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='common_even_estado_a8625f_idx')],
+            },
+        ),
+    ]
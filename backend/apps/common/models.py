@@ -1,8 +1,12 @@
 """
-Modelos comunes: Contacto y SuscripcionNewsletter.
-Funcionalidades públicas sin autenticación.
+Modelos comunes: Contacto, SuscripcionNewsletter, EmailSaliente,
+ClaveIdempotencia y EventoDominio.
+Funcionalidades públicas sin autenticación, bandeja de salida de emails,
+respuestas guardadas por Idempotency-Key y bandeja de eventos de dominio.
 """
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -52,3 +56,140 @@ class SuscripcionNewsletter(models.Model):
 
     def __str__(self):
         return self.email
+
+
+class EmailSaliente(models.Model):
+    """
+    Bandeja de salida de emails transaccionales.
+    Las vistas y servicios solo registran el email (un INSERT, en la misma
+    transacción que el cambio que lo origina); el comando `enviar_emails`
+    los entrega vía Brevo fuera del request, con reintentos.
+    Un email lleva template_id + params (template de Brevo) o asunto +
+    contenido_html (HTML inline).
+    """
+
+    class EstadoChoices(models.TextChoices):
+        PENDIENTE = 'pendiente', _('Pendiente')
+        ENVIADO = 'enviado', _('Enviado')
+        FALLIDO = 'fallido', _('Fallido')
+
+    destinatario_email = models.EmailField(_('email del destinatario'))
+    destinatario_nombre = models.CharField(_('nombre del destinatario'), max_length=200, blank=True, default='')
+    asunto = models.CharField(_('asunto'), max_length=300, blank=True, default='')
+    contenido_html = models.TextField(_('contenido HTML'), blank=True, default='')
+    template_id = models.PositiveIntegerField(_('template de Brevo'), null=True, blank=True)
+    params = models.JSONField(_('parámetros del template'), default=dict, blank=True)
+
+    estado = models.CharField(
+        _('estado'),
+        max_length=20,
+        choices=EstadoChoices.choices,
+        default=EstadoChoices.PENDIENTE,
+    )
+    intentos = models.PositiveIntegerField(_('intentos'), default=0)
+    proximo_intento = models.DateTimeField(_('próximo intento'), default=timezone.now)
+    ultimo_error = models.TextField(_('último error'), blank=True, default='')
+    message_id = models.CharField(_('message ID de Brevo'), max_length=255, blank=True, default='')
+
+    created_at = models.DateTimeField(_('fecha de creación'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('fecha de actualización'), auto_now=True)
+    enviado_at = models.DateTimeField(_('fecha de envío'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('email saliente')
+        verbose_name_plural = _('emails salientes')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        descripcion = f'template {self.template_id}' if self.template_id else self.asunto
+        return f'{self.destinatario_email} — {descripcion} - {self.get_estado_display()}'
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Primera respuesta de un POST enviado con header Idempotency-Key
+    (ver utils/idempotencia.py). Los reintentos con la misma clave reciben
+    esta respuesta sin volver a ejecutar la vista. Se eliminan al vencer
+    expires_at (comando limpiar_pedidos_expirados).
+    """
+
+    class EstadoChoices(models.TextChoices):
+        EN_PROCESO = 'en_proceso', _('En proceso')
+        COMPLETADA = 'completada', _('Completada')
+
+    ambito = models.CharField(_('ámbito'), max_length=50)
+    propietario = models.CharField(_('propietario'), max_length=50)
+    clave = models.CharField(_('clave'), max_length=255)
+    huella = models.CharField(_('huella del cuerpo'), max_length=64)
+    estado = models.CharField(
+        _('estado'),
+        max_length=20,
+        choices=EstadoChoices.choices,
+        default=EstadoChoices.EN_PROCESO,
+    )
+    status_code = models.PositiveSmallIntegerField(_('código de estado'), null=True, blank=True)
+    respuesta = models.JSONField(_('respuesta'), null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(_('fecha de creación'), auto_now_add=True)
+    expires_at = models.DateTimeField(_('expira'), db_index=True)
+
+    class Meta:
+        verbose_name = _('clave de idempotencia')
+        verbose_name_plural = _('claves de idempotencia')
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ambito', 'propietario', 'clave'],
+                name='unique_clave_idempotencia',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ambito} — {self.clave} ({self.get_estado_display()})'
+
+
+class EventoDominio(models.Model):
+    """
+    Bandeja de salida (outbox) de eventos de dominio.
+    El servicio que cambia el estado registra el evento en la misma
+    transacción (ver apps/common/servicios/eventos.py); el comando
+    `despachar_eventos` lo entrega a los suscriptores configurados en
+    settings.EVENTOS_SUSCRIPTORES, con reintentos. `completados` guarda los
+    suscriptores que ya lo procesaron: un reintento solo corre los que fallaron.
+    """
+
+    class EstadoChoices(models.TextChoices):
+        PENDIENTE = 'pendiente', _('Pendiente')
+        PROCESADO = 'procesado', _('Procesado')
+        FALLIDO = 'fallido', _('Fallido')
+
+    tipo = models.CharField(_('tipo'), max_length=100)
+    payload = models.JSONField(_('datos'), default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    estado = models.CharField(
+        _('estado'),
+        max_length=20,
+        choices=EstadoChoices.choices,
+        default=EstadoChoices.PENDIENTE,
+    )
+    completados = models.JSONField(_('suscriptores completados'), default=list, blank=True)
+    intentos = models.PositiveIntegerField(_('intentos'), default=0)
+    proximo_intento = models.DateTimeField(_('próximo intento'), default=timezone.now)
+    ultimo_error = models.TextField(_('último error'), blank=True, default='')
+
+    created_at = models.DateTimeField(_('fecha de creación'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('fecha de actualización'), auto_now=True)
+    procesado_at = models.DateTimeField(_('fecha de procesamiento'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('evento de dominio')
+        verbose_name_plural = _('eventos de dominio')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} #{self.id} - {self.get_estado_display()}'
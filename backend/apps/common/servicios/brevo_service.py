@@ -1,49 +1,69 @@
 """
 Servicio reutilizable de Brevo (ex-Sendinblue).
 Responsabilidades:
-  - Enviar emails transaccionales (registro, confirmación de pedido, contacto).
+  - Componer emails transaccionales (registro, confirmación de pedido,
+    contacto, reset de contraseña) y encolarlos en la bandeja de salida
+    (ver email_service.py); el comando `enviar_emails` los entrega.
+  - Clientes de envío: ClienteBrevo (API real) y ClienteBrevoMemoria
+    (desarrollo local y tests, sin salir a la red).
   - Gestionar contactos en listas de Brevo (newsletter).
 
 Usa templates de Brevo (por ID) para registro, pedido y newsletter.
-Usa HTML inline solo para notificaciones internas (contacto → admin).
+Usa HTML inline para notificaciones internas (contacto → admin) y reset.
 
 Usado por: common (contacto, newsletter), usuarios (registro), pagos (pedido).
 """
 import logging
+import threading
+import uuid
 
 from django.conf import settings
 
+from utils.instrumentacion import medir_externo
+
+from .email_service import encolar_email
+
 logger = logging.getLogger('clarte')
 
+_lock = threading.Lock()
+_api_client = None
+_api_key = None
 
-def _get_api_instance():
-    """Retorna la instancia de la API transaccional de Brevo."""
+
+def _get_api_client():
+    """
+    Retorna el ApiClient compartido (se recrea si cambia la API key).
+    Un solo ApiClient por proceso reutiliza su pool de conexiones HTTPS.
+    """
+    global _api_client, _api_key
     import sib_api_v3_sdk
 
     api_key = settings.BREVO_API_KEY
     if not api_key:
         raise ValueError('BREVO_API_KEY no configurado.')
 
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = api_key
-    return sib_api_v3_sdk.TransactionalEmailsApi(
-        sib_api_v3_sdk.ApiClient(configuration)
-    )
+    if _api_client is None or _api_key != api_key:
+        with _lock:
+            if _api_client is None or _api_key != api_key:
+                configuration = sib_api_v3_sdk.Configuration()
+                configuration.api_key['api-key'] = api_key
+                _api_client = sib_api_v3_sdk.ApiClient(configuration)
+                _api_key = api_key
+    return _api_client
+
+
+def _get_api_instance():
+    """Retorna la instancia de la API transaccional de Brevo."""
+    import sib_api_v3_sdk
+
+    return sib_api_v3_sdk.TransactionalEmailsApi(_get_api_client())
 
 
 def _get_contacts_api():
     """Retorna la instancia de la API de contactos de Brevo."""
     import sib_api_v3_sdk
 
-    api_key = settings.BREVO_API_KEY
-    if not api_key:
-        raise ValueError('BREVO_API_KEY no configurado.')
-
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = api_key
-    return sib_api_v3_sdk.ContactsApi(
-        sib_api_v3_sdk.ApiClient(configuration)
-    )
+    return sib_api_v3_sdk.ContactsApi(_get_api_client())
 
 
 def _sender():
@@ -55,39 +75,115 @@ def _sender():
 
 
 # ──────────────────────────────────────────────
-# Envío genérico con HTML inline (para emails internos)
+# Clientes de envío (usados por el worker de la bandeja de salida)
 # ──────────────────────────────────────────────
 
-def enviar_email_transaccional(destinatario_email, destinatario_nombre, asunto, contenido_html):
-    """
-    Envía un email transaccional con HTML inline vía Brevo.
-    Usado para notificaciones internas (contacto → admin).
-    """
-    import sib_api_v3_sdk
+def _destinatario(email):
+    return {'email': email.destinatario_email, 'name': email.destinatario_nombre or email.destinatario_email}
 
-    try:
-        api = _get_api_instance()
-        email = sib_api_v3_sdk.SendSmtpEmail(
-            to=[{'email': destinatario_email, 'name': destinatario_nombre}],
+
+class ClienteBrevo:
+    """Envía emails de la bandeja por la API transaccional de Brevo."""
+
+    def __init__(self):
+        self.api = _get_api_instance()
+
+    def enviar(self, email):
+        """Envía un EmailSaliente. Retorna el message_id de Brevo."""
+        import sib_api_v3_sdk
+
+        if email.template_id:
+            smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                to=[_destinatario(email)],
+                sender=_sender(),
+                template_id=email.template_id,
+                params=email.params or {},
+            )
+        else:
+            smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                to=[_destinatario(email)],
+                sender=_sender(),
+                subject=email.asunto,
+                html_content=email.contenido_html,
+            )
+        with medir_externo('brevo'):
+            response = self.api.send_transac_email(smtp_email)
+        logger.info(
+            'Email %s enviado a %s (message_id: %s)',
+            email.id, email.destinatario_email, response.message_id,
+        )
+        return response.message_id
+
+    def enviar_lote(self, template_id, emails):
+        """
+        Envía varios emails del mismo template en una sola llamada
+        (message_versions: un destinatario y sus params por versión).
+        Retorna los message_id en el mismo orden.
+        """
+        import sib_api_v3_sdk
+
+        smtp_email = sib_api_v3_sdk.SendSmtpEmail(
             sender=_sender(),
-            subject=asunto,
-            html_content=contenido_html,
+            template_id=template_id,
+            message_versions=[
+                {'to': [_destinatario(email)], 'params': email.params or {}}
+                for email in emails
+            ],
         )
-        response = api.send_transac_email(email)
-        logger.info('Email enviado a %s: %s (message_id: %s)', destinatario_email, asunto, response.message_id)
-        return response
-    except Exception as e:
-        logger.error('Error al enviar email a %s: %s', destinatario_email, e)
-        raise
+        with medir_externo('brevo'):
+            response = self.api.send_transac_email(smtp_email)
+        logger.info('Lote de %s emails del template %s enviado.', len(emails), template_id)
+        return response.message_ids or []
+
+
+class ClienteBrevoMemoria:
+    """
+    Cliente falso para desarrollo local y tests: no sale a la red y guarda
+    los emails "enviados" en `ClienteBrevoMemoria.enviados`.
+    Se activa con EMAIL_CLIENTE='apps.common.servicios.brevo_service.ClienteBrevoMemoria'.
+    """
+    enviados = []
+
+    def enviar(self, email):
+        message_id = f'<memoria-{uuid.uuid4().hex}>'
+        self.enviados.append({
+            'message_id': message_id,
+            'to': email.destinatario_email,
+            'template_id': email.template_id,
+            'params': email.params,
+            'asunto': email.asunto,
+            'contenido_html': email.contenido_html,
+        })
+        return message_id
+
+    def enviar_lote(self, template_id, emails):
+        return [self.enviar(email) for email in emails]
 
 
 # ──────────────────────────────────────────────
-# Envío con template de Brevo (por ID + params)
+# Encolado genérico con HTML inline (para emails internos)
+# ──────────────────────────────────────────────
+
+def enviar_email_transaccional(destinatario_email, destinatario_nombre, asunto, contenido_html):
+    """
+    Encola un email transaccional con HTML inline.
+    Usado para notificaciones internas (contacto → admin) y reset de contraseña.
+    """
+    return encolar_email(
+        destinatario_email=destinatario_email,
+        destinatario_nombre=destinatario_nombre,
+        asunto=asunto,
+        contenido_html=contenido_html,
+    )
+
+
+# ──────────────────────────────────────────────
+# Encolado con template de Brevo (por ID + params)
 # ──────────────────────────────────────────────
 
 def _enviar_con_template(template_id, destinatario_email, destinatario_nombre, params=None):
     """
-    Envía un email usando un template de Brevo.
+    Encola un email que usa un template de Brevo.
 
     Args:
         template_id: ID del template en Brevo.
@@ -95,28 +191,15 @@ def _enviar_con_template(template_id, destinatario_email, destinatario_nombre, p
         destinatario_nombre: Nombre del destinatario.
         params: Dict de variables dinámicas para el template.
     """
-    import sib_api_v3_sdk
-
     if not template_id:
         raise ValueError('Template ID de Brevo no configurado.')
 
-    try:
-        api = _get_api_instance()
-        email = sib_api_v3_sdk.SendSmtpEmail(
-            to=[{'email': destinatario_email, 'name': destinatario_nombre}],
-            sender=_sender(),
-            template_id=template_id,
-            params=params or {},
-        )
-        response = api.send_transac_email(email)
-        logger.info(
-            'Email template %s enviado a %s (message_id: %s)',
-            template_id, destinatario_email, response.message_id,
-        )
-        return response
-    except Exception as e:
-        logger.error('Error al enviar email template %s a %s: %s', template_id, destinatario_email, e)
-        raise
+    return encolar_email(
+        destinatario_email=destinatario_email,
+        destinatario_nombre=destinatario_nombre,
+        template_id=template_id,
+        params=params or {},
+    )
 
 
 # ──────────────────────────────────────────────
@@ -125,7 +208,7 @@ def _enviar_con_template(template_id, destinatario_email, destinatario_nombre, p
 
 def enviar_notificacion_contacto(contacto):
     """
-    Envía email de notificación al admin cuando se recibe un formulario de contacto.
+    Encola el email de notificación al admin cuando se recibe un formulario de contacto.
 
     Args:
         contacto: Instancia del modelo Contacto.
@@ -161,7 +244,7 @@ def enviar_notificacion_contacto(contacto):
 
 def enviar_confirmacion_contacto(contacto):
     """
-    Envía email de confirmación al usuario que envió el formulario de contacto,
+    Encola el email de confirmación al usuario que envió el formulario de contacto,
     informándole que su mensaje fue recibido y será atendido a la brevedad.
 
     Args:
@@ -211,7 +294,7 @@ def enviar_confirmacion_contacto(contacto):
 
 def enviar_email_registro(usuario):
     """
-    Envía email de bienvenida al usuario tras registrarse.
+    Encola el email de bienvenida al usuario tras registrarse.
     Usa template de Brevo con params: nombre, email, frontend_url.
 
     Args:
@@ -235,7 +318,7 @@ def enviar_email_registro(usuario):
 
 def enviar_confirmacion_pedido(pedido, pago):
     """
-    Envía email de confirmación de compra al usuario.
+    Encola el email de confirmación de compra al usuario.
     Usa template de Brevo con params: nombre, numero_pedido, items, total, dirección.
 
     Args:
@@ -277,7 +360,7 @@ def enviar_confirmacion_pedido(pedido, pago):
 
 def enviar_reset_password(usuario, reset_url):
     """
-    Envía email con enlace para restablecer la contraseña.
+    Encola el email con el enlace para restablecer la contraseña.
     Usa HTML inline porque no hay template específico en Brevo para esto.
 
     Args:
@@ -336,7 +419,8 @@ def agregar_contacto_newsletter(email, nombre=''):
             update_enabled=True,
             attributes={'FIRSTNAME': nombre} if nombre else None,
         )
-        api.create_contact(contact)
+        with medir_externo('brevo'):
+            api.create_contact(contact)
         logger.info('Contacto agregado a Brevo newsletter: %s (%s)', email, nombre)
     except Exception as e:
         error_msg = str(e)
@@ -0,0 +1,139 @@
+"""
+Bandeja de salida de emails transaccionales (EmailSaliente).
+
+Las vistas y servicios solo encolan (un INSERT, sin llamadas salientes);
+el comando `enviar_emails` entrega la bandeja:
+  - Reclama un lote con SELECT ... FOR UPDATE SKIP LOCKED (varios workers
+    pueden correr en paralelo sin pisarse).
+  - Usa un solo cliente de envío por lote (settings.EMAIL_CLIENTE) y agrupa
+    los emails del mismo template de Brevo en una sola llamada.
+  - Los errores se reintentan con backoff exponencial hasta EMAIL_MAX_INTENTOS
+    (reclamo y reintentos: utils/bandeja.py).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.common.models import EmailSaliente
+from utils.bandeja import Bandeja
+from utils.metricas import EMAIL_ENVIO
+
+logger = logging.getLogger('clarte')
+
+bandeja = Bandeja(
+    EmailSaliente, 'EMAIL',
+    pendiente=EmailSaliente.EstadoChoices.PENDIENTE,
+    fallido=EmailSaliente.EstadoChoices.FALLIDO,
+    describir=lambda email: f'Email {email.id} a {email.destinatario_email}',
+)
+
+
+def encolar_email(destinatario_email, destinatario_nombre='', asunto='', contenido_html='',
+                  template_id=None, params=None):
+    """
+    Registra un email en la bandeja de salida. Si se llama dentro de una
+    transacción, el email solo se enviará si esta se confirma.
+    """
+    email = EmailSaliente.objects.create(
+        destinatario_email=destinatario_email,
+        destinatario_nombre=destinatario_nombre,
+        asunto=asunto,
+        contenido_html=contenido_html,
+        template_id=template_id or None,
+        params=params or {},
+    )
+    logger.info(
+        'Email encolado para %s (%s).',
+        destinatario_email, f'template {template_id}' if template_id else asunto,
+    )
+    return email
+
+
+def obtener_cliente():
+    """Instancia el cliente de envío configurado en settings.EMAIL_CLIENTE."""
+    return import_string(settings.EMAIL_CLIENTE)()
+
+
+def _marcar_enviado(email, message_id):
+    ahora = timezone.now()
+    EmailSaliente.objects.filter(id=email.id).update(
+        estado=EmailSaliente.EstadoChoices.ENVIADO,
+        message_id=message_id or '',
+        ultimo_error='',
+        enviado_at=ahora,
+        updated_at=ahora,
+    )
+    return 'enviado'
+
+
+def enviar_lote(emails, cliente):
+    """
+    Envía los emails reclamados con un mismo cliente.
+    Los emails con el mismo template se envían en una sola llamada
+    (un error en esa llamada reprograma a todo el grupo).
+    Retorna la lista de resultados ('enviado', 'reintento' o 'fallido').
+    """
+    por_template = {}
+    individuales = []
+    for email in emails:
+        if email.template_id:
+            por_template.setdefault(email.template_id, []).append(email)
+        else:
+            individuales.append(email)
+
+    resultados = []
+    for template_id, grupo in por_template.items():
+        if len(grupo) == 1:
+            individuales.extend(grupo)
+            continue
+        inicio = time.perf_counter()
+        try:
+            message_ids = cliente.enviar_lote(template_id, grupo)
+        except Exception as e:
+            EMAIL_ENVIO.observar(time.perf_counter() - inicio, tipo='lote', resultado='error')
+            resultados.extend(bandeja.marcar_error(email, e) for email in grupo)
+            continue
+        EMAIL_ENVIO.observar(time.perf_counter() - inicio, tipo='lote', resultado='ok')
+        message_ids = list(message_ids or [])
+        message_ids += [''] * (len(grupo) - len(message_ids))
+        resultados.extend(
+            _marcar_enviado(email, message_id) for email, message_id in zip(grupo, message_ids)
+        )
+
+    for email in individuales:
+        inicio = time.perf_counter()
+        try:
+            message_id = cliente.enviar(email)
+        except Exception as e:
+            EMAIL_ENVIO.observar(time.perf_counter() - inicio, tipo='individual', resultado='error')
+            resultados.append(bandeja.marcar_error(email, e))
+            continue
+        EMAIL_ENVIO.observar(time.perf_counter() - inicio, tipo='individual', resultado='ok')
+        resultados.append(_marcar_enviado(email, message_id))
+    return resultados
+
+
+def procesar_pendientes(lote=50):
+    """
+    Reclama y envía un lote de la bandeja.
+    Retorna un dict con el conteo por resultado.
+    """
+    conteo = {'enviado': 0, 'reintento': 0, 'fallido': 0}
+    emails = bandeja.reclamar(lote)
+    if not emails:
+        return conteo
+
+    try:
+        cliente = obtener_cliente()
+    except Exception as e:
+        # Ej.: BREVO_API_KEY sin configurar → se reintenta con backoff
+        resultados = [bandeja.marcar_error(email, e) for email in emails]
+    else:
+        resultados = enviar_lote(emails, cliente)
+
+    for resultado in resultados:
+        conteo[resultado] += 1
+    return conteo
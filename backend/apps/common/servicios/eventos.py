@@ -0,0 +1,144 @@
+"""
+Bandeja de salida (outbox) de eventos de dominio (EventoDominio).
+
+Los servicios que cambian un estado publican el evento con publicar_evento
+en la misma transacción que el cambio (un INSERT): si la transacción se
+revierte, el evento tampoco existe. El comando `despachar_eventos` entrega
+la bandeja a los suscriptores de settings.EVENTOS_SUSCRIPTORES:
+  - Reclama un lote con SELECT ... FOR UPDATE SKIP LOCKED (varios workers
+    pueden correr en paralelo sin pisarse).
+  - Cada suscriptor corre en su propia transacción junto con el registro
+    de que lo completó: un error en uno no revierte ni repite a los demás.
+  - Los errores se reintentan con backoff exponencial hasta
+    EVENTOS_MAX_INTENTOS (reclamo y reintentos: utils/bandeja.py).
+
+Lo que un suscriptor escribe en la BD se confirma junto con su marca de
+completado, pero sus efectos externos (llamadas HTTP) no se revierten si
+la transacción falla: la entrega es "al menos una vez" y los suscriptores
+deben ser idempotentes.
+
+Un suscriptor es una función que recibe el EventoDominio y lee sus datos de
+evento.payload.
+
+despachar_al_confirmar adelanta la entrega de un evento al propio proceso
+que lo publicó, en cuanto su transacción se confirma (sin esperar al
+worker); si falla, el evento sigue en la bandeja con su backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.common.models import EventoDominio
+from utils.bandeja import Bandeja
+from utils.metricas import EVENTOS
+
+logger = logging.getLogger('clarte')
+
+bandeja = Bandeja(
+    EventoDominio, 'EVENTOS',
+    pendiente=EventoDominio.EstadoChoices.PENDIENTE,
+    fallido=EventoDominio.EstadoChoices.FALLIDO,
+    describir=lambda evento: f'Evento {evento.tipo} #{evento.id}',
+)
+
+# Tipos de evento
+PAGO_APROBADO = 'pago.aprobado'
+PEDIDO_PAGADO = 'pedido.pagado'
+PEDIDO_ESTADO_CAMBIADO = 'pedido.estado_cambiado'
+
+
+def publicar_evento(tipo, **payload):
+    """
+    Registra un evento en la bandeja. Debe llamarse dentro de la transacción
+    del cambio de estado que lo origina.
+    """
+    evento = EventoDominio.objects.create(tipo=tipo, payload=payload)
+    logger.info('Evento %s #%s publicado: %s', tipo, evento.id, payload)
+    return evento
+
+
+def obtener_suscriptores(tipo):
+    """Rutas de los suscriptores configurados para un tipo de evento."""
+    return settings.EVENTOS_SUSCRIPTORES.get(tipo, [])
+
+
+def procesar_evento(evento):
+    """
+    Entrega un evento reclamado a los suscriptores que aún no lo completaron.
+    Retorna 'procesado', 'reintento' o 'fallido'.
+    """
+    completados = list(evento.completados)
+    errores = []
+    for ruta in obtener_suscriptores(evento.tipo):
+        if ruta in completados:
+            continue
+        try:
+            with transaction.atomic():
+                import_string(ruta)(evento)
+                EventoDominio.objects.filter(id=evento.id).update(completados=[*completados, ruta])
+        except Exception as e:
+            logger.warning(
+                'Suscriptor %s falló para el evento %s #%s: %s',
+                ruta, evento.tipo, evento.id, e, exc_info=True,
+            )
+            errores.append(f'{ruta}: {e}')
+            continue
+        completados.append(ruta)
+    evento.completados = completados
+
+    if errores:
+        resultado = bandeja.marcar_error(evento, '\n'.join(errores))
+    else:
+        ahora = timezone.now()
+        EventoDominio.objects.filter(id=evento.id).update(
+            estado=EventoDominio.EstadoChoices.PROCESADO,
+            ultimo_error='',
+            procesado_at=ahora,
+            updated_at=ahora,
+        )
+        resultado = 'procesado'
+    EVENTOS.inc(tipo=evento.tipo, resultado=resultado)
+    return resultado
+
+
+def procesar_pendientes(lote=50):
+    """
+    Reclama y despacha un lote de la bandeja.
+    Retorna un dict con el conteo por resultado.
+    """
+    conteo = {'procesado': 0, 'reintento': 0, 'fallido': 0}
+    for evento in bandeja.reclamar(lote):
+        conteo[procesar_evento(evento)] += 1
+    return conteo
+
+
+def despachar_al_confirmar(evento):
+    """
+    Despacha `evento` en este proceso al confirmarse la transacción actual.
+    Si otro worker ya lo reclamó, no hace nada; si un suscriptor falla (o el
+    proceso muere antes), lo reintenta despachar_eventos.
+    """
+    def despachar():
+        for reclamado in bandeja.reclamar(1, ids=[evento.id]):
+            procesar_evento(reclamado)
+
+    transaction.on_commit(despachar, robust=True)
+
+
+def limpiar_eventos_procesados():
+    """
+    Elimina los eventos procesados hace más de EVENTOS_RETENCION_DIAS
+    (los fallidos se conservan para revisarlos). Retorna cuántos.
+    """
+    limite = timezone.now() - timedelta(days=settings.EVENTOS_RETENCION_DIAS)
+    eliminados, _ = EventoDominio.objects.filter(
+        estado=EventoDominio.EstadoChoices.PROCESADO,
+        procesado_at__lt=limite,
+    ).delete()
+    if eliminados:
+        logger.info('Eventos de dominio procesados eliminados: %d', eliminados)
+    return eliminados
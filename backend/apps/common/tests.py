@@ -1,3 +1,355 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para contacto y newsletter,
+bandejas de salida de emails y de eventos de dominio e instrumentación
+por request.
+"""
+import json
 
-# Create your tests here.
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.common.models import Contacto, EmailSaliente, EventoDominio
+from apps.common.servicios import eventos
+from apps.common.servicios.brevo_service import ClienteBrevoMemoria
+from apps.common.servicios.email_service import encolar_email, procesar_pendientes
+from utils.instrumentacion import Registro, medir_externo, server_timing
+from utils.testing import PresupuestoAPITestCase
+
+MEMORIA = 'apps.common.servicios.brevo_service.ClienteBrevoMemoria'
+
+
+class ContactoPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_enviar_contacto(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/contacto/', 2, status=201,
+            data={'nombre': 'Ana', 'email': 'ana@ocaso.test', 'asunto': 'Envío', 'mensaje': 'Hola'},
+        )
+
+    def test_suscribir_newsletter(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/contacto/newsletter/', 6, status=201,
+            data={'email': 'nuevo@ocaso.test'},
+        )
+
+    def test_admin_contactos(self):
+        self.autenticar(self.datos['admin'])
+        self.assertPresupuesto('get', '/api/v1/contacto/admin/', 3)
+
+    def test_admin_actualizar_estado(self):
+        self.autenticar(self.datos['admin'])
+        contacto = Contacto.objects.first()
+        self.assertPresupuesto(
+            'patch', f'/api/v1/contacto/admin/{contacto.id}/estado/', 3,
+            data={'estado': 'leido'},
+        )
+
+    def test_admin_suscripciones(self):
+        self.autenticar(self.datos['admin'])
+        self.assertPresupuesto('get', '/api/v1/contacto/admin/newsletter/', 3)
+
+
+class ClienteCaido:
+    """Cliente de envío que siempre falla (Brevo no disponible)."""
+
+    def enviar(self, email):
+        raise ConnectionError('Brevo no responde')
+
+    def enviar_lote(self, template_id, emails):
+        raise ConnectionError('Brevo no responde')
+
+
+@override_settings(EMAIL_CLIENTE=MEMORIA, BREVO_SENDER_EMAIL='admin@ocaso.test')
+class BandejaEmailTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        ClienteBrevoMemoria.enviados.clear()
+
+    def test_contacto_encola_y_worker_envia(self):
+        # El request solo inserta en la bandeja: sin llamadas a Brevo
+        self.assertPresupuesto(
+            'post', '/api/v1/contacto/', 3, status=201,
+            data={'nombre': 'Ana', 'email': 'ana@ocaso.test', 'asunto': 'Envío', 'mensaje': 'Hola'},
+        )
+        self.assertEqual(EmailSaliente.objects.filter(estado='pendiente').count(), 2)
+        self.assertEqual(ClienteBrevoMemoria.enviados, [])
+
+        self.assertEqual(procesar_pendientes(), {'enviado': 2, 'reintento': 0, 'fallido': 0})
+        self.assertEqual(
+            sorted(e['to'] for e in ClienteBrevoMemoria.enviados),
+            ['admin@ocaso.test', 'ana@ocaso.test'],
+        )
+        for email in EmailSaliente.objects.all():
+            self.assertEqual(email.estado, 'enviado')
+            self.assertTrue(email.message_id)
+            self.assertIsNotNone(email.enviado_at)
+
+    def test_template_en_lote(self):
+        for i in range(3):
+            encolar_email(f'c{i}@ocaso.test', template_id=7, params={'n': i})
+        self.assertEqual(procesar_pendientes(), {'enviado': 3, 'reintento': 0, 'fallido': 0})
+        self.assertEqual([e['params'] for e in ClienteBrevoMemoria.enviados], [{'n': 0}, {'n': 1}, {'n': 2}])
+
+    @override_settings(EMAIL_CLIENTE='apps.common.tests.ClienteCaido', EMAIL_MAX_INTENTOS=2)
+    def test_reintento_con_backoff_y_descarte(self):
+        email = encolar_email('ana@ocaso.test', asunto='Hola', contenido_html='<p>Hola</p>')
+
+        self.assertEqual(procesar_pendientes(), {'enviado': 0, 'reintento': 1, 'fallido': 0})
+        email.refresh_from_db()
+        self.assertEqual((email.estado, email.intentos), ('pendiente', 1))
+        self.assertGreater(email.proximo_intento, timezone.now())
+        self.assertIn('Brevo no responde', email.ultimo_error)
+
+        # Aún no vence el backoff: nada que reclamar
+        self.assertEqual(procesar_pendientes(), {'enviado': 0, 'reintento': 0, 'fallido': 0})
+
+        EmailSaliente.objects.filter(id=email.id).update(proximo_intento=timezone.now())
+        self.assertEqual(procesar_pendientes(), {'enviado': 0, 'reintento': 0, 'fallido': 1})
+        email.refresh_from_db()
+        self.assertEqual(email.estado, 'fallido')
+
+    @override_settings(EMAIL_BLOQUEO_SEGUNDOS=120)
+    def test_reclamo_oculta_la_fila_el_bloqueo_configurado(self):
+        from datetime import timedelta
+
+        from apps.common.servicios.email_service import bandeja
+
+        email = encolar_email('ana@ocaso.test', asunto='Hola', contenido_html='<p>Hola</p>')
+        antes = timezone.now()
+        self.assertEqual([e.id for e in bandeja.reclamar(10)], [email.id])
+        # Reclamada: otro worker no la ve hasta que vence el bloqueo
+        self.assertEqual(bandeja.reclamar(10), [])
+        email.refresh_from_db()
+        self.assertEqual(email.intentos, 1)
+        self.assertLess(email.proximo_intento - antes, timedelta(seconds=121))
+        self.assertGreaterEqual(email.proximo_intento - antes, timedelta(seconds=120))
+
+
+SUSCRIPTOR_OK = 'apps.common.tests.suscriptor_ok'
+SUSCRIPTOR_CAIDO = 'apps.common.tests.suscriptor_caido'
+llamadas = []
+
+
+def suscriptor_ok(evento):
+    llamadas.append(evento.payload['n'])
+
+
+def suscriptor_caido(evento):
+    raise ConnectionError('servicio no disponible')
+
+
+class BandejaEventosTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        llamadas.clear()
+
+    @override_settings(EVENTOS_SUSCRIPTORES={'prueba': [SUSCRIPTOR_OK]})
+    def test_despacha_en_orden(self):
+        for n in range(3):
+            eventos.publicar_evento('prueba', n=n)
+        eventos.publicar_evento('sin_suscriptores')
+
+        self.assertEqual(eventos.procesar_pendientes(), {'procesado': 4, 'reintento': 0, 'fallido': 0})
+        self.assertEqual(llamadas, [0, 1, 2])
+        self.assertFalse(EventoDominio.objects.exclude(estado='procesado').exists())
+        self.assertEqual(eventos.procesar_pendientes(), {'procesado': 0, 'reintento': 0, 'fallido': 0})
+
+    @override_settings(
+        EVENTOS_SUSCRIPTORES={'prueba': [SUSCRIPTOR_OK, SUSCRIPTOR_CAIDO]},
+        EVENTOS_MAX_INTENTOS=2,
+    )
+    def test_reintento_no_repite_suscriptores_completados(self):
+        evento = eventos.publicar_evento('prueba', n=1)
+
+        self.assertEqual(eventos.procesar_pendientes(), {'procesado': 0, 'reintento': 1, 'fallido': 0})
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.intentos, evento.completados), ('pendiente', 1, [SUSCRIPTOR_OK]))
+        self.assertGreater(evento.proximo_intento, timezone.now())
+        self.assertIn('servicio no disponible', evento.ultimo_error)
+
+        EventoDominio.objects.filter(id=evento.id).update(proximo_intento=timezone.now())
+        self.assertEqual(eventos.procesar_pendientes(), {'procesado': 0, 'reintento': 0, 'fallido': 1})
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, 'fallido')
+        self.assertEqual(llamadas, [1])
+
+    def test_evento_de_transaccion_revertida_no_existe(self):
+        from django.db import transaction
+
+        with self.assertRaises(ValueError), transaction.atomic():
+            eventos.publicar_evento('prueba', n=1)
+            raise ValueError('rollback')
+        self.assertFalse(EventoDominio.objects.exists())
+
+
+class InstrumentacionTest(PresupuestoAPITestCase):
+
+    def test_server_timing_para_staff(self):
+        self.autenticar(self.datos['admin'])
+        producto = self.datos['productos'][0]
+        response = self.client.get(f'/api/v1/productos/{producto.slug}/')
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="BD \(\d+ consultas\)"')
+        self.assertIn('ser;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_no_parchea_drf(self):
+        from rest_framework.serializers import BaseSerializer
+
+        from utils.instrumentacion import JSONRendererInstrumentado
+
+        self.client.get('/api/v1/productos/categorias/')
+        self.assertFalse(hasattr(BaseSerializer.data.fget, 'instrumentado'))
+        self.assertIsInstance(self.client.get('/api/v1/productos/categorias/').accepted_renderer, JSONRendererInstrumentado)
+
+    def test_render_suma_tiempo_de_serializacion(self):
+        from utils import instrumentacion
+
+        registro = Registro()
+        token = instrumentacion._registro.set(registro)
+        try:
+            contenido = instrumentacion.JSONRendererInstrumentado().render({'a': [1, 2]})
+        finally:
+            instrumentacion._registro.reset(token)
+        self.assertEqual(json.loads(contenido), {'a': [1, 2]})
+        self.assertGreater(registro.serializer_ms, 0)
+
+    def test_sin_server_timing_para_clientes(self):
+        producto = self.datos['productos'][0]
+        self.assertNotIn('Server-Timing', self.client.get(f'/api/v1/productos/{producto.slug}/'))
+        self.autenticar(self.datos['clientes'][0])
+        self.assertNotIn('Server-Timing', self.client.get(f'/api/v1/productos/{producto.slug}/'))
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1.0)
+    def test_log_estructurado_agrupa_por_ruta(self):
+        producto = self.datos['productos'][0]
+        with self.assertLogs('clarte', level='INFO') as logs:
+            self.client.get(f'/api/v1/productos/{producto.slug}/')
+        lineas = [
+            json.loads(r.getMessage().removeprefix('request '))
+            for r in logs.records if r.getMessage().startswith('request ')
+        ]
+        self.assertEqual(len(lineas), 1)
+        linea = lineas[0]
+        self.assertEqual(linea['ruta'], '/api/v1/productos/<slug:slug>/')
+        self.assertEqual(linea['status'], 200)
+        self.assertGreater(linea['db_consultas'], 0)
+
+    @override_settings(INSTRUMENTACION_MUESTREO=0.0, INSTRUMENTACION_LENTO_MS=60000)
+    def test_sin_muestreo_no_registra(self):
+        with self.assertNoLogs('clarte', level='INFO'):
+            self.client.get('/api/v1/productos/categorias/')
+
+    def test_medir_externo(self):
+        # Fuera de una request no registra nada
+        with medir_externo('mp'):
+            pass
+
+        registro = Registro()
+        registro.agregar_externo('mp', 120.0)
+        registro.agregar_externo('mp', 30.0)
+        self.assertIn('mp;dur=150.0;desc="Mercado Pago (2 llamadas)"', server_timing(registro, 200.0))
+
+
+def valor_metrica(texto, muestra):
+    """Valor de una muestra del formato de Prometheus (0 si no aparece)."""
+    for linea in texto.splitlines():
+        if linea.startswith(muestra + ' '):
+            return float(linea.rsplit(' ', 1)[1])
+    return 0
+
+
+@override_settings(EMAIL_CLIENTE=MEMORIA, BREVO_SENDER_EMAIL='admin@ocaso.test')
+class MetricasTest(PresupuestoAPITestCase):
+
+    def metricas(self):
+        self.autenticar(self.datos['admin'])
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_solo_admin(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.autenticar(self.datos['clientes'][0])
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='scrape-secreto')
+    def test_token_de_scraper(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE clarte_http_request_duration_seconds histogram', response.content.decode())
+        self.assertEqual(
+            self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro-token').status_code, 401,
+        )
+        # El token no abre otros endpoints
+        self.assertEqual(
+            self.client.get('/api/v1/pedidos/', HTTP_AUTHORIZATION='Bearer scrape-secreto').status_code, 401,
+        )
+
+    @override_settings(METRICAS_TOKEN='')
+    def test_token_sin_configurar(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secreto').status_code, 401)
+
+    def test_latencia_y_status_por_url(self):
+        muestra_count = 'clarte_http_request_duration_seconds_count{url_name="categoria-list",method="GET"}'
+        muestra_404 = 'clarte_http_responses_total{url_name="producto-detail",status="404"}'
+        antes = self.metricas()
+
+        self.client.credentials()
+        self.client.get('/api/v1/productos/categorias/')
+        self.client.get('/api/v1/productos/no-existe/')
+
+        despues = self.metricas()
+        self.assertEqual(valor_metrica(despues, muestra_count), valor_metrica(antes, muestra_count) + 1)
+        self.assertEqual(valor_metrica(despues, muestra_404), valor_metrica(antes, muestra_404) + 1)
+        self.assertIn(
+            'clarte_http_request_duration_seconds_bucket{url_name="categoria-list",method="GET",le="+Inf"}',
+            despues,
+        )
+
+    def test_suma_los_snapshots_de_otros_procesos(self):
+        from django.core.cache import cache
+        from utils import metricas
+
+        muestra = 'clarte_webhooks_total{resultado="ignored"}'
+        antes = valor_metrica(self.metricas(), muestra)
+
+        # Otro worker publicó su snapshot en la caché compartida
+        cache.set('metricas:proceso:otro-host:123', {('clarte_webhooks_total', ('ignored',)): 4})
+        metricas._registrar_proceso('otro-host:123')
+
+        self.assertEqual(valor_metrica(self.metricas(), muestra), antes + 4)
+
+    def test_poda_los_procesos_vencidos(self):
+        import time
+
+        from django.core.cache import cache
+        from utils import metricas
+
+        muestra = 'clarte_webhooks_total{resultado="ignored"}'
+        antes = valor_metrica(self.metricas(), muestra)
+
+        # Un proceso que dejó de volcar hace más de METRICAS_TTL no se suma
+        cache.set('metricas:proceso:muerto:1', {('clarte_webhooks_total', ('ignored',)): 7})
+        procesos = cache.get(metricas.CLAVE_PROCESOS)
+        procesos['muerto:1'] = time.time() - settings.METRICAS_TTL - 1
+        cache.set(metricas.CLAVE_PROCESOS, procesos, timeout=None)
+        self.assertEqual(valor_metrica(self.metricas(), muestra), antes)
+
+        # El siguiente registro lo poda; el slot de este proceso sigue
+        metricas._registrar_proceso('nuevo:2')
+        self.assertEqual(
+            set(cache.get(metricas.CLAVE_PROCESOS)), {metricas._slot, 'nuevo:2'},
+        )
+
+    def test_latencia_de_envio_de_emails(self):
+        muestra = 'clarte_email_envio_seconds_count{tipo="individual",resultado="ok"}'
+        antes = valor_metrica(self.metricas(), muestra)
+        encolar_email('ana@ocaso.test', asunto='Hola', contenido_html='<p>Hola</p>')
+        procesar_pendientes()
+        self.assertEqual(valor_metrica(self.metricas(), muestra), antes + 1)
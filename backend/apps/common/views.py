@@ -27,7 +27,8 @@ class ContactoCreateView(generics.CreateAPIView):
     """
     POST /api/v1/contacto/
     Envía un mensaje de contacto (público).
-    Dispara notificación al admin vía Brevo.
+    Encola la notificación al admin y la confirmación al usuario
+    (las entrega el comando `enviar_emails`).
     """
     serializer_class = ContactoSerializer
     permission_classes = [permissions.AllowAny]
@@ -37,7 +38,7 @@ class ContactoCreateView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         contacto = serializer.save()
 
-        # Enviar notificación al admin + confirmación al usuario
+        # Encolar notificación al admin + confirmación al usuario
         try:
             from .servicios.brevo_service import (
                 enviar_notificacion_contacto,
@@ -46,7 +47,7 @@ class ContactoCreateView(generics.CreateAPIView):
             enviar_notificacion_contacto(contacto)
             enviar_confirmacion_contacto(contacto)
         except Exception as e:
-            logger.error('Error al enviar emails de contacto: %s', e)
+            logger.error('Error al encolar emails de contacto: %s', e)
 
         return Response(
             {
@@ -0,0 +1,36 @@
+"""
+Servicios del sistema de cupones.
+registrar_uso_cupon es suscriptor del evento pedido.pagado
+(settings.EVENTOS_SUSCRIPTORES).
+"""
+import logging
+
+from django.db.models import F
+
+from apps.pedidos.models import Pedido
+
+from .models import Cupon, CuponUso
+
+logger = logging.getLogger('clarte')
+
+
+def registrar_uso_cupon(evento):
+    """
+    Registra el uso del cupón de un pedido pagado (si tiene) e incrementa
+    sus usos de forma atómica. Idempotente: un pedido registra un solo uso.
+    """
+    pedido = Pedido.objects.get(id=evento.payload['pedido_id'])
+    if not pedido.cupon_id or CuponUso.objects.filter(pedido=pedido).exists():
+        return
+
+    Cupon.objects.filter(id=pedido.cupon_id).update(usos_actuales=F('usos_actuales') + 1)
+    CuponUso.objects.create(
+        cupon_id=pedido.cupon_id,
+        pedido=pedido,
+        usuario=pedido.usuario,
+        descuento_aplicado=pedido.descuento_monto,
+    )
+    logger.info(
+        'Cupón id=%s consumido para pedido %s, descuento=%s',
+        pedido.cupon_id, pedido.numero_pedido, pedido.descuento_monto,
+    )
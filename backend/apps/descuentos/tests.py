@@ -0,0 +1,25 @@
+"""
+Presupuestos de consultas y tiempo para los endpoints de cupones.
+"""
+from utils.testing import PresupuestoAPITestCase
+
+
+class CuponesPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_validar_cupon(self):
+        self.autenticar(self.datos['clientes'][0])
+        self.assertPresupuesto(
+            'post', '/api/v1/descuentos/validar/', 2,
+            data={'codigo': 'BIENVENIDA', 'subtotal': '1500.00'},
+        )
+
+    def test_admin_cupones(self):
+        self.autenticar(self.datos['admin'])
+        self.assertPresupuesto('get', '/api/v1/descuentos/admin/', 3)
+
+    def test_admin_crear_cupon(self):
+        self.autenticar(self.datos['admin'])
+        self.assertPresupuesto(
+            'post', '/api/v1/descuentos/admin/', 3, status=201,
+            data={'codigo': 'VERANO', 'nombre': 'Verano', 'valor_descuento': '15'},
+        )
@@ -0,0 +1,42 @@
+"""
+Búsqueda de texto completo de productos (PostgreSQL).
+La columna Producto.search_vector la mantiene un trigger de la base de datos
+(migración 0005) con la configuración `es_unaccent`: español + unaccent,
+pesos A para nombre/SKU y B para descripción. Las consultas usan el índice GIN.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
+
+CONFIG_BUSQUEDA = 'es_unaccent'
+
+
+def construir_query(texto):
+    """
+    Convierte el texto del usuario en un SearchQuery.
+    Los términos se combinan con AND y el último admite prefijo (`lamp` → `lampara`)
+    para que la búsqueda mientras se escribe funcione.
+    Retorna None si el texto no contiene términos buscables.
+    """
+    terminos = re.findall(r'\w+', texto or '')
+    if not terminos:
+        return None
+    raw = ' & '.join(terminos[:-1] + [f'{terminos[-1]}:*'])
+    return SearchQuery(raw, config=CONFIG_BUSQUEDA, search_type='raw')
+
+
+def buscar_productos(queryset, texto):
+    """
+    Filtra el queryset por texto completo (o SKU exacto) y lo ordena por relevancia.
+    Si el texto no tiene términos buscables retorna el queryset sin cambios.
+    """
+    query = construir_query(texto)
+    if query is None:
+        return queryset
+    return (
+        queryset
+        .filter(Q(search_vector=query) | Q(sku=texto.strip()))
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', '-created_at')
+    )
@@ -0,0 +1,76 @@
+"""
+Caché versionada del catálogo público.
+Las respuestas serializadas se guardan bajo una clave que incluye la ruta,
+el query string normalizado y la versión actual del catálogo.
+Invalidar = incrementar la versión: las claves anteriores dejan de leerse
+y expiran solas por TTL, sin necesidad de borrarlas una a una.
+"""
+import hashlib
+import logging
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+logger = logging.getLogger('clarte')
+
+CLAVE_VERSION = 'catalogo:version'
+
+
+def obtener_version_catalogo():
+    """
+    Retorna la versión actual del catálogo.
+    Si la clave no existe (caché vacía o desalojada) se inicializa con un
+    timestamp en ms, para no reutilizar nunca una versión anterior.
+    """
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar_catalogo():
+    """Incrementa la versión del catálogo; todas las respuestas cacheadas quedan obsoletas."""
+    try:
+        version = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave no existe: inicializar con una versión nueva
+        version = int(time.time() * 1000)
+        cache.set(CLAVE_VERSION, version, timeout=None)
+    logger.info('Caché de catálogo invalidada (versión %s).', version)
+    return version
+
+
+def clave_catalogo(prefijo, request, version=None):
+    """
+    Construye la clave de caché para una petición del catálogo.
+    El query string se ordena para que ?a=1&b=2 y ?b=2&a=1 compartan clave.
+    """
+    if version is None:
+        version = obtener_version_catalogo()
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = f'{request.build_absolute_uri(request.path)}?{query}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'catalogo:{version}:{prefijo}:{digest}'
+
+
+class CatalogoCacheMixin:
+    """
+    Sirve las respuestas GET de la vista desde la caché del catálogo.
+    Solo se cachean respuestas 200; la vista define `cache_prefijo`.
+    """
+    cache_prefijo = None
+
+    def get(self, request, *args, **kwargs):
+        clave = clave_catalogo(self.cache_prefijo or self.__class__.__name__, request)
+        data = cache.get(clave)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(clave, response.data, timeout=settings.CATALOGO_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,56 @@
+"""
+Precio y stock de varios productos en una sola consulta (hidratación del carrito).
+
+El carrito guarda una copia de cada producto; antes de mostrarse o pagarse
+revalida precio_final, stock y activo de todas sus líneas con un único
+SELECT ... WHERE id IN (...) OR sku IN (...) (ambos indexados), en lugar de
+un GET de detalle por línea.
+
+`disponible` es el stock que aún puede comprarse: el físico menos las
+reservas vigentes de pedidos pendientes (ver ProductoQuerySet.con_disponible);
+en_stock se deriva de él, igual que la validación del checkout.
+
+La respuesta es columnar: una lista por campo, alineadas por posición.
+"""
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from .models import Producto
+
+COLUMNAS = ('id', 'sku', 'precio_final', 'stock', 'disponible', 'en_stock', 'activo')
+
+
+def consultar_disponibilidad(ids=(), skus=()):
+    """
+    Retorna {columna: [valores...], 'no_encontrados': {'ids': [...], 'skus': [...]}}
+    para los productos pedidos por id o SKU, ordenados por id.
+    Incluye productos inactivos (activo=False) para que el carrito los marque.
+    """
+    filas = (
+        Producto.objects
+        .filter(Q(id__in=ids) | Q(sku__in=skus))
+        .con_disponible()
+        .annotate(precio_final_db=Coalesce('precio_oferta', 'precio'))
+        .order_by('id')
+        .values_list('id', 'sku', 'precio_final_db', 'stock', 'stock_disponible', 'activo')
+    )
+
+    columnas = {columna: [] for columna in COLUMNAS}
+    for pk, sku, precio_final, stock, disponible, activo in filas:
+        disponible = max(disponible, 0)
+        columnas['id'].append(pk)
+        columnas['sku'].append(sku)
+        # Como string, igual que los DecimalField de los serializers
+        columnas['precio_final'].append(str(precio_final))
+        columnas['stock'].append(stock)
+        columnas['disponible'].append(disponible)
+        columnas['en_stock'].append(disponible > 0)
+        columnas['activo'].append(activo)
+
+    encontrados_ids = set(columnas['id'])
+    encontrados_skus = set(columnas['sku'])
+    columnas['no_encontrados'] = {
+        'ids': [pk for pk in ids if pk not in encontrados_ids],
+        'skus': [sku for sku in skus if sku not in encontrados_skus],
+    }
+    return columnas
@@ -0,0 +1,114 @@
+"""
+Facetas del catálogo para la barra de filtros de la tienda.
+
+Todas las cuentas salen de una sola consulta agregada: GROUP BY categoría
+con Count(..., filter=Q(...)) → COUNT(*) FILTER (WHERE ...) por faceta.
+
+Las facetas son disyuntivas: cada una ignora su propio filtro para que la
+UI pueda mostrar las alternativas (ej. con ?categoria=2 se siguen contando
+las demás categorías), pero respeta todos los demás.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+from django_filters.utils import translate_validation
+
+from .filters import ProductoFilter
+from .models import Producto
+
+# Parámetros de ProductoFilter que corresponden a una faceta
+PARAMS_FACETAS = ('categoria', 'categoria_slug', 'precio_min', 'precio_max', 'en_stock')
+
+
+def rangos_precio():
+    """Lista de (min, max) a partir de CATALOGO_RANGOS_PRECIO; None = sin límite."""
+    cortes = sorted(settings.CATALOGO_RANGOS_PRECIO)
+    limites = [None, *cortes, None]
+    return list(zip(limites, limites[1:]))
+
+
+def _q_rango(minimo, maximo):
+    q = Q()
+    if minimo is not None:
+        q &= Q(precio__gte=minimo)
+    if maximo is not None:
+        q &= Q(precio__lt=maximo)
+    return q
+
+
+def calcular_facetas(params):
+    """
+    Calcula las facetas para los query params del listado de productos.
+    Lanza ValidationError (como DjangoFilterBackend) si no son válidos.
+    """
+    filtro = ProductoFilter(data=params, queryset=Producto.objects.activos())
+    if not filtro.is_valid():
+        raise translate_validation(filtro.errors)
+    datos = filtro.form.cleaned_data
+
+    # Filtros que no son faceta (búsqueda, destacado): se aplican al queryset
+    resto = params.copy()
+    for param in PARAMS_FACETAS:
+        resto.pop(param, None)
+    base = ProductoFilter(data=resto, queryset=Producto.objects.activos()).qs
+
+    q_precio = Q()
+    if datos.get('precio_min') is not None:
+        q_precio &= Q(precio__gte=datos['precio_min'])
+    if datos.get('precio_max') is not None:
+        q_precio &= Q(precio__lte=datos['precio_max'])
+
+    q_stock = Q()
+    if datos.get('en_stock') is not None:
+        q_stock = Q(stock__gt=0) if datos['en_stock'] else Q(stock=0)
+
+    rangos = rangos_precio()
+    agregados = {
+        'total': Count('id', filter=q_precio & q_stock),
+        'en_stock': Count('id', filter=q_precio & Q(stock__gt=0)),
+        'agotado': Count('id', filter=q_precio & Q(stock=0)),
+    }
+    for i, (minimo, maximo) in enumerate(rangos):
+        agregados[f'rango_{i}'] = Count('id', filter=q_stock & _q_rango(minimo, maximo))
+
+    filas = list(
+        base
+        .order_by()  # sin el orden por relevancia de la búsqueda (no debe entrar al GROUP BY)
+        .values('categoria_id', 'categoria__nombre', 'categoria__slug', 'categoria__orden')
+        .annotate(**agregados)
+        .order_by('categoria__orden', 'categoria__nombre')
+    )
+
+    # El filtro de categoría se aplica aquí, sobre las filas ya agrupadas
+    categoria = datos.get('categoria')
+    categoria_slug = datos.get('categoria_slug')
+    seleccionadas = [
+        fila for fila in filas
+        if (categoria is None or fila['categoria_id'] == categoria.pk)
+        and (not categoria_slug or fila['categoria__slug'] == categoria_slug)
+    ]
+
+    def sumar(campo):
+        return sum(fila[campo] for fila in seleccionadas)
+
+    facetas = {
+        'total': sumar('total'),
+        'categorias': [
+            {
+                'id': fila['categoria_id'],
+                'nombre': fila['categoria__nombre'],
+                'slug': fila['categoria__slug'],
+                'count': fila['total'],
+            }
+            for fila in filas
+            if fila['total']
+        ],
+        'precios': [
+            {'min': minimo, 'max': maximo, 'count': sumar(f'rango_{i}')}
+            for i, (minimo, maximo) in enumerate(rangos)
+        ],
+        'disponibilidad': {
+            'en_stock': sumar('en_stock'),
+            'agotado': sumar('agotado'),
+        },
+    }
+    return facetas
@@ -4,6 +4,7 @@ Permite filtrar productos por categoría, rango de precio, destacado y búsqueda
 """
 from django_filters import rest_framework as filters
 
+from .busqueda import buscar_productos
 from .models import Producto
 
 
@@ -16,6 +17,9 @@ class ProductoFilter(filters.FilterSet):
       ?precio_min=500&precio_max=5000
       ?destacado=true
       ?en_stock=true
+      ?q=lampara de mesa   (texto completo, ordenado por relevancia)
+      ?search=...          (alias de q, compatibilidad con el frontend;
+                            si llegan ambos, gana q)
     """
     categoria_slug = filters.CharFilter(
         field_name='categoria__slug',
@@ -32,6 +36,12 @@ class ProductoFilter(filters.FilterSet):
     en_stock = filters.BooleanFilter(
         method='filtrar_en_stock',
     )
+    q = filters.CharFilter(
+        method='buscar',
+    )
+    search = filters.CharFilter(
+        method='buscar',
+    )
 
     class Meta:
         model = Producto
@@ -41,3 +51,8 @@ class ProductoFilter(filters.FilterSet):
         if value:
             return queryset.filter(stock__gt=0)
         return queryset.filter(stock=0)
+
+    def buscar(self, queryset, name, value):
+        if name == 'search' and self.data.get('q'):
+            return queryset  # ya buscó ?q: no filtrar (ni ordenar) dos veces
+        return buscar_productos(queryset, value)
@@ -0,0 +1,277 @@
+"""
+Importación masiva de productos (CSV / JSONL) con upsert por SKU.
+
+El archivo se lee fila a fila y se procesa en lotes; por cada lote:
+  - Una consulta trae los productos existentes de esos SKUs.
+  - Cada fila se valida con ProductoImportSerializer (reglas del admin,
+    sin consultas por fila).
+  - Los slugs nuevos se resuelven con una o dos consultas para todo el lote
+    (en lugar del bucle exists() de Producto.save).
+  - Se escribe con bulk_create y un UPDATE ... FROM (VALUES ...) en una
+    transacción.
+
+Las filas inválidas no detienen la importación: se reportan con su número
+de fila y sus errores.
+"""
+import csv
+import io
+import json
+import logging
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from .cache import invalidar_catalogo
+from .models import Categoria, Producto
+from .serializers import ProductoImportSerializer
+
+logger = logging.getLogger('clarte')
+
+TAMANO_LOTE = 1000
+
+# Campos JSON que en CSV llegan como texto
+CAMPOS_JSON = ('imagenes', 'dimensiones', 'detalles_tecnicos', 'materiales')
+# Campos opcionales cuyo valor vacío en CSV significa "sin valor"
+CAMPOS_NULOS = ('precio_oferta',)
+
+
+def detectar_formato(nombre_archivo):
+    """Formato a partir de la extensión del archivo ('csv' por defecto)."""
+    return 'jsonl' if nombre_archivo.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera (numero_fila, dict) leyendo el archivo en streaming.
+    `archivo` es un archivo binario abierto. Las filas JSONL que no son un
+    objeto JSON válido se generan como (numero_fila, None).
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'jsonl':
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+        return
+
+    # Fila 1 = encabezados
+    for numero, fila in enumerate(csv.DictReader(texto), start=2):
+        yield numero, _normalizar_csv(fila)
+
+
+def _normalizar_csv(fila):
+    """Convierte los valores de texto de CSV a lo que espera el serializer."""
+    normalizada = {}
+    for campo, valor in fila.items():
+        if campo is None:
+            continue  # columnas sobrantes sin encabezado
+        valor = (valor or '').strip()
+        if valor == '':
+            if campo in CAMPOS_NULOS:
+                normalizada[campo] = None
+            continue  # vacío = usar el default / conservar el valor actual
+        if campo in CAMPOS_JSON:
+            try:
+                valor = json.loads(valor)
+            except ValueError:
+                pass  # el serializer reporta el tipo inválido
+        normalizada[campo] = valor
+    return normalizada
+
+
+def _mapa_categorias():
+    """{id: Categoria, slug: Categoria} con todas las categorías (una consulta)."""
+    mapa = {}
+    for categoria in Categoria.objects.all():
+        mapa[str(categoria.id)] = categoria
+        mapa[categoria.slug] = categoria
+    return mapa
+
+
+def _asignar_slugs(pendientes):
+    """
+    Asigna slugs únicos a los productos de un lote.
+    `pendientes` es una lista de (producto, base). Las colisiones (con la BD
+    o dentro del lote) se resuelven con sufijos -1, -2... como Producto.save,
+    pero con a lo sumo dos consultas para todo el lote.
+    """
+    if not pendientes:
+        return
+    bases = Counter(base for _, base in pendientes)
+
+    # {slug: pk} de los slugs ya usados en la BD que pueden colisionar
+    ocupados = dict(Producto.objects.filter(slug__in=bases).order_by().values_list('slug', 'pk'))
+    colisiones = set(ocupados) | {base for base, veces in bases.items() if veces > 1}
+    if colisiones:
+        ocupados.update(
+            Producto.objects
+            .filter(reduce(or_, (Q(slug__startswith=f'{base}-') for base in colisiones)))
+            .order_by()
+            .values_list('slug', 'pk')
+        )
+
+    usados = set()
+    for producto, base in pendientes:
+        slug = base
+        contador = 1
+        # El slug actual del propio producto no cuenta como colisión
+        while slug in usados or ocupados.get(slug, producto.pk) != producto.pk:
+            slug = f'{base}-{contador}'
+            contador += 1
+        producto.slug = slug
+        usados.add(slug)
+
+
+def _actualizar_en_lote(productos, nombres_campos):
+    """
+    Escribe los campos indicados de varios productos en una sola sentencia
+      UPDATE ... FROM (VALUES (id, ...), ...) WHERE p.id = v.id
+    (mismo patrón que decrementar_stock_lote). QuerySet.bulk_update genera un
+    CASE WHEN por campo y fila cuyo armado en Python domina el tiempo de la
+    importación.
+    """
+    campos = [Producto._meta.get_field(nombre) for nombre in sorted(nombres_campos)]
+    tabla = Producto._meta.db_table
+    columnas = ', '.join(campo.column for campo in campos)
+    asignaciones = ', '.join(f'{campo.column} = v.{campo.column}' for campo in campos)
+    fila_sql = '(' + ', '.join(
+        ['%s::bigint'] + [f'%s::{campo.db_type(connection)}' for campo in campos]
+    ) + ')'
+    # Límite de parámetros por sentencia del protocolo de PostgreSQL (65535)
+    por_sentencia = 65535 // (len(campos) + 1)
+
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(productos), por_sentencia):
+            parte = productos[inicio:inicio + por_sentencia]
+            params = [
+                valor
+                for producto in parte
+                for valor in (
+                    producto.pk,
+                    *(campo.get_db_prep_save(getattr(producto, campo.attname), connection) for campo in campos),
+                )
+            ]
+            cursor.execute(
+                f'UPDATE {tabla} AS p SET {asignaciones} '
+                f'FROM (VALUES {", ".join([fila_sql] * len(parte))}) AS v(id, {columnas}) '
+                f'WHERE p.id = v.id',
+                params,
+            )
+
+
+def _procesar_lote(filas, validador, vistos):
+    """
+    Valida y escribe un lote de filas.
+    `validador` es un ProductoImportSerializer reutilizado para todas las
+    filas (construir sus campos por fila costaría más que la validación).
+    Retorna (creados, actualizados, errores).
+    """
+    errores = []
+    validas = []
+    for numero, fila in filas:
+        if fila is None:
+            errores.append({'fila': numero, 'sku': None, 'errores': {'fila': ['JSON inválido.']}})
+            continue
+        sku = str(fila.get('sku', '')).strip()
+        if sku and sku in vistos:
+            errores.append({
+                'fila': numero, 'sku': sku,
+                'errores': {'sku': [f'SKU repetido en el archivo (fila {vistos[sku]}).']},
+            })
+            continue
+        if sku:
+            vistos[sku] = numero
+        validas.append((numero, sku, fila))
+
+    existentes = Producto.objects.order_by().in_bulk([sku for _, sku, _ in validas if sku], field_name='sku')
+
+    nuevos = []
+    actualizados = []
+    campos_actualizados = set()
+    pendientes_slug = []
+    for numero, sku, fila in validas:
+        instancia = existentes.get(sku)
+        validador.instance = instancia
+        validador.partial = instancia is not None
+        try:
+            datos = validador.run_validation(fila)
+        except serializers.ValidationError as e:
+            errores.append({'fila': numero, 'sku': sku or None, 'errores': e.detail})
+            continue
+
+        slug = datos.pop('slug', '')
+        producto = instancia or Producto()
+        for campo, valor in datos.items():
+            setattr(producto, campo, valor)
+
+        if slug and slug != producto.slug:
+            pendientes_slug.append((producto, slug))
+        elif not producto.slug:
+            pendientes_slug.append((producto, slugify(producto.nombre)))
+
+        if instancia is None:
+            nuevos.append(producto)
+        else:
+            actualizados.append(producto)
+            campos_actualizados.update(datos)
+            if slug:
+                campos_actualizados.add('slug')
+
+    with transaction.atomic():
+        _asignar_slugs(pendientes_slug)
+        if nuevos:
+            Producto.objects.bulk_create(nuevos)
+        if actualizados:
+            ahora = timezone.now()
+            for producto in actualizados:
+                producto.updated_at = ahora
+            _actualizar_en_lote(actualizados, {*campos_actualizados, 'updated_at'})
+
+    return len(nuevos), len(actualizados), sorted(errores, key=lambda e: e['fila'])
+
+
+def importar_productos(filas, tamano_lote=TAMANO_LOTE):
+    """
+    Importa productos desde un iterable de (numero_fila, dict) (ver leer_filas).
+    Crea los SKUs nuevos y actualiza los existentes; en las filas de SKUs
+    existentes solo se modifican las columnas presentes.
+
+    Retorna {'creados': n, 'actualizados': n, 'errores': [{fila, sku, errores}]}.
+    """
+    validador = ProductoImportSerializer(context={'categorias': _mapa_categorias()})
+    vistos = {}
+    resultado = {'creados': 0, 'actualizados': 0, 'errores': []}
+
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            _acumular(resultado, _procesar_lote(lote, validador, vistos))
+            lote = []
+    if lote:
+        _acumular(resultado, _procesar_lote(lote, validador, vistos))
+
+    if resultado['creados'] or resultado['actualizados']:
+        transaction.on_commit(invalidar_catalogo)
+    logger.info(
+        'Importación de productos: %s creados, %s actualizados, %s filas con error.',
+        resultado['creados'], resultado['actualizados'], len(resultado['errores']),
+    )
+    return resultado
+
+
+def _acumular(resultado, parcial):
+    creados, actualizados, errores = parcial
+    resultado['creados'] += creados
+    resultado['actualizados'] += actualizados
+    resultado['errores'].extend(errores)
@@ -0,0 +1,32 @@
+"""
+Management command: calcular_relacionados
+
+Recalcula la tabla de productos "comprados juntos" (ProductoRelacionado) a
+partir de los items de todas las ventas. Pensado para correr de forma
+periódica (cron diario); el endpoint /productos/<slug>/relacionados/ solo
+lee la tabla.
+
+Uso:
+    python manage.py calcular_relacionados
+    python manage.py calcular_relacionados --top 20
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las recomendaciones "comprados juntos" desde las ventas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=None,
+            help='Relacionados a guardar por producto (default: RECOMENDACIONES_TOP_K).',
+        )
+
+    def handle(self, *args, **options):
+        # Import here to avoid AppRegistryNotReady at module level
+        from apps.inventario.recomendaciones import calcular_relacionados
+
+        filas = calcular_relacionados(options['top'])
+        self.stdout.write(self.style.SUCCESS(f'Productos relacionados recalculados: {filas} filas.'))
@@ -0,0 +1,64 @@
+"""
+Management command: importar_productos
+
+Importa un catálogo de productos desde CSV o JSONL con upsert por SKU:
+crea los SKUs nuevos y actualiza los existentes (solo las columnas presentes).
+Las filas con error se reportan y no detienen la importación.
+
+Columnas: nombre, slug, descripcion, precio, precio_oferta, sku,
+imagen_principal, imagenes, categoria (id o slug), stock, activo, destacado,
+dimensiones, detalles_tecnicos, materiales. En CSV los campos JSON van como
+texto JSON.
+
+Uso:
+    python manage.py importar_productos catalogo.csv
+    python manage.py importar_productos proveedor.jsonl --lote 2000
+    python manage.py importar_productos export.txt --formato jsonl
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde un archivo CSV o JSONL (upsert por SKU).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help='Ruta del archivo a importar.')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'jsonl'],
+            default=None,
+            help='Formato del archivo (default: según la extensión).',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas por lote de escritura (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        # Import here to avoid AppRegistryNotReady at module level
+        from apps.inventario.importacion import detectar_formato, importar_productos, leer_filas
+
+        ruta = options['ruta']
+        formato = options['formato'] or detectar_formato(ruta)
+
+        try:
+            with open(ruta, 'rb') as archivo:
+                resultado = importar_productos(leer_filas(archivo, formato), options['lote'])
+        except OSError as e:
+            raise CommandError(f'No se pudo abrir {ruta}: {e}')
+
+        for error in resultado['errores']:
+            detalle = '; '.join(
+                f"{campo}: {' '.join(str(m) for m in mensajes)}"
+                for campo, mensajes in error['errores'].items()
+            )
+            self.stdout.write(self.style.WARNING(
+                f"Fila {error['fila']} (SKU: {error['sku'] or '-'}) — {detalle}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completada — creados: {resultado['creados']}, "
+            f"actualizados: {resultado['actualizados']}, "
+            f"filas con error: {len(resultado['errores'])}"
+        ))
@@ -0,0 +1,33 @@
+"""
+Management command: reconstruir_ratings
+
+Recalcula desde las reseñas los agregados de rating de los productos
+(rating_promedio, resenas_count e histograma). Normalmente se mantienen
+solos al guardar o borrar reseñas; usar tras correcciones manuales de datos
+o actualizaciones con QuerySet.update().
+
+Uso:
+    python manage.py reconstruir_ratings
+    python manage.py reconstruir_ratings --producto 12 --producto 15
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los agregados de reseñas de los productos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--producto',
+            type=int,
+            action='append',
+            dest='productos',
+            help='ID de producto a recalcular (repetible; default: todos).',
+        )
+
+    def handle(self, *args, **options):
+        # Import here to avoid AppRegistryNotReady at module level
+        from apps.inventario.models import Producto
+
+        filas = Producto.objects.reconstruir_ratings(options['productos'])
+        self.stdout.write(self.style.SUCCESS(f'Ratings recalculados: {filas} productos.'))
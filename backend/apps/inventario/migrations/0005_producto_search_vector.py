@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def crear_config_busqueda(apps, schema_editor):
+    """
+    Crea la configuración de texto `es_unaccent` (español sin acentos).
+    Si la extensión unaccent no está disponible en el servidor, la configuración
+    queda como copia de `spanish` para que la migración no falle.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent'")
+        tiene_unaccent = cursor.fetchone() is not None
+
+        cursor.execute('DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent')
+        cursor.execute('CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish)')
+        if tiene_unaccent:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+            cursor.execute(
+                'ALTER TEXT SEARCH CONFIGURATION es_unaccent '
+                'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem'
+            )
+
+
+def eliminar_config_busqueda(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent')
+
+
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION inventario_producto_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('es_unaccent', coalesce(NEW.nombre, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', coalesce(NEW.sku, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', coalesce(NEW.descripcion, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventario_producto_search_vector_trigger
+BEFORE INSERT OR UPDATE OF nombre, sku, descripcion ON inventario_producto
+FOR EACH ROW EXECUTE FUNCTION inventario_producto_search_vector_update();
+
+UPDATE inventario_producto SET search_vector =
+    setweight(to_tsvector('es_unaccent', coalesce(nombre, '')), 'A') ||
+    setweight(to_tsvector('es_unaccent', coalesce(sku, '')), 'A') ||
+    setweight(to_tsvector('es_unaccent', coalesce(descripcion, '')), 'B');
+"""
+
+TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS inventario_producto_search_vector_trigger ON inventario_producto;
+DROP FUNCTION IF EXISTS inventario_producto_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_listadeseos_resena'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='vector de búsqueda'),
+        ),
+        migrations.RunPython(crear_config_busqueda, eliminar_config_busqueda),
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='producto_search_vector_gin'),
+        ),
+    ]
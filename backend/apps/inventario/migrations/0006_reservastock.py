@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_producto_search_vector'),
+        ('pedidos', '0004_pedido_guest_email_pedido_guest_nombre_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(verbose_name='cantidad')),
+                ('expires_at', models.DateTimeField(verbose_name='expira')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de creación')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_stock', to='pedidos.pedido', verbose_name='pedido')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='inventario.producto', verbose_name='producto')),
+            ],
+            options={
+                'verbose_name': 'reserva de stock',
+                'verbose_name_plural': 'reservas de stock',
+                'indexes': [models.Index(fields=['expires_at'], name='inventario__expires_66d17a_idx'), models.Index(fields=['producto', 'expires_at'], name='inventario__product_02dc59_idx')],
+                'unique_together': {('producto', 'pedido')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:04
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_ratings(apps, schema_editor):
+    """Carga inicial de los agregados con las reseñas existentes."""
+    Producto = apps.get_model('inventario', 'Producto')
+    Resena = apps.get_model('inventario', 'Resena')
+
+    histogramas = {}
+    for fila in Resena.objects.values('producto_id', 'rating').annotate(n=Count('id')).order_by():
+        histogramas.setdefault(fila['producto_id'], {})[fila['rating']] = fila['n']
+
+    for producto_id, histograma in histogramas.items():
+        count = sum(histograma.values())
+        suma = sum(rating * n for rating, n in histograma.items())
+        Producto.objects.filter(pk=producto_id).update(
+            rating_promedio=(Decimal(suma) / count).quantize(Decimal('0.01'), ROUND_HALF_UP),
+            resenas_count=count,
+            **{f'resenas_{rating}': histograma.get(rating, 0) for rating in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_reservastock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='rating_promedio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3, verbose_name='calificación promedio'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_1',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reseñas de 1★'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_2',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reseñas de 2★'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_3',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reseñas de 3★'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_4',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reseñas de 4★'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_5',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reseñas de 5★'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='resenas_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='número de reseñas'),
+        ),
+        migrations.AddIndex(
+            model_name='resena',
+            index=models.Index(fields=['producto', '-created_at'], name='inventario__product_c2409c_idx'),
+        ),
+        migrations.RunPython(poblar_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_producto_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoRelacionado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField(verbose_name='posición')),
+                ('score', models.FloatField(verbose_name='puntuación')),
+                ('coocurrencias', models.PositiveIntegerField(verbose_name='ventas en común')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='inventario.producto', verbose_name='producto')),
+                ('relacionado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventario.producto', verbose_name='producto relacionado')),
+            ],
+            options={
+                'verbose_name': 'producto relacionado',
+                'verbose_name_plural': 'productos relacionados',
+                'ordering': ['producto', 'posicion'],
+                'unique_together': {('producto', 'posicion')},
+            },
+        ),
+    ]
@@ -2,18 +2,35 @@
 Modelos de inventario: Categoría y Producto.
 Incluye soft delete (campo activo), slug auto-generado
 y operaciones atómicas de stock con F() expressions.
+
+Invalidan la caché versionada del catálogo (ver cache.py) los cambios que
+la afectan: save()/delete() de Categoria y Producto (incluido el soft
+delete) y los movimientos de stock que cambian en_stock (agotarse o
+reponerse). El número exacto de stock y los agregados de reseñas pueden
+verse con hasta CATALOGO_CACHE_TIMEOUT de retraso en las respuestas
+cacheadas; el checkout siempre valida contra la BD.
 """
 import logging
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import F
+from django.db import connection, models, transaction
+from django.db.models import Avg, Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+from utils.metricas import STOCK_RECHAZOS
+
+from .cache import invalidar_catalogo
+
 logger = logging.getLogger('clarte')
 
+RATINGS = range(1, 6)
+
 
 class Categoria(models.Model):
     """Categoría de productos (ej: Lámparas de techo, Lámparas de mesa)."""
@@ -48,6 +65,12 @@ class Categoria(models.Model):
                 self.slug = f'{original_slug}-{counter}'
                 counter += 1
         super().save(*args, **kwargs)
+        transaction.on_commit(invalidar_catalogo)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        transaction.on_commit(invalidar_catalogo)
+        return resultado
 
 
 class ProductoQuerySet(models.QuerySet):
@@ -59,6 +82,51 @@ class ProductoQuerySet(models.QuerySet):
     def destacados(self):
         return self.filter(activo=True, destacado=True)
 
+    def con_disponible(self, excluir_pedido_id=None):
+        """
+        Anota `stock_reservado` (reservas vigentes) y `stock_disponible`
+        (stock - reservado). Usa una subconsulta correlacionada en lugar de
+        GROUP BY para poder combinarse con select_for_update().
+        Con `excluir_pedido_id` no cuenta las reservas de ese pedido.
+        """
+        reservas = ReservaStock.objects.filter(producto=OuterRef('pk'), expires_at__gt=timezone.now())
+        if excluir_pedido_id is not None:
+            reservas = reservas.exclude(pedido_id=excluir_pedido_id)
+        reservado = (
+            reservas
+            .order_by()
+            .values('producto')
+            .annotate(total=Sum('cantidad'))
+            .values('total')
+        )
+        return self.annotate(
+            stock_reservado=Coalesce(Subquery(reservado), Value(0)),
+        ).annotate(
+            stock_disponible=F('stock') - F('stock_reservado'),
+        )
+
+
+class StockInsuficienteError(ValueError):
+    """
+    Uno o más productos no tienen stock suficiente para un decremento en lote.
+    `fallidos` es una lista de dicts con producto_id, sku, nombre, solicitado y disponible;
+    `faltantes`, los producto_id que ya no existen.
+    """
+
+    def __init__(self, fallidos, faltantes=()):
+        self.fallidos = fallidos
+        self.faltantes = list(faltantes)
+        partes = []
+        if fallidos:
+            detalle = '; '.join(
+                f'"{f["nombre"]}" (SKU: {f["sku"]}) solicitado: {f["solicitado"]}, disponible: {f["disponible"]}'
+                for f in fallidos
+            )
+            partes.append(f'Stock insuficiente: {detalle}.')
+        if self.faltantes:
+            partes.append(f'Productos inexistentes: {", ".join(map(str, self.faltantes))}.')
+        super().__init__(' '.join(partes))
+
 
 class ProductoManager(models.Manager):
     """Manager que expone el QuerySet personalizado."""
@@ -72,6 +140,140 @@ class ProductoManager(models.Manager):
     def destacados(self):
         return self.get_queryset().destacados()
 
+    def con_disponible(self, excluir_pedido_id=None):
+        return self.get_queryset().con_disponible(excluir_pedido_id)
+
+    def decrementar_stock_lote(self, cantidades, excluir_pedido_id=None):
+        """
+        Decrementa el stock de varios productos en una sola sentencia:
+          UPDATE ... FROM (VALUES (id, cantidad), ...)
+          WHERE stock - reservas vigentes de otros pedidos >= cantidad
+        Así un pago no consume stock reservado por otro pedido pendiente.
+        Todo o nada: si algún producto no tiene stock disponible suficiente
+        (o ya no existe), se revierte el lote completo y se lanza
+        StockInsuficienteError con los SKUs fallidos y los ids inexistentes.
+
+        Las filas se bloquean antes (SELECT ... FOR UPDATE ordenado por id,
+        como bloquear_productos): el UPDATE ve entonces las reservas que un
+        checkout concurrente haya confirmado mientras esperaba el lock.
+
+        Args:
+            cantidades: dict {producto_id: cantidad}.
+            excluir_pedido_id: pedido cuyas reservas no restan (el que se paga).
+        Retorna dict {producto_id: stock_restante}.
+        """
+        if not cantidades:
+            return {}
+
+        ids = sorted(cantidades)
+        valores = ', '.join(['(%s::bigint, %s::integer)'] * len(ids))
+        params = [valor for pk in ids for valor in (pk, cantidades[pk])]
+        tabla = self.model._meta.db_table
+        tabla_reservas = ReservaStock._meta.db_table
+
+        with transaction.atomic():
+            list(self.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {tabla} AS p SET stock = p.stock - v.cantidad '
+                    f'FROM (VALUES {valores}) AS v(id, cantidad) '
+                    f'WHERE p.id = v.id AND p.stock - COALESCE(('
+                    f'  SELECT SUM(r.cantidad) FROM {tabla_reservas} AS r '
+                    f'  WHERE r.producto_id = p.id AND r.expires_at > %s '
+                    f'  AND r.pedido_id IS DISTINCT FROM %s::bigint'
+                    f'), 0) >= v.cantidad '
+                    f'RETURNING p.id, p.stock',
+                    [*params, timezone.now(), excluir_pedido_id],
+                )
+                restantes = dict(cursor.fetchall())
+
+            if len(restantes) != len(ids):
+                rechazados = [pk for pk in ids if pk not in restantes]
+                fallidos = [
+                    {
+                        'producto_id': p.id,
+                        'sku': p.sku,
+                        'nombre': p.nombre,
+                        'solicitado': cantidades[p.id],
+                        'disponible': max(p.stock_disponible, 0),
+                    }
+                    for p in self.con_disponible(excluir_pedido_id).filter(id__in=rechazados).order_by('id')
+                ]
+                encontrados = {f['producto_id'] for f in fallidos}
+                faltantes = [pk for pk in rechazados if pk not in encontrados]
+                logger.warning('Decremento de stock en lote rechazado: %s, inexistentes: %s', fallidos, faltantes)
+                STOCK_RECHAZOS.inc(operacion='decremento')
+                # Sale del atomic con excepción → se revierte el UPDATE parcial
+                raise StockInsuficienteError(fallidos, faltantes)
+
+        if 0 in restantes.values():
+            # Algún producto se agotó: en_stock cambia en el catálogo
+            transaction.on_commit(invalidar_catalogo)
+        logger.info('Stock decrementado en lote: %s', restantes)
+        return restantes
+
+    def ajustar_rating(self, producto_id, cambios):
+        """
+        Actualiza los agregados de reseñas de un producto en una sola sentencia
+        UPDATE con F() expressions (sin leer la fila: seguro ante reseñas
+        concurrentes). El promedio se recalcula a partir del histograma.
+        No invalida la caché del catálogo: el promedio cacheado se actualiza
+        al vencer CATALOGO_CACHE_TIMEOUT.
+
+        Args:
+            producto_id: id del producto.
+            cambios: dict {rating: delta}. Ej: {5: 1} al crear una reseña de 5★,
+                {5: -1, 3: 1} al cambiarla de 5★ a 3★.
+        """
+        cambios = {rating: delta for rating, delta in cambios.items() if delta}
+        if not cambios:
+            return
+
+        # En el SET, las columnas referencian los valores previos de la fila
+        delta_count = sum(cambios.values())
+        delta_suma = sum(rating * delta for rating, delta in cambios.items())
+        suma = sum(rating * F(f'resenas_{rating}') for rating in RATINGS) + delta_suma
+        count = F('resenas_count') + delta_count
+
+        valores = {
+            f'resenas_{rating}': F(f'resenas_{rating}') + delta
+            for rating, delta in cambios.items()
+        }
+        valores['resenas_count'] = count
+        valores['rating_promedio'] = Coalesce(
+            Cast(suma, DecimalField(max_digits=12, decimal_places=2)) / NullIf(count, 0),
+            Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        )
+        self.filter(pk=producto_id).update(**valores)
+
+
+    def reconstruir_ratings(self, ids=None):
+        """
+        Recalcula desde las reseñas los agregados de los productos `ids` (o de
+        todos) en una sola sentencia UPDATE con subconsultas correlacionadas.
+        Corrige la deriva de cambios que no pasan por Resena.save() ni por
+        post_delete (p. ej. Resena.objects.update()). Retorna las filas actualizadas.
+        """
+        def agregado(funcion, **filtro):
+            return Subquery(
+                Resena.objects
+                .filter(producto=OuterRef('pk'), **filtro)
+                .order_by()
+                .values('producto')
+                .annotate(valor=funcion)
+                .values('valor')
+            )
+
+        valores = {f'resenas_{rating}': Coalesce(agregado(Count('pk'), rating=rating), Value(0)) for rating in RATINGS}
+        valores['resenas_count'] = Coalesce(agregado(Count('pk')), Value(0))
+        valores['rating_promedio'] = Coalesce(
+            agregado(Avg('rating')), Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        )
+        productos = self.all() if ids is None else self.filter(pk__in=ids)
+        return productos.update(**valores)
+
 
 class Producto(models.Model):
     """
@@ -130,8 +332,25 @@ class Producto(models.Model):
     stock = models.PositiveIntegerField(_('stock'), default=0)
     activo = models.BooleanField(_('activo'), default=True)
     destacado = models.BooleanField(_('destacado'), default=False)
+    # Agregados de reseñas: mantenidos por Resena.save() y post_delete (ver
+    # ajustar_rating); `manage.py reconstruir_ratings` los recalcula
+    rating_promedio = models.DecimalField(
+        _('calificación promedio'),
+        max_digits=3,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    resenas_count = models.PositiveIntegerField(_('número de reseñas'), default=0, editable=False)
+    resenas_1 = models.PositiveIntegerField(_('reseñas de 1★'), default=0, editable=False)
+    resenas_2 = models.PositiveIntegerField(_('reseñas de 2★'), default=0, editable=False)
+    resenas_3 = models.PositiveIntegerField(_('reseñas de 3★'), default=0, editable=False)
+    resenas_4 = models.PositiveIntegerField(_('reseñas de 4★'), default=0, editable=False)
+    resenas_5 = models.PositiveIntegerField(_('reseñas de 5★'), default=0, editable=False)
     created_at = models.DateTimeField(_('fecha de creación'), auto_now_add=True)
     updated_at = models.DateTimeField(_('fecha de actualización'), auto_now=True)
+    # Mantenido por trigger en la base de datos (ver busqueda.py)
+    search_vector = SearchVectorField(_('vector de búsqueda'), null=True, editable=False)
 
     objects = ProductoManager()
 
@@ -144,6 +363,7 @@ class Producto(models.Model):
             models.Index(fields=['sku']),
             models.Index(fields=['activo', 'destacado']),
             models.Index(fields=['categoria', 'activo']),
+            GinIndex(fields=['search_vector'], name='producto_search_vector_gin'),
         ]
 
     def __str__(self):
@@ -158,6 +378,13 @@ class Producto(models.Model):
                 self.slug = f'{original_slug}-{counter}'
                 counter += 1
         super().save(*args, **kwargs)
+        # Invalidar la caché del catálogo una vez confirmada la transacción
+        transaction.on_commit(invalidar_catalogo)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        transaction.on_commit(invalidar_catalogo)
+        return resultado
 
     @property
     def precio_final(self):
@@ -170,6 +397,11 @@ class Producto(models.Model):
     def en_stock(self):
         return self.stock > 0
 
+    @property
+    def rating_histograma(self):
+        """Conteo de reseñas por calificación: {'1': n, ..., '5': n}."""
+        return {str(rating): getattr(self, f'resenas_{rating}') for rating in RATINGS}
+
     def verificar_stock(self, cantidad):
         """Verifica si hay suficiente stock para la cantidad solicitada."""
         return self.stock >= cantidad
@@ -186,6 +418,7 @@ class Producto(models.Model):
         ).update(stock=F('stock') - cantidad)
 
         if filas_actualizadas == 0:
+            STOCK_RECHAZOS.inc(operacion='decremento')
             logger.warning(
                 'Stock insuficiente para producto %s (SKU: %s). '
                 'Solicitado: %d, Disponible: %d',
@@ -195,6 +428,8 @@ class Producto(models.Model):
 
         # Refrescar el objeto en memoria con el valor actualizado
         self.refresh_from_db(fields=['stock'])
+        if self.stock == 0:
+            transaction.on_commit(invalidar_catalogo)
         logger.info(
             'Stock decrementado: producto %s (SKU: %s), cantidad: %d, stock restante: %d',
             self.nombre, self.sku, cantidad, self.stock,
@@ -205,12 +440,86 @@ class Producto(models.Model):
         """Incrementa el stock de forma atómica (para cancelaciones/devoluciones)."""
         Producto.objects.filter(pk=self.pk).update(stock=F('stock') + cantidad)
         self.refresh_from_db(fields=['stock'])
+        if self.stock <= cantidad:
+            # Estaba agotado: vuelve a estar en stock
+            transaction.on_commit(invalidar_catalogo)
         logger.info(
             'Stock incrementado: producto %s (SKU: %s), cantidad: %d, stock actual: %d',
             self.nombre, self.sku, cantidad, self.stock,
         )
 
 
+class ReservaStock(models.Model):
+    """
+    Reserva temporal de stock para un pedido pendiente de pago.
+    Disponible = stock - reservas vigentes (expires_at > ahora).
+    Se elimina al pagarse o cancelarse el pedido, o al expirar (limpiar_pedidos_expirados).
+    """
+
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='reservas',
+        verbose_name=_('producto'),
+    )
+    pedido = models.ForeignKey(
+        'pedidos.Pedido',
+        on_delete=models.CASCADE,
+        related_name='reservas_stock',
+        verbose_name=_('pedido'),
+    )
+    cantidad = models.PositiveIntegerField(_('cantidad'))
+    expires_at = models.DateTimeField(_('expira'))
+    created_at = models.DateTimeField(_('fecha de creación'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('reserva de stock')
+        verbose_name_plural = _('reservas de stock')
+        unique_together = [['producto', 'pedido']]
+        indexes = [
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['producto', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.producto_id} x{self.cantidad} (pedido {self.pedido_id})'
+
+
+class ProductoRelacionado(models.Model):
+    """
+    Recomendación "comprados juntos" precalculada: los top-K productos que
+    más aparecen en las mismas ventas que `producto`, por `posicion`.
+    La tabla completa se regenera con `python manage.py calcular_relacionados`
+    (ver recomendaciones.py); el endpoint de relacionados solo la lee.
+    """
+
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='relacionados',
+        verbose_name=_('producto'),
+    )
+    relacionado = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('producto relacionado'),
+    )
+    posicion = models.PositiveSmallIntegerField(_('posición'))
+    score = models.FloatField(_('puntuación'))
+    coocurrencias = models.PositiveIntegerField(_('ventas en común'))
+
+    class Meta:
+        verbose_name = _('producto relacionado')
+        verbose_name_plural = _('productos relacionados')
+        ordering = ['producto', 'posicion']
+        # También es el índice de la consulta del endpoint (producto, posicion)
+        unique_together = [['producto', 'posicion']]
+
+    def __str__(self):
+        return f'{self.producto_id} → {self.relacionado_id} (#{self.posicion}, {self.score:.3f})'
+
+
 class Resena(models.Model):
     """Reseña de producto por un usuario autenticado."""
 
@@ -238,10 +547,38 @@ class Resena(models.Model):
         verbose_name_plural = _('reseñas')
         ordering = ['-created_at']
         unique_together = [['producto', 'usuario']]
+        indexes = [
+            models.Index(fields=['producto', '-created_at']),
+        ]
 
     def __str__(self):
         return f'{self.usuario} — {self.producto.nombre} ({self.rating}★)'
 
+    def save(self, *args, **kwargs):
+        """
+        Ajusta los agregados del producto; si la reseña cambia de producto,
+        los de ambos. El borrado (incluidos QuerySet.delete() y los borrados
+        en cascada) lo ajusta el receptor post_delete de signals.py.
+        """
+        with transaction.atomic():
+            anterior = None
+            if not self._state.adding:
+                anterior = (
+                    Resena.objects.filter(pk=self.pk)
+                    .values_list('producto_id', 'rating')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if anterior is None:
+                Producto.objects.ajustar_rating(self.producto_id, {self.rating: 1})
+            elif anterior[0] != self.producto_id:
+                Producto.objects.ajustar_rating(anterior[0], {anterior[1]: -1})
+                Producto.objects.ajustar_rating(self.producto_id, {self.rating: 1})
+            else:
+                cambios = {self.rating: 1}
+                cambios[anterior[1]] = cambios.get(anterior[1], 0) - 1
+                Producto.objects.ajustar_rating(self.producto_id, cambios)
+
 
 class ListaDeseos(models.Model):
     """Lista de deseos de un usuario."""
@@ -0,0 +1,119 @@
+"""
+Recomendaciones "comprados juntos" a partir del historial de ventas.
+
+calcular_relacionados() regenera la tabla ProductoRelacionado con una sola
+sentencia INSERT ... SELECT: el conteo de co-ocurrencias (pares de productos
+en una misma venta) se hace por conjuntos dentro de PostgreSQL, sin traer
+las ventas a Python.
+
+    score(a, b) = ventas_con_a_y_b / sqrt(ventas_con_a * ventas_con_b)
+
+(similitud coseno sobre la matriz venta × producto: no favorece solo a los
+productos más vendidos). Por producto se guardan los RECOMENDACIONES_TOP_K
+de mayor score.
+
+obtener_relacionados() lee la tabla y completa con productos de la misma
+categoría cuando no hay historial suficiente.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from apps.ventas.models import ItemVenta
+
+from .cache import invalidar_catalogo
+from .models import Producto, ProductoRelacionado
+
+logger = logging.getLogger('clarte')
+
+
+def calcular_relacionados(top_k=None):
+    """
+    Recalcula desde cero la tabla de productos relacionados.
+    Atómico: las lecturas concurrentes ven la tabla anterior hasta el commit.
+    Retorna el número de filas escritas.
+    """
+    top_k = top_k or settings.RECOMENDACIONES_TOP_K
+    tabla = ProductoRelacionado._meta.db_table
+    items = ItemVenta._meta.db_table
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {tabla}')
+            cursor.execute(
+                f"""
+                WITH lineas AS (
+                    SELECT DISTINCT venta_id, producto_id
+                    FROM {items}
+                    WHERE producto_id IS NOT NULL
+                ),
+                frecuencia AS (
+                    SELECT producto_id, COUNT(*) AS ventas
+                    FROM lineas
+                    GROUP BY producto_id
+                ),
+                pares AS (
+                    SELECT a.producto_id, b.producto_id AS relacionado_id, COUNT(*) AS coocurrencias
+                    FROM lineas a
+                    JOIN lineas b ON b.venta_id = a.venta_id AND b.producto_id <> a.producto_id
+                    GROUP BY a.producto_id, b.producto_id
+                ),
+                ranking AS (
+                    SELECT
+                        p.producto_id,
+                        p.relacionado_id,
+                        p.coocurrencias,
+                        p.coocurrencias / sqrt(fa.ventas::float8 * fb.ventas) AS score,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY p.producto_id
+                            ORDER BY p.coocurrencias / sqrt(fa.ventas::float8 * fb.ventas) DESC,
+                                     p.coocurrencias DESC,
+                                     p.relacionado_id
+                        ) AS posicion
+                    FROM pares p
+                    JOIN frecuencia fa ON fa.producto_id = p.producto_id
+                    JOIN frecuencia fb ON fb.producto_id = p.relacionado_id
+                )
+                INSERT INTO {tabla} (producto_id, relacionado_id, posicion, score, coocurrencias)
+                SELECT producto_id, relacionado_id, posicion, score, coocurrencias
+                FROM ranking
+                WHERE posicion <= %s
+                """,
+                [top_k],
+            )
+            filas = cursor.rowcount
+
+    transaction.on_commit(invalidar_catalogo)
+    logger.info('Productos relacionados recalculados: %s filas (top %s).', filas, top_k)
+    return filas
+
+
+def obtener_relacionados(producto, limite=None):
+    """
+    Productos relacionados activos de `producto` (con categoria precargada):
+    primero los precalculados por posición; si no alcanzan el límite, se
+    completan con productos de la misma categoría.
+    """
+    limite = limite or settings.RECOMENDACIONES_TOP_K
+    relacionados = [
+        fila.relacionado
+        for fila in (
+            ProductoRelacionado.objects
+            .filter(producto=producto, relacionado__activo=True)
+            .select_related('relacionado__categoria')
+            .order_by('posicion')[:limite]
+        )
+    ]
+
+    faltan = limite - len(relacionados)
+    if faltan > 0:
+        excluir = [producto.pk, *(p.pk for p in relacionados)]
+        relacionados += list(
+            Producto.objects.activos()
+            .filter(categoria_id=producto.categoria_id)
+            .exclude(pk__in=excluir)
+            .select_related('categoria')
+            .order_by('-destacado', '-resenas_count', '-created_at')[:faltan]
+        )
+    return relacionados
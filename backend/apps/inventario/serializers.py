@@ -3,6 +3,7 @@ Serializers para la app de inventario.
 Serializers separados para listado (ligero) y detalle (completo).
 Admin usa serializers con todos los campos editables.
 """
+from django.conf import settings
 from rest_framework import serializers
 
 from .models import Categoria, ListaDeseos, Producto, Resena
@@ -53,6 +54,7 @@ class ProductoListSerializer(serializers.ModelSerializer):
             'id', 'nombre', 'slug', 'precio', 'precio_oferta',
             'precio_final', 'imagen_principal', 'categoria',
             'categoria_nombre', 'en_stock', 'destacado',
+            'rating_promedio', 'resenas_count',
         ]
 
 
@@ -62,6 +64,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
     categoria_slug = serializers.CharField(source='categoria.slug', read_only=True)
     precio_final = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     en_stock = serializers.BooleanField(read_only=True)
+    rating_histograma = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Producto
@@ -72,6 +75,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
             'categoria_nombre', 'categoria_slug',
             'stock', 'en_stock', 'destacado',
             'dimensiones', 'detalles_tecnicos', 'materiales',
+            'rating_promedio', 'resenas_count', 'rating_histograma',
             'created_at', 'updated_at',
         ]
 
@@ -112,6 +116,64 @@ class ProductoAdminSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class ProductoImportSerializer(ProductoAdminSerializer):
+    """
+    Valida una fila de la importación masiva con las reglas de
+    ProductoAdminSerializer, sin consultas por fila:
+      - sku y slug sin UniqueValidator (la importación hace upsert por sku y
+        resuelve los slugs por lote).
+      - categoria se acepta como id o slug y se resuelve contra el dict
+        context['categorias'] precargado.
+    """
+    sku = serializers.CharField(max_length=50)
+    slug = serializers.SlugField(max_length=320, required=False, allow_blank=True)
+    categoria = serializers.CharField()
+
+    class Meta(ProductoAdminSerializer.Meta):
+        fields = [
+            'nombre', 'slug', 'descripcion', 'precio',
+            'precio_oferta', 'sku', 'imagen_principal', 'imagenes',
+            'categoria', 'stock', 'activo', 'destacado',
+            'dimensiones', 'detalles_tecnicos', 'materiales',
+        ]
+
+    def validate_categoria(self, value):
+        categoria = self.context['categorias'].get(str(value).strip())
+        if categoria is None:
+            raise serializers.ValidationError(f'Categoría "{value}" inexistente.')
+        return categoria
+
+
+class ImportarProductosSerializer(serializers.Serializer):
+    """Archivo de la importación masiva (el formato se deduce de la extensión si no se envía)."""
+    archivo = serializers.FileField()
+    formato = serializers.ChoiceField(choices=['csv', 'jsonl'], required=False)
+
+
+class DisponibilidadQuerySerializer(serializers.Serializer):
+    """Query params de la consulta de disponibilidad: ids y/o SKUs separados por coma."""
+    ids = serializers.CharField(required=False)
+    skus = serializers.CharField(required=False)
+
+    def validate_ids(self, value):
+        try:
+            return sorted({int(v) for v in value.split(',') if v.strip()})
+        except ValueError:
+            raise serializers.ValidationError('Debe ser una lista de ids numéricos separados por coma.')
+
+    def validate_skus(self, value):
+        return sorted({v.strip() for v in value.split(',') if v.strip()})
+
+    def validate(self, attrs):
+        total = len(attrs.get('ids', [])) + len(attrs.get('skus', []))
+        if not total:
+            raise serializers.ValidationError('Indica al menos un id o SKU.')
+        maximo = settings.CATALOGO_DISPONIBILIDAD_MAX
+        if total > maximo:
+            raise serializers.ValidationError(f'Máximo {maximo} productos por consulta.')
+        return attrs
+
+
 # ──────────────────────────────────────────────
 # RESEÑAS
 # ──────────────────────────────────────────────
@@ -0,0 +1,93 @@
+"""
+Servicios de inventario: reservas temporales de stock.
+Usado por pedidos al crear (reservar), pagar o cancelar (liberar) un pedido
+y por el comando limpiar_pedidos_expirados (barrido de reservas expiradas).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from utils.metricas import STOCK_RECHAZOS
+
+from .models import Producto, ReservaStock, StockInsuficienteError
+
+logger = logging.getLogger('clarte')
+
+
+def bloquear_productos(cantidades):
+    """
+    Bloquea los productos activos del pedido con un único SELECT ... FOR UPDATE
+    ordenado por id (orden estable → sin deadlocks entre checkouts concurrentes)
+    y verifica el stock disponible (stock - reservas vigentes) en memoria.
+    Debe llamarse dentro de una transacción.
+
+    Args:
+        cantidades: dict {producto_id: cantidad}.
+    Retorna dict {producto_id: Producto} con los productos bloqueados.
+    Lanza StockInsuficienteError si algún producto no alcanza.
+    """
+    productos = {
+        p.id: p
+        for p in (
+            Producto.objects
+            .activos()
+            .select_for_update(of=('self',))
+            .con_disponible()
+            .filter(id__in=cantidades)
+            .order_by('id')
+        )
+    }
+    fallidos = [
+        {
+            'producto_id': p.id,
+            'sku': p.sku,
+            'nombre': p.nombre,
+            'solicitado': cantidades[p.id],
+            'disponible': max(p.stock_disponible, 0),
+        }
+        for p in productos.values()
+        if p.stock_disponible < cantidades[p.id]
+    ]
+    if fallidos:
+        STOCK_RECHAZOS.inc(operacion='reserva')
+        raise StockInsuficienteError(fallidos)
+    return productos
+
+
+def reservar_stock(pedido, cantidades):
+    """
+    Reserva stock para un pedido durante RESERVA_STOCK_MINUTOS (un solo INSERT).
+    Debe ejecutarse en la misma transacción que bloquear_productos(),
+    que es quien garantiza que el stock disponible alcanza.
+
+    Args:
+        pedido: Instancia de Pedido (ya guardada).
+        cantidades: dict {producto_id: cantidad}.
+    """
+    expires_at = timezone.now() + timedelta(minutes=settings.RESERVA_STOCK_MINUTOS)
+    ReservaStock.objects.bulk_create([
+        ReservaStock(pedido=pedido, producto_id=pk, cantidad=cantidad, expires_at=expires_at)
+        for pk, cantidad in cantidades.items()
+    ])
+    logger.info(
+        'Stock reservado para pedido %s hasta %s: %s',
+        pedido.numero_pedido, expires_at, cantidades,
+    )
+
+
+def liberar_reservas(pedido):
+    """Elimina las reservas de un pedido (pagado o cancelado). Retorna cuántas se eliminaron."""
+    eliminadas, _ = ReservaStock.objects.filter(pedido=pedido).delete()
+    if eliminadas:
+        logger.info('Reservas liberadas para pedido %s: %d', pedido.numero_pedido, eliminadas)
+    return eliminadas
+
+
+def limpiar_reservas_expiradas():
+    """Elimina las reservas vencidas usando el índice sobre expires_at. Retorna cuántas."""
+    eliminadas, _ = ReservaStock.objects.filter(expires_at__lte=timezone.now()).delete()
+    if eliminadas:
+        logger.info('Reservas de stock expiradas eliminadas: %d', eliminadas)
+    return eliminadas
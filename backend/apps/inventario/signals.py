@@ -0,0 +1,17 @@
+"""
+Receptores de señales del inventario (conectados en InventarioConfig.ready).
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Producto, Resena
+
+
+@receiver(post_delete, sender=Resena)
+def descontar_resena(sender, instance, **kwargs):
+    """
+    Descuenta la reseña borrada de los agregados del producto. post_delete se
+    emite también en QuerySet.delete(), el borrado masivo del admin y los
+    borrados en cascada (usuario o producto), que no llaman a Resena.delete().
+    """
+    Producto.objects.ajustar_rating(instance.producto_id, {instance.rating: -1})
@@ -1,3 +1,487 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para los endpoints del catálogo.
+"""
+from decimal import Decimal
 
-# Create your tests here.
+from utils.testing import PresupuestoAPITestCase
+
+
+class CatalogoPublicoPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_listar_productos(self):
+        self.assertPresupuesto('get', '/api/v1/productos/', 2)
+
+    def test_listar_productos_cache(self):
+        url = f"/api/v1/productos/?categoria={self.datos['categorias'][1].id}"
+        self.assertPresupuesto('get', url, 3)
+        # Segunda petición: servida desde la caché del catálogo
+        self.assertPresupuesto('get', url, 0)
+
+    def test_cache_invalidada_al_guardar_y_al_desactivar(self):
+        producto = self.datos['productos'][0]
+        url = f'/api/v1/productos/{producto.slug}/'
+        self.assertPresupuesto('get', url, 1)
+        self.assertPresupuesto('get', url, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.precio = Decimal('4321.00')
+            producto.precio_oferta = None
+            producto.save()
+        response = self.assertPresupuesto('get', url, 1)
+        self.assertEqual(response.json()['data']['precio_final'], '4321.00')
+
+        # Soft delete (como el admin): deja de servirse desde la caché
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.activo = False
+            producto.save(update_fields=['activo'])
+        self.assertPresupuesto('get', url, 1, status=404)
+
+    def test_movimientos_de_stock_solo_invalidan_si_cambia_en_stock(self):
+        from apps.inventario.cache import obtener_version_catalogo
+        from apps.inventario.models import Producto
+
+        producto = Producto.objects.create(
+            nombre='Lámpara contada', precio=Decimal('100.00'), sku='SKU-CONTADA',
+            categoria=self.datos['categorias'][0], stock=2,
+        )
+        version = obtener_version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.decrementar_stock_lote({producto.id: 1})
+        self.assertEqual(obtener_version_catalogo(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.decrementar_stock_lote({producto.id: 1})  # se agota
+        self.assertGreater(obtener_version_catalogo(), version)
+
+        version = obtener_version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.incrementar_stock(3)  # vuelve a estar en stock
+        self.assertGreater(obtener_version_catalogo(), version)
+
+        version = obtener_version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.incrementar_stock(1)
+        self.assertEqual(obtener_version_catalogo(), version)
+
+    def test_listar_productos_cursor(self):
+        self.assertPresupuesto('get', '/api/v1/productos/?paginacion=cursor&page_size=50', 1)
+
+    def test_cursor_con_empates_recorre_todo_sin_repetir(self):
+        from django.utils import timezone
+
+        from apps.inventario.models import Producto
+
+        # Todos con el mismo created_at: el orden depende del desempate por pk
+        Producto.objects.update(created_at=timezone.now())
+        vistos = []
+        url = '/api/v1/productos/?paginacion=cursor&page_size=7'
+        while url:
+            data = self.client.get(url).json()['data']
+            vistos += [p['id'] for p in data['results']]
+            url = data['next']
+        esperados = list(Producto.objects.activos().order_by('-pk').values_list('id', flat=True))
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_rechaza_busqueda(self):
+        response = self.assertPresupuesto('get', '/api/v1/productos/?paginacion=cursor&q=lampara', 0, status=400)
+        self.assertIn('q', response.json()['errors'])
+
+    def test_buscar_productos(self):
+        response = self.assertPresupuesto('get', '/api/v1/productos/?q=SKU-0003', 2)
+        self.assertEqual(
+            [p['id'] for p in response.json()['data']['results']], [self.datos['productos'][3].id],
+        )
+
+    def test_buscar_prefijo_acentos_y_relevancia(self):
+        from apps.inventario.models import Producto
+
+        categoria = self.datos['categorias'][0]
+        en_nombre = Producto.objects.create(
+            nombre='Pantalla nórdica', precio=Decimal('100.00'), sku='SKU-NORD-1', categoria=categoria,
+        )
+        en_descripcion = Producto.objects.create(
+            nombre='Aplique de pared', descripcion='Estilo nórdico minimalista',
+            precio=Decimal('100.00'), sku='SKU-NORD-2', categoria=categoria,
+        )
+
+        def buscar(**params):
+            response = self.client.get('/api/v1/productos/', params)
+            self.assertEqual(response.status_code, 200)
+            return [p['id'] for p in response.json()['data']['results']]
+
+        # Prefijo sin acento; el nombre (peso A) pesa más que la descripción (B)
+        self.assertEqual(buscar(q='nordi'), [en_nombre.id, en_descripcion.id])
+        self.assertEqual(buscar(q='nórdica'), [en_nombre.id, en_descripcion.id])
+        self.assertEqual(buscar(q='pantalla nord'), [en_nombre.id])
+        self.assertEqual(buscar(search='aplique'), [en_descripcion.id])
+        # Con ambos parámetros gana q: se busca una sola vez
+        self.assertEqual(buscar(q='pantalla', search='aplique'), [en_nombre.id])
+
+    def test_facetas(self):
+        from apps.inventario.models import Producto
+
+        url = '/api/v1/productos/facetas/?precio_min=1000&en_stock=true'
+        response = self.assertPresupuesto('get', url, 1)
+
+        data = response.json()['data']
+        activos = Producto.objects.activos()
+        self.assertEqual(data['total'], activos.filter(precio__gte=1000, stock__gt=0).count())
+        self.assertEqual(
+            data['disponibilidad']['agotado'], activos.filter(precio__gte=1000, stock=0).count(),
+        )
+        # Los rangos de precio ignoran el filtro de precio (faceta disyuntiva)
+        self.assertEqual(sum(r['count'] for r in data['precios']), activos.filter(stock__gt=0).count())
+
+    def test_facetas_categoria(self):
+        from apps.inventario.models import Producto
+
+        categoria = self.datos['categorias'][1]
+        response = self.assertPresupuesto('get', f'/api/v1/productos/facetas/?categoria={categoria.id}', 2)
+        data = response.json()['data']
+        self.assertEqual(data['total'], Producto.objects.activos().filter(categoria=categoria).count())
+        # Las demás categorías se siguen contando
+        self.assertEqual(
+            sum(c['count'] for c in data['categorias']), Producto.objects.activos().count(),
+        )
+
+    def test_facetas_filtro_invalido(self):
+        self.assertPresupuesto('get', '/api/v1/productos/facetas/?precio_min=abc', 0, status=400)
+
+    def test_disponibilidad(self):
+        productos = self.datos['productos']
+        con_oferta = productos[0]  # i % 4 == 0 → con precio_oferta
+        inactivo = productos[1]
+        inactivo.activo = False
+        inactivo.save()
+
+        url = (
+            f'/api/v1/productos/disponibilidad/?ids={con_oferta.id},{inactivo.id},999999'
+            f'&skus={productos[2].sku},NO-EXISTE'
+        )
+        response = self.assertPresupuesto('get', url, 1)
+
+        data = response.json()['data']
+        self.assertEqual(data['id'], sorted([con_oferta.id, inactivo.id, productos[2].id]))
+        fila = data['id'].index(con_oferta.id)
+        self.assertEqual(Decimal(data['precio_final'][fila]), con_oferta.precio_oferta)
+        self.assertEqual(data['stock'][fila], con_oferta.stock)
+        self.assertEqual(data['disponible'][fila], con_oferta.stock)
+        self.assertEqual(data['activo'][data['id'].index(inactivo.id)], False)
+        self.assertEqual(data['no_encontrados'], {'ids': [999999], 'skus': ['NO-EXISTE']})
+
+    def test_disponibilidad_descuenta_reservas(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from apps.inventario.models import Producto, ReservaStock
+
+        producto = self.datos['productos'][3]
+        Producto.objects.filter(pk=producto.pk).update(stock=3)
+        pendiente, otro = self.datos['pedidos_pendientes'][:2]
+        ReservaStock.objects.create(
+            pedido=pendiente, producto=producto, cantidad=3,
+            expires_at=timezone.now() + timedelta(minutes=30),
+        )
+        # Las reservas vencidas no cuentan
+        ReservaStock.objects.create(
+            pedido=otro, producto=producto, cantidad=2,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        response = self.assertPresupuesto('get', f'/api/v1/productos/disponibilidad/?ids={producto.id}', 1)
+        data = response.json()['data']
+        self.assertEqual((data['stock'], data['disponible'], data['en_stock']), ([3], [0], [False]))
+
+    def test_disponibilidad_invalida(self):
+        url = '/api/v1/productos/disponibilidad/'
+        self.assertPresupuesto('get', url, 0, status=400)
+        self.assertPresupuesto('get', f'{url}?ids=1,abc', 0, status=400)
+        demasiados = ','.join(str(i) for i in range(1, 302))
+        self.assertPresupuesto('get', f'{url}?ids={demasiados}', 0, status=400)
+
+    def test_relacionados(self):
+        from collections import Counter
+
+        from apps.inventario.recomendaciones import calcular_relacionados
+        from apps.ventas.models import ItemVenta
+
+        self.assertGreater(calcular_relacionados(), 0)
+
+        # El producto más vendido y su par más frecuente según las ventas
+        producto_id = Counter(ItemVenta.objects.values_list('producto_id', flat=True)).most_common(1)[0][0]
+        producto = next(p for p in self.datos['productos'] if p.id == producto_id)
+        ventas = set(ItemVenta.objects.filter(producto_id=producto_id).values_list('venta_id', flat=True))
+        pares = Counter(
+            ItemVenta.objects.filter(venta_id__in=ventas).exclude(producto_id=producto_id)
+            .values_list('producto_id', flat=True)
+        )
+
+        url = f'/api/v1/productos/{producto.slug}/relacionados/'
+        response = self.assertPresupuesto('get', url, 3)
+        ids = [p['id'] for p in response.json()['data']]
+        self.assertEqual(set(ids[:len(pares)]), set(pares))
+        self.assertNotIn(producto_id, ids)
+        self.assertEqual(len(ids), len(set(ids)))
+        # Segunda petición: servida desde la caché del catálogo
+        self.assertPresupuesto('get', url, 0)
+
+    def test_relacionados_sin_ventas_usa_categoria(self):
+        producto = self.datos['productos'][29]
+        response = self.assertPresupuesto('get', f'/api/v1/productos/{producto.slug}/relacionados/', 3)
+        data = response.json()['data']
+        self.assertTrue(data)
+        self.assertTrue(all(p['categoria'] == producto.categoria_id for p in data))
+
+    def test_destacados(self):
+        self.assertPresupuesto('get', '/api/v1/productos/destacados/', 1)
+
+    def test_categorias(self):
+        self.assertPresupuesto('get', '/api/v1/productos/categorias/', 1)
+
+    def test_detalle_producto(self):
+        producto = self.datos['productos'][0]
+        self.assertPresupuesto('get', f'/api/v1/productos/{producto.slug}/', 1)
+
+    def test_resenas_producto(self):
+        producto = self.datos['productos'][0]
+        response = self.assertPresupuesto('get', f'/api/v1/productos/{producto.slug}/resenas/?page_size=2', 1)
+        data = response.json()['data']
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+        self.assertPresupuesto('get', data['next'], 1)
+
+
+class DecrementoStockLoteTest(PresupuestoAPITestCase):
+    """Producto.objects.decrementar_stock_lote: una sentencia, todo o nada."""
+
+    def setUp(self):
+        super().setUp()
+        from apps.inventario.models import Producto
+
+        categoria = self.datos['categorias'][0]
+        self.a, self.b = (
+            Producto.objects.create(
+                nombre=f'Lote {i}', precio=Decimal('100.00'), sku=f'SKU-LOTE-{i}',
+                categoria=categoria, stock=3,
+            )
+            for i in range(2)
+        )
+
+    def stocks(self):
+        from apps.inventario.models import Producto
+
+        return list(Producto.objects.filter(pk__in=[self.a.pk, self.b.pk]).order_by('pk').values_list('stock', flat=True))
+
+    def test_decrementa_todo(self):
+        from apps.inventario.models import Producto
+
+        restantes = Producto.objects.decrementar_stock_lote({self.a.pk: 1, self.b.pk: 3})
+        self.assertEqual(restantes, {self.a.pk: 2, self.b.pk: 0})
+        self.assertEqual(self.stocks(), [2, 0])
+
+    def test_todo_o_nada(self):
+        from apps.inventario.models import Producto, StockInsuficienteError
+
+        with self.assertRaises(StockInsuficienteError) as ctx:
+            Producto.objects.decrementar_stock_lote({self.a.pk: 1, self.b.pk: 4})
+        self.assertEqual(
+            ctx.exception.fallidos,
+            [{'producto_id': self.b.pk, 'sku': 'SKU-LOTE-1', 'nombre': 'Lote 1', 'solicitado': 4, 'disponible': 3}],
+        )
+        self.assertEqual(ctx.exception.faltantes, [])
+        # El decremento de `a` se revirtió con el resto del lote
+        self.assertEqual(self.stocks(), [3, 3])
+
+    def test_producto_inexistente(self):
+        from apps.inventario.models import Producto, StockInsuficienteError
+
+        inexistente = self.b.pk + 1000
+        with self.assertRaises(StockInsuficienteError) as ctx:
+            Producto.objects.decrementar_stock_lote({self.a.pk: 1, inexistente: 1})
+        self.assertEqual(ctx.exception.fallidos, [])
+        self.assertEqual(ctx.exception.faltantes, [inexistente])
+        self.assertIn(f'Productos inexistentes: {inexistente}', str(ctx.exception))
+        self.assertEqual(self.stocks(), [3, 3])
+
+
+class CatalogoClientePresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['clientes'][0])
+
+    def test_crear_resena(self):
+        producto = self.datos['productos'][10]
+        self.assertPresupuesto(
+            'post', f'/api/v1/productos/{producto.slug}/resenas/crear/', 7, status=201,
+            data={'rating': 5, 'comentario': 'Excelente'},
+        )
+
+    def test_crear_resena_actualiza_rating(self):
+        from apps.inventario.models import Producto, Resena
+
+        producto = self.datos['productos'][10]
+        Resena.objects.create(producto=producto, usuario=self.datos['clientes'][1], rating=2)
+        self.client.post(
+            f'/api/v1/productos/{producto.slug}/resenas/crear/',
+            {'rating': 5, 'comentario': 'Excelente'}, format='json',
+        )
+        producto = Producto.objects.get(pk=producto.pk)
+        self.assertEqual(producto.resenas_count, 2)
+        self.assertEqual(str(producto.rating_promedio), '3.50')
+        self.assertEqual(producto.rating_histograma, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        resena = Resena.objects.get(producto=producto, usuario=self.datos['clientes'][1])
+        resena.rating = 4
+        resena.save()
+        resena.delete()
+        producto = Producto.objects.get(pk=producto.pk)
+        self.assertEqual(producto.resenas_count, 1)
+        self.assertEqual(str(producto.rating_promedio), '5.00')
+        self.assertEqual(producto.rating_histograma, {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1})
+
+    def test_agregados_no_derivan(self):
+        from django.contrib.auth import get_user_model
+
+        from apps.inventario.models import Producto, Resena
+
+        producto, otro = self.datos['productos'][11], self.datos['productos'][12]
+        clientes = self.datos['clientes']
+        for cliente, rating in zip(clientes[:3], (5, 4, 1)):
+            Resena.objects.create(producto=producto, usuario=cliente, rating=rating)
+
+        def agregados(p):
+            p = Producto.objects.get(pk=p.pk)
+            return p.resenas_count, str(p.rating_promedio), p.rating_histograma
+
+        # Cambio de producto: sale de uno y entra al otro
+        resena = Resena.objects.get(producto=producto, usuario=clientes[2])
+        resena.producto = otro
+        resena.save()
+        self.assertEqual(agregados(producto)[:2], (2, '4.50'))
+        self.assertEqual(agregados(otro)[:2], (1, '1.00'))
+
+        # QuerySet.delete() (como la acción masiva del admin) no llama a delete()
+        Resena.objects.filter(producto=producto, rating=4).delete()
+        self.assertEqual(agregados(producto), (1, '5.00', {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1}))
+
+        # Borrado en cascada al eliminar el usuario
+        usuario = get_user_model().objects.create_user(username='efimero', email='efimero@ocaso.test', password='x')
+        Resena.objects.create(producto=producto, usuario=usuario, rating=1)
+        self.assertEqual(agregados(producto)[:2], (2, '3.00'))
+        usuario.delete()
+        self.assertEqual(agregados(producto)[:2], (1, '5.00'))
+
+    def test_reconstruir_ratings(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from apps.inventario.models import Producto, Resena
+
+        producto = self.datos['productos'][13]
+        Resena.objects.create(producto=producto, usuario=self.datos['clientes'][0], rating=2)
+        Resena.objects.create(producto=producto, usuario=self.datos['clientes'][1], rating=3)
+        # update() no pasa por save(): los agregados quedan desfasados
+        Resena.objects.filter(producto=producto).update(rating=5)
+        Producto.objects.filter(pk=producto.pk).update(resenas_count=9)
+
+        salida = StringIO()
+        call_command('reconstruir_ratings', '--producto', str(producto.pk), stdout=salida)
+        self.assertIn('1 productos', salida.getvalue())
+        producto = Producto.objects.get(pk=producto.pk)
+        self.assertEqual(producto.resenas_count, 2)
+        self.assertEqual(str(producto.rating_promedio), '5.00')
+        self.assertEqual(producto.rating_histograma, {'1': 0, '2': 0, '3': 0, '4': 0, '5': 2})
+
+    def test_lista_deseos(self):
+        self.assertPresupuesto('get', '/api/v1/productos/lista-deseos/', 2)
+
+    def test_lista_deseos_agregar_quitar(self):
+        producto = self.datos['productos'][20]
+        self.assertPresupuesto(
+            'post', '/api/v1/productos/lista-deseos/', 6, status=201,
+            data={'producto_id': producto.id},
+        )
+        self.assertPresupuesto(
+            'delete', '/api/v1/productos/lista-deseos/', 2,
+            data={'producto_id': producto.id},
+        )
+
+
+class CatalogoAdminPresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['admin'])
+
+    def test_admin_listar_productos(self):
+        self.assertPresupuesto('get', '/api/v1/productos/admin/productos/', 3)
+
+    def test_admin_detalle_producto(self):
+        producto = self.datos['productos'][0]
+        self.assertPresupuesto('get', f'/api/v1/productos/admin/productos/{producto.id}/', 2)
+
+    def test_admin_crear_producto(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/productos/admin/productos/', 5, status=201,
+            data={
+                'nombre': 'Lámpara nueva', 'precio': '999.00', 'sku': 'SKU-NUEVO',
+                'categoria': self.datos['categorias'][0].id, 'stock': 5,
+            },
+        )
+
+    def test_admin_actualizar_producto(self):
+        producto = self.datos['productos'][1]
+        self.assertPresupuesto(
+            'patch', f'/api/v1/productos/admin/productos/{producto.id}/', 3,
+            data={'precio': '1234.00'},
+        )
+
+    def test_admin_eliminar_producto(self):
+        producto = self.datos['productos'][29]
+        self.assertPresupuesto('delete', f'/api/v1/productos/admin/productos/{producto.id}/', 3)
+
+    def test_admin_categorias(self):
+        self.assertPresupuesto('get', '/api/v1/productos/admin/categorias/', 2)
+
+    def test_admin_crear_categoria(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/productos/admin/categorias/', 3, status=201,
+            data={'nombre': 'Apliques'},
+        )
+
+    def test_admin_importar_productos(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from apps.inventario.models import Producto
+
+        existente = self.datos['productos'][1]
+        categoria = self.datos['categorias'][0]
+        filas = [
+            'sku,nombre,precio,precio_oferta,categoria,stock,materiales',
+            f'{existente.sku},,1500.00,,,,',
+            f'IMP-1,{existente.nombre},800.00,,{categoria.slug},4,"[""Vidrio""]"',
+            f'IMP-2,Lámpara importada,900.00,,{categoria.id},2,',
+            f'IMP-3,Lámpara importada,100.00,150.00,{categoria.id},1,',
+            'IMP-4,Sin categoría,100.00,,no-existe,1,',
+            f'IMP-1,Repetida,100.00,,{categoria.id},1,',
+        ]
+        archivo = SimpleUploadedFile('catalogo.csv', '\n'.join(filas).encode(), content_type='text/csv')
+        # Consultas constantes por lote, sin importar cuántas filas traiga
+        response = self.assertPresupuesto(
+            'post', '/api/v1/productos/admin/productos/importar/', 9,
+            data={'archivo': archivo}, format='multipart',
+        )
+        data = response.json()['data']
+        self.assertEqual((data['creados'], data['actualizados'], data['total_errores']), (2, 1, 3))
+        self.assertEqual([e['fila'] for e in data['errores']], [5, 6, 7])
+
+        existente.refresh_from_db()
+        self.assertEqual(str(existente.precio), '1500.00')
+        nuevo = Producto.objects.get(sku='IMP-1')
+        self.assertEqual(nuevo.materiales, ['Vidrio'])
+        self.assertNotEqual(nuevo.slug, existente.slug)
+        self.assertTrue(nuevo.slug.startswith(existente.slug))
+        self.assertEqual(Producto.objects.get(sku='IMP-2').slug, 'lampara-importada')
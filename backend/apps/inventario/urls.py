@@ -16,13 +16,17 @@ router.register('productos', views.ProductoAdminViewSet, basename='admin-product
 urlpatterns = [
     # Endpoints públicos (solo lectura)
     path('', views.ProductoListView.as_view(), name='producto-list'),
+    path('facetas/', views.ProductoFacetasView.as_view(), name='producto-facetas'),
+    path('disponibilidad/', views.ProductoDisponibilidadView.as_view(), name='producto-disponibilidad'),
     path('destacados/', views.ProductoDestacadosView.as_view(), name='producto-destacados'),
     path('categorias/', views.CategoriaListView.as_view(), name='categoria-list'),
     path('lista-deseos/', views.ListaDeseosView.as_view(), name='lista-deseos'),
     path('<slug:slug>/resenas/', views.ProductoResenasListView.as_view(), name='producto-resenas'),
+    path('<slug:slug>/relacionados/', views.ProductoRelacionadosView.as_view(), name='producto-relacionados'),
     path('<slug:slug>/resenas/crear/', views.CrearResenaView.as_view(), name='crear-resena'),
     path('<slug:slug>/', views.ProductoDetailView.as_view(), name='producto-detail'),
 
     # Endpoints admin (CRUD completo)
+    path('admin/productos/importar/', views.AdminImportarProductosView.as_view(), name='admin-producto-importar'),
     path('admin/', include(router.urls)),
 ]
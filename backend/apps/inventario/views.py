@@ -2,8 +2,11 @@
 Vistas de la app de inventario.
 Endpoints públicos (solo lectura) y endpoints admin (CRUD completo).
 """
+import csv
+
 from django.db.models import Count, Q
 from rest_framework import generics, viewsets, permissions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -12,25 +15,35 @@ from .serializers import (
     CategoriaSerializer,
     CategoriaAdminSerializer,
     CrearResenaSerializer,
+    DisponibilidadQuerySerializer,
+    ImportarProductosSerializer,
     ListaDeseosSerializer,
     ProductoListSerializer,
     ProductoDetailSerializer,
     ProductoAdminSerializer,
     ResenaSerializer,
 )
+from .cache import CatalogoCacheMixin
+from .disponibilidad import consultar_disponibilidad
+from .facetas import calcular_facetas
+from .importacion import detectar_formato, importar_productos, leer_filas
+from .recomendaciones import obtener_relacionados
 from .filters import ProductoFilter
 from utils.mixins import StandardResponseMixin
+from utils.pagination import CursorResultsPagination
 
 
 # ──────────────────────────────────────────────
 # ENDPOINTS PÚBLICOS (solo lectura)
 # ──────────────────────────────────────────────
 
-class CategoriaListView(StandardResponseMixin, generics.ListAPIView):
+class CategoriaListView(CatalogoCacheMixin, StandardResponseMixin, generics.ListAPIView):
     """
     GET /api/v1/productos/categorias/
     Lista todas las categorías activas con conteo de productos.
+    Respuesta cacheada (caché versionada del catálogo).
     """
+    cache_prefijo = 'categorias'
     serializer_class = CategoriaSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None  # Categorías sin paginar
@@ -44,27 +57,77 @@ class CategoriaListView(StandardResponseMixin, generics.ListAPIView):
         )
 
 
-class ProductoListView(generics.ListAPIView):
+class ProductoListView(CatalogoCacheMixin, generics.ListAPIView):
     """
     GET /api/v1/productos/
     Lista productos activos con filtros, búsqueda y paginación.
+    La búsqueda (?q= / ?search=) usa texto completo vía ProductoFilter;
+    sin ?ordering los resultados se ordenan por relevancia.
+    Respuesta cacheada por combinación de query params.
     """
+    cache_prefijo = 'productos'
     serializer_class = ProductoListSerializer
     permission_classes = [permissions.AllowAny]
     filterset_class = ProductoFilter
-    search_fields = ['nombre', 'descripcion', 'sku']
     ordering_fields = ['precio', 'nombre', 'created_at']
-    ordering = ['-created_at']
+    # El orden por relevancia no admite cursor (ver CursorResultsPagination)
+    parametros_sin_cursor = ('q', 'search')
 
     def get_queryset(self):
         return Producto.objects.activos().select_related('categoria')
 
 
-class ProductoDetailView(StandardResponseMixin, generics.RetrieveAPIView):
+class ProductoFacetasView(CatalogoCacheMixin, generics.ListAPIView):
+    """
+    GET /api/v1/productos/facetas/
+    Cuentas por categoría, rango de precio y disponibilidad para la misma
+    selección de filtros que el listado (ver facetas.py). Una sola consulta
+    agregada; respuesta cacheada por combinación de query params.
+    """
+    cache_prefijo = 'facetas'
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'message': 'OK',
+            'data': calcular_facetas(request.query_params),
+            'errors': None,
+        })
+
+
+class ProductoDisponibilidadView(generics.ListAPIView):
+    """
+    GET /api/v1/productos/disponibilidad/?ids=1,2,3&skus=LMP-001
+    precio_final, stock, disponible (descontando reservas vigentes), en_stock
+    y activo de varios productos en una sola consulta, en formato columnar
+    (ver disponibilidad.py). Sin caché: el
+    carrito revalida contra el stock actual, que no invalida la caché del
+    catálogo en cada venta.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request, *args, **kwargs):
+        serializer = DisponibilidadQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'success': True,
+            'message': 'OK',
+            'data': consultar_disponibilidad(
+                serializer.validated_data.get('ids', []),
+                serializer.validated_data.get('skus', []),
+            ),
+            'errors': None,
+        })
+
+
+class ProductoDetailView(CatalogoCacheMixin, StandardResponseMixin, generics.RetrieveAPIView):
     """
     GET /api/v1/productos/<slug>/
     Detalle de un producto activo por su slug.
+    Respuesta cacheada (caché versionada del catálogo).
     """
+    cache_prefijo = 'producto-detalle'
     serializer_class = ProductoDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
@@ -73,11 +136,13 @@ class ProductoDetailView(StandardResponseMixin, generics.RetrieveAPIView):
         return Producto.objects.activos().select_related('categoria')
 
 
-class ProductoDestacadosView(StandardResponseMixin, generics.ListAPIView):
+class ProductoDestacadosView(CatalogoCacheMixin, StandardResponseMixin, generics.ListAPIView):
     """
     GET /api/v1/productos/destacados/
     Lista productos destacados (para homepage).
+    Respuesta cacheada (caché versionada del catálogo).
     """
+    cache_prefijo = 'destacados'
     serializer_class = ProductoListSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None  # Sin paginar, son pocos
@@ -86,6 +151,25 @@ class ProductoDestacadosView(StandardResponseMixin, generics.ListAPIView):
         return Producto.objects.destacados().select_related('categoria')[:12]
 
 
+class ProductoRelacionadosView(CatalogoCacheMixin, StandardResponseMixin, generics.ListAPIView):
+    """
+    GET /api/v1/productos/<slug>/relacionados/
+    Productos "comprados juntos" precalculados (calcular_relacionados), con
+    respaldo de la misma categoría. Respuesta cacheada.
+    """
+    cache_prefijo = 'relacionados'
+    serializer_class = ProductoListSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None  # Sin paginar: a lo sumo RECOMENDACIONES_TOP_K
+    filter_backends = []
+
+    def get_queryset(self):
+        producto = generics.get_object_or_404(
+            Producto.objects.activos().only('id', 'categoria_id'), slug=self.kwargs['slug'],
+        )
+        return obtener_relacionados(producto)
+
+
 # ──────────────────────────────────────────────
 # ENDPOINTS ADMIN (CRUD completo)
 # ──────────────────────────────────────────────
@@ -115,15 +199,65 @@ class ProductoAdminViewSet(StandardResponseMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAdminUser]
     queryset = Producto.objects.select_related('categoria').all()
     filterset_class = ProductoFilter
-    search_fields = ['nombre', 'descripcion', 'sku']
     ordering_fields = ['precio', 'nombre', 'stock', 'created_at']
 
     def perform_destroy(self, instance):
-        """Soft delete: marca como inactivo en lugar de eliminar."""
+        """
+        Soft delete: marca como inactivo en lugar de eliminar.
+        Producto.save() invalida la caché del catálogo.
+        """
         instance.activo = False
         instance.save(update_fields=['activo'])
 
 
+class AdminImportarProductosView(APIView):
+    """
+    POST /api/v1/productos/admin/productos/importar/  (multipart)
+    Importación masiva de productos con upsert por SKU (solo admin).
+    Espera: archivo=<.csv|.jsonl> y opcionalmente formato=csv|jsonl.
+    Las filas con error no detienen la importación; se reportan las
+    primeras MAX_ERRORES_REPORTADOS.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    MAX_ERRORES_REPORTADOS = 100
+
+    def post(self, request):
+        serializer = ImportarProductosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        archivo = serializer.validated_data['archivo']
+        formato = serializer.validated_data.get('formato') or detectar_formato(archivo.name)
+
+        try:
+            resultado = importar_productos(leer_filas(archivo, formato))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': f'No se pudo leer el archivo: {e}',
+                    'data': None,
+                    'errors': None,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errores = resultado.pop('errores')
+        return Response(
+            {
+                'success': True,
+                'message': 'Importación completada.',
+                'data': {
+                    **resultado,
+                    'total_errores': len(errores),
+                    'errores': errores[:self.MAX_ERRORES_REPORTADOS],
+                },
+                'errors': None,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 # ──────────────────────────────────────────────
 # RESEÑAS
 # ──────────────────────────────────────────────
@@ -131,11 +265,13 @@ class ProductoAdminViewSet(StandardResponseMixin, viewsets.ModelViewSet):
 class ProductoResenasListView(StandardResponseMixin, generics.ListAPIView):
     """
     GET /api/v1/productos/<slug>/resenas/
-    Lista reseñas de un producto. Acceso público.
+    Lista reseñas de un producto (más recientes primero). Acceso público.
+    Paginada por cursor: el promedio, el total y el histograma vienen ya
+    agregados en el detalle del producto.
     """
     serializer_class = ResenaSerializer
     permission_classes = [permissions.AllowAny]
-    pagination_class = None
+    pagination_class = CursorResultsPagination
 
     def get_queryset(self):
         return (
@@ -197,7 +333,9 @@ class ListaDeseosView(APIView):
                 {'success': False, 'message': 'producto_id requerido.', 'data': None, 'errors': None},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        producto = generics.get_object_or_404(Producto.objects.activos(), pk=producto_id)
+        producto = generics.get_object_or_404(
+            Producto.objects.activos().select_related('categoria'), pk=producto_id
+        )
         item, created = ListaDeseos.objects.get_or_create(
             usuario=request.user, producto=producto
         )
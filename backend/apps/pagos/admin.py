@@ -3,7 +3,22 @@ Configuración del admin de Django para el modelo Pago.
 """
 from django.contrib import admin
 
-from .models import Pago
+from .models import NotificacionWebhook, Pago
+
+
+class PostPagoFilter(admin.SimpleListFilter):
+    """Pagos aprobados cuyo pedido no llegó a marcarse como pagado."""
+    title = 'post-pago'
+    parameter_name = 'post_pago'
+
+    def lookups(self, request, model_admin):
+        return [('pendiente', 'Post-pago pendiente')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'pendiente':
+            from .servicios.post_pago_service import pagos_sin_procesar
+            return queryset.filter(id__in=pagos_sin_procesar().values('id'))
+        return queryset
 
 
 @admin.register(Pago)
@@ -12,7 +27,7 @@ class PagoAdmin(admin.ModelAdmin):
         'id', 'pedido', 'usuario', 'estado', 'monto',
         'metodo', 'mercadopago_payment_id', 'created_at',
     ]
-    list_filter = ['estado', 'metodo', 'created_at']
+    list_filter = ['estado', PostPagoFilter, 'metodo', 'created_at']
     search_fields = [
         'mercadopago_preference_id', 'mercadopago_payment_id',
         'pedido__numero_pedido', 'usuario__email',
@@ -41,3 +56,18 @@ class PagoAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
         }),
     )
+
+
+@admin.register(NotificacionWebhook)
+class NotificacionWebhookAdmin(admin.ModelAdmin):
+    list_display = [
+        'data_id', 'topic', 'estado', 'recibidas', 'intentos',
+        'proximo_intento', 'created_at', 'procesada_at',
+    ]
+    list_filter = ['estado', 'topic']
+    search_fields = ['data_id']
+    readonly_fields = [
+        'data_id', 'topic', 'recibidas', 'intentos', 'ultimo_error',
+        'created_at', 'updated_at', 'procesada_at',
+    ]
+    ordering = ['-created_at']
@@ -0,0 +1,23 @@
+"""
+Management command: procesar_webhooks
+
+Consume la bandeja de notificaciones de Mercado Pago (NotificacionWebhook):
+consulta el pago en MP, actualiza el Pago local y ejecuta el post-pago.
+Los errores se reintentan con backoff exponencial.
+
+Se pueden correr varios workers en paralelo (SKIP LOCKED).
+
+Uso:
+    python manage.py procesar_webhooks                 # un lote y termina (cron)
+    python manage.py procesar_webhooks --continuo      # worker de larga duración
+    python manage.py procesar_webhooks --lote 50 --intervalo 2
+"""
+from utils.bandeja import ComandoBandeja
+
+
+class Command(ComandoBandeja):
+    help = 'Procesa las notificaciones de Mercado Pago encoladas por el webhook.'
+    procesar = 'apps.pagos.servicios.webhook_service.procesar_pendientes'
+    nombre = 'Webhooks'
+    etiquetas = [('procesada', 'procesadas'), ('reintento', 'reintento'), ('fallida', 'fallidas')]
+    lote = 20
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0002_alter_pago_usuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_id', models.CharField(max_length=255, unique=True, verbose_name='MP data ID')),
+                ('topic', models.CharField(default='payment', max_length=50, verbose_name='tipo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesada', 'Procesada'), ('fallida', 'Fallida')], default='pendiente', max_length=20, verbose_name='estado')),
+                ('recibidas', models.PositiveIntegerField(default=1, verbose_name='notificaciones recibidas')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='intentos')),
+                ('proximo_intento', models.DateTimeField(verbose_name='próximo intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='fecha de recepción')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='fecha de actualización')),
+                ('procesada_at', models.DateTimeField(blank=True, null=True, verbose_name='fecha de procesamiento')),
+            ],
+            options={
+                'verbose_name': 'notificación de webhook',
+                'verbose_name_plural': 'notificaciones de webhook',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='pagos_notif_estado_bcc8fe_idx')],
+            },
+        ),
+    ]
@@ -86,3 +86,46 @@ class Pago(models.Model):
 
     def __str__(self):
         return f'Pago {self.id} - {self.get_estado_display()} - ${self.monto}'
+
+
+class NotificacionWebhook(models.Model):
+    """
+    Bandeja de entrada de notificaciones de Mercado Pago.
+    El webhook solo registra la notificación verificada; el comando
+    `procesar_webhooks` la procesa fuera del request.
+    Una fila por data_id: las notificaciones repetidas se fusionan
+    (se incrementa `recibidas` y se vuelve a encolar).
+    """
+
+    class EstadoChoices(models.TextChoices):
+        PENDIENTE = 'pendiente', _('Pendiente')
+        PROCESADA = 'procesada', _('Procesada')
+        FALLIDA = 'fallida', _('Fallida')
+
+    data_id = models.CharField(_('MP data ID'), max_length=255, unique=True)
+    topic = models.CharField(_('tipo'), max_length=50, default='payment')
+    estado = models.CharField(
+        _('estado'),
+        max_length=20,
+        choices=EstadoChoices.choices,
+        default=EstadoChoices.PENDIENTE,
+    )
+    recibidas = models.PositiveIntegerField(_('notificaciones recibidas'), default=1)
+    intentos = models.PositiveIntegerField(_('intentos'), default=0)
+    proximo_intento = models.DateTimeField(_('próximo intento'))
+    ultimo_error = models.TextField(_('último error'), blank=True, default='')
+
+    created_at = models.DateTimeField(_('fecha de recepción'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('fecha de actualización'), auto_now=True)
+    procesada_at = models.DateTimeField(_('fecha de procesamiento'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('notificación de webhook')
+        verbose_name_plural = _('notificaciones de webhook')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        return f'Webhook {self.topic} {self.data_id} - {self.get_estado_display()}'
@@ -0,0 +1,171 @@
+"""
+Cliente HTTP compartido para Mercado Pago.
+
+  - Una sola requests.Session por proceso (pool keep-alive), reutilizada por
+    el SDK y por las llamadas directas a la Payment API.
+  - Timeouts de conexión/lectura acotados: una respuesta lenta de MP no puede
+    bloquear un worker de gunicorn durante los 120 s de su timeout.
+  - Reintentos acotados con backoff ante errores de red y 429/5xx. Los
+    métodos idempotentes (GET, PUT, DELETE...) se reintentan siempre; POST y
+    PATCH solo si viajan con X-Idempotency-Key (MP los deduplica). Cada
+    política usa su propia Session.
+  - Latencia por llamada: se registra en el log, en la métrica
+    clarte_mercadopago_request_seconds (/metrics) y en el Server-Timing de
+    la request en curso.
+"""
+import logging
+import threading
+import time
+
+import mercadopago
+import requests
+from django.conf import settings
+from mercadopago.http import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from utils.instrumentacion import medir_externo
+from utils.metricas import MERCADOPAGO_LLAMADAS
+
+logger = logging.getLogger('clarte')
+
+API_URL = 'https://api.mercadopago.com'
+STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_sessions = {}
+_sdk = None
+_sdk_token = None
+
+
+def _timeout():
+    return (settings.MERCADOPAGO_TIMEOUT_CONEXION, settings.MERCADOPAGO_TIMEOUT_LECTURA)
+
+
+def obtener_session(idempotente=False):
+    """
+    Retorna la Session compartida (se crea en el primer uso). Con
+    `idempotente` sus reintentos incluyen POST/PATCH: solo para peticiones
+    con X-Idempotency-Key.
+    """
+    session = _sessions.get(idempotente)
+    if session is None:
+        with _lock:
+            session = _sessions.get(idempotente)
+            if session is None:
+                reintentos = Retry(
+                    total=settings.MERCADOPAGO_MAX_REINTENTOS,
+                    backoff_factor=0.3,
+                    status_forcelist=STATUS_REINTENTABLES,
+                    allowed_methods=None if idempotente else Retry.DEFAULT_ALLOWED_METHODS,
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.MERCADOPAGO_POOL_SIZE,
+                    max_retries=reintentos,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                _sessions[idempotente] = session
+    return session
+
+
+def _con_clave_idempotencia(headers):
+    return any(nombre.lower() == 'x-idempotency-key' for nombre in (headers or {}))
+
+
+def _registrar(operacion, inicio, status_code=None, error=None):
+    """Registra la latencia de una llamada en el log y en las métricas."""
+    duracion = time.perf_counter() - inicio
+    fallida = error is not None or (status_code or 0) >= 400
+    MERCADOPAGO_LLAMADAS.observar(duracion, operacion=operacion, resultado='error' if fallida else 'ok')
+    if error is not None:
+        logger.warning('MP %s falló tras %.0f ms: %s', operacion, duracion * 1000, error)
+    else:
+        logger.info('MP %s → %s en %.0f ms', operacion, status_code, duracion * 1000)
+
+
+def _operacion(method, url):
+    """'POST /v1/payments' — sin ids para no fragmentar las métricas."""
+    ruta = url.replace(API_URL, '').split('?')[0]
+    partes = ['{id}' if p.isdigit() else p for p in ruta.split('/')]
+    return f"{method.upper()} {'/'.join(partes)}"
+
+
+def solicitar(method, url, **kwargs):
+    """
+    Ejecuta una petición con la Session compartida, el timeout configurado
+    y registro de latencia. Propaga requests.RequestException.
+    """
+    kwargs.setdefault('timeout', _timeout())
+    operacion = _operacion(method, url)
+    inicio = time.perf_counter()
+    try:
+        with medir_externo('mp'):
+            session = obtener_session(idempotente=_con_clave_idempotencia(kwargs.get('headers')))
+            respuesta = session.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        _registrar(operacion, inicio, error=e)
+        raise
+    _registrar(operacion, inicio, status_code=respuesta.status_code)
+    return respuesta
+
+
+class ClienteHttpMP(HttpClient):
+    """
+    Transporte del SDK de Mercado Pago sobre la Session compartida.
+    Ignora el timeout (60 s) y los reintentos propios del SDK en favor de
+    los configurados en settings.
+    """
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        kwargs['timeout'] = _timeout()
+        respuesta = solicitar(method, url, **kwargs)
+        resultado = {'status': respuesta.status_code, 'response': None}
+        if respuesta.status_code != 204 and respuesta.content:
+            try:
+                resultado['response'] = respuesta.json()
+            except ValueError:
+                logger.error('MP respondió JSON inválido (%s %s).', method, url)
+        return resultado
+
+
+def obtener_sdk():
+    """
+    Retorna la instancia compartida del SDK (se recrea si cambia el token).
+    Lanza ValueError si MERCADOPAGO_ACCESS_TOKEN no está configurado.
+    """
+    global _sdk, _sdk_token
+    access_token = settings.MERCADOPAGO_ACCESS_TOKEN
+    if not access_token:
+        raise ValueError('MERCADOPAGO_ACCESS_TOKEN no configurado.')
+    if _sdk is None or _sdk_token != access_token:
+        with _lock:
+            if _sdk is None or _sdk_token != access_token:
+                _sdk = mercadopago.SDK(access_token, http_client=ClienteHttpMP())
+                _sdk_token = access_token
+    return _sdk
+
+
+def crear_pago(payment_data, idempotency_key):
+    """
+    POST /v1/payments (Payment API). Retorna (status_code, body_dict).
+    Propaga requests.RequestException si MP no responde tras los reintentos.
+    """
+    respuesta = solicitar(
+        'POST',
+        f'{API_URL}/v1/payments',
+        json=payment_data,
+        headers={
+            'Authorization': f'Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}',
+            'Content-Type': 'application/json',
+            'X-Idempotency-Key': idempotency_key,
+        },
+    )
+    try:
+        body = respuesta.json()
+    except ValueError:
+        body = {}
+    return respuesta.status_code, body
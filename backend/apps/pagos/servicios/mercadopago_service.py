@@ -2,17 +2,24 @@
 Servicio de integración con Mercado Pago.
 Encapsula la creación de preferencias y el procesamiento de webhooks.
 Toda la lógica de MP vive aquí, NO en las views.
+
+Un pago aprobado solo guarda su estado y publica el evento pago.aprobado
+en la misma transacción; el post-pago (stock, pedido, venta, emails) corre
+después del commit, sin el lock del Pago (ver post_pago_service).
 """
 import hashlib
 import hmac
 import logging
 
-import mercadopago
+import requests
 from django.conf import settings
 from django.db import transaction
 
+from apps.common.servicios.eventos import PAGO_APROBADO, despachar_al_confirmar, publicar_evento
 from apps.pagos.models import Pago
+from apps.pagos.servicios import mercadopago_client
 from apps.pedidos.models import Pedido
+from utils.metricas import PAGOS
 
 logger = logging.getLogger('clarte')
 
@@ -28,11 +35,16 @@ MP_STATUS_MAP = {
 
 
 def _get_sdk():
-    """Retorna una instancia del SDK de Mercado Pago."""
-    access_token = settings.MERCADOPAGO_ACCESS_TOKEN
-    if not access_token:
-        raise ValueError('MERCADOPAGO_ACCESS_TOKEN no configurado.')
-    return mercadopago.SDK(access_token)
+    """Retorna la instancia compartida del SDK de Mercado Pago (pool + timeouts)."""
+    return mercadopago_client.obtener_sdk()
+
+
+def _publicar_pago_aprobado(pago):
+    """
+    Publica pago.aprobado dentro de la transacción que aprueba el pago y lo
+    despacha en este proceso en cuanto se confirma.
+    """
+    despachar_al_confirmar(publicar_evento(PAGO_APROBADO, pago_id=pago.id))
 
 
 def crear_preferencia(pedido, usuario):
@@ -130,8 +142,8 @@ def procesar_pago_card(pedido, usuario, card_data):
     Flujo:
       1. Crear registro de Pago local (estado pendiente).
       2. Llamar a la Payment API de MP con el token del Brick.
-      3. Actualizar el Pago local con la respuesta.
-      4. Si es aprobado, ejecutar post-pago.
+      3. Actualizar el Pago local con la respuesta; si es aprobado, publicar
+         pago.aprobado (el post-pago corre al confirmarse).
 
     Retorna dict con status, status_detail, pago_id.
     """
@@ -189,20 +201,15 @@ def procesar_pago_card(pedido, usuario, card_data):
     }
 
     # 3. Crear pago en MP (llamada directa para obtener respuesta completa)
-    import requests as http_requests
-    access_token = settings.MERCADOPAGO_ACCESS_TOKEN
-
-    mp_response = http_requests.post(
-        'https://api.mercadopago.com/v1/payments',
-        json=payment_data,
-        headers={
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-            'X-Idempotency-Key': f'pago-{pago.id}',
-        },
-    )
-    response_status = mp_response.status_code
-    payment_response = mp_response.json()
+    try:
+        response_status, payment_response = mercadopago_client.crear_pago(
+            payment_data, idempotency_key=f'pago-{pago.id}',
+        )
+    except requests.RequestException as e:
+        # MP pudo haber cobrado: se conserva el Pago pendiente para que el
+        # webhook lo concilie por external_reference.
+        logger.error('Mercado Pago no respondió para pago_id=%s: %s', pago.id, e)
+        raise ValueError('Mercado Pago no respondió a tiempo. Verificaremos el estado de tu pago.')
 
     if response_status not in [200, 201]:
         pago.delete()
@@ -218,21 +225,17 @@ def procesar_pago_card(pedido, usuario, card_data):
     pago.estado_detalle = payment_response.get('status_detail', '')
     pago.metodo = payment_response.get('payment_method_id', '')
     pago.raw_response = payment_response
-    pago.save()
+    with transaction.atomic():
+        pago.save()
+        if nuevo_estado == Pago.EstadoChoices.APROBADO:
+            _publicar_pago_aprobado(pago)
+    PAGOS.inc(estado=nuevo_estado, origen='card')
 
     logger.info(
         'Pago card procesado: pago_id=%s, mp_status=%s, pedido=%s',
         pago.id, mp_status, pedido.numero_pedido,
     )
 
-    # 5. Si es aprobado, ejecutar post-pago
-    if nuevo_estado == Pago.EstadoChoices.APROBADO:
-        from apps.pagos.servicios.post_pago_service import procesar_post_pago
-        try:
-            procesar_post_pago(pago)
-        except Exception as e:
-            logger.error('Error en post-pago para pago %s: %s', pago.id, e, exc_info=True)
-
     return {
         'status': mp_status,
         'status_detail': payment_response.get('status_detail', ''),
@@ -277,8 +280,10 @@ def procesar_notificacion_webhook(data_id):
     Flujo:
       1. Consultar el pago en la API de MP.
       2. Buscar el Pago local por external_reference.
-      3. Actualizar estado del Pago (idempotente).
-      4. Si es aprobado, delegar al servicio post-pago.
+      3. Actualizar estado del Pago (idempotente); si es aprobado, publicar
+         pago.aprobado en la misma transacción.
+      4. Al confirmarse (ya sin el lock del Pago), el post-pago corre en
+         este proceso; si falla, lo reintenta despachar_eventos.
 
     Retorna dict con resultado del procesamiento.
     """
@@ -299,7 +304,7 @@ def procesar_notificacion_webhook(data_id):
     mp_status = payment_data.get('status', '')
     nuevo_estado = MP_STATUS_MAP.get(mp_status, Pago.EstadoChoices.PENDIENTE)
 
-    # 2. Actualizar Pago local (atómico + lock)
+    # 2. Actualizar Pago local (atómico + lock: solo el estado del pago)
     with transaction.atomic():
         pago = Pago.objects.select_for_update().get(id=int(external_reference))
 
@@ -321,21 +326,12 @@ def procesar_notificacion_webhook(data_id):
         estado_anterior = pago.estado
         pago.estado = nuevo_estado
         pago.save()
-
-        logger.info(
-            'Pago %s actualizado: %s → %s (MP payment: %s)',
-            pago.id, estado_anterior, nuevo_estado, data_id,
-        )
-
-        # 3. Si es aprobado, ejecutar procesamiento post-pago
         if nuevo_estado == Pago.EstadoChoices.APROBADO:
-            from apps.pagos.servicios.post_pago_service import procesar_post_pago
-            try:
-                procesar_post_pago(pago)
-            except ValueError as e:
-                logger.warning('Error de negocio en post-pago: %s', e)
-            except Exception as e:
-                # No revertimos el pago (MP ya cobró), pero alertamos
-                logger.error('Error crítico en post-pago para pago %s: %s', pago.id, e, exc_info=True)
+            _publicar_pago_aprobado(pago)
 
+    PAGOS.inc(estado=nuevo_estado, origen='webhook')
+    logger.info(
+        'Pago %s actualizado: %s → %s (MP payment: %s)',
+        pago.id, estado_anterior, nuevo_estado, data_id,
+    )
     return {'action': 'updated', 'estado_anterior': estado_anterior, 'nuevo_estado': nuevo_estado}
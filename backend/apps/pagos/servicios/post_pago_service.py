@@ -1,51 +1,82 @@
 """
 Servicio post-pago.
-Se ejecuta tras confirmar un pago aprobado en Mercado Pago.
-Responsabilidades:
-  1. Decrementar inventario (vía servicio de pedidos).
-  2. Crear registro de Venta (snapshot).
-  3. Enviar email de confirmación vía Brevo.
+Se ejecuta tras confirmar un pago aprobado en Mercado Pago, en etapas que
+se comunican por eventos de dominio (apps/common/servicios/eventos.py):
+
+  1. Estado del pago: mercadopago_service guarda el Pago aprobado y publica
+     pago.aprobado (transacción corta con el lock del Pago).
+  2. Stock y pedido: procesar_pago_aprobado, suscriptor de pago.aprobado,
+     decrementa el inventario y marca el pedido como pagado (vía servicio
+     de pedidos), lo que publica pedido.pagado. Corre al confirmarse la
+     etapa 1, en el mismo proceso, o en despachar_eventos si falla.
+  3. Venta, uso del cupón y notificación: suscriptores de pedido.pagado
+     (settings.EVENTOS_SUSCRIPTORES) en el worker despachar_eventos.
+     notificar_pedido_pagado encola el email de confirmación (lo entrega
+     el comando enviar_emails).
+
+Cada etapa es su propia transacción: un webhook no retiene el lock de su
+Pago mientras se procesa el pedido, y las notificaciones no retrasan los
+webhooks de otros pedidos.
+
+Si la etapa 2 agota sus reintentos (p. ej. stock insuficiente) el pedido
+queda pendiente con el pago cobrado: expirar_pedidos no lo cancela, la
+métrica clarte_pagos_aprobados_sin_procesar lo cuenta y el admin de pagos
+lo lista con el filtro "Post-pago pendiente".
 """
 import logging
 
+from django.conf import settings
+
+from apps.pagos.models import Pago
+from apps.pedidos.models import Pedido
 from apps.pedidos.services import procesar_pedido_pagado
 
 logger = logging.getLogger('clarte')
 
 
-def procesar_post_pago(pago):
-    """
-    Orquesta las acciones posteriores a un pago aprobado.
-    Recibe la instancia de Pago ya actualizada como aprobado.
+def pagos_sin_procesar():
+    """Pagos aprobados cuyo pedido sigue pendiente."""
+    return Pago.objects.filter(
+        estado=Pago.EstadoChoices.APROBADO,
+        pedido__estado=Pedido.EstadoChoices.PENDIENTE,
+    )
+
+
+def contar_pagos_sin_procesar():
+    return pagos_sin_procesar().count()
 
-    Pasos:
-      1. Procesar pedido pagado (decrementa stock, cambia estado).
-      2. Crear registro de venta (se implementará en app ventas).
-      3. Enviar email de confirmación (se implementará en app common).
+
+def procesar_pago_aprobado(evento):
+    """
+    Suscriptor de pago.aprobado: decrementa el stock y marca el pedido como
+    pagado (idempotente: un pedido ya pagado no se reprocesa).
+    Lanza ValueError si el pedido no puede marcarse como pagado
+    (p. ej. stock insuficiente); el evento queda para reintento.
     """
+    pago = Pago.objects.select_related('pedido').get(id=evento.payload['pago_id'])
     pedido = pago.pedido
     if not pedido:
         logger.error('Pago %s aprobado pero sin pedido asociado.', pago.id)
         return
 
-    # 1. Decrementar inventario y marcar pedido como pagado
     resultado = procesar_pedido_pagado(pedido.id)
     logger.info(
         'Post-pago completado para pedido %s: %s',
         pedido.numero_pedido, resultado.get('message', ''),
     )
 
-    # 2. Crear registro de venta
-    try:
-        from apps.ventas.services import crear_venta_desde_pedido
-        crear_venta_desde_pedido(pedido)
-    except Exception as e:
-        logger.error('Error al crear venta para pedido %s: %s', pedido.numero_pedido, e)
-
-    # 3. Email de confirmación de pedido
-    try:
-        from apps.common.servicios.brevo_service import enviar_confirmacion_pedido
-        enviar_confirmacion_pedido(pedido, pago)
-        logger.info('Email de confirmación enviado para pedido %s', pedido.numero_pedido)
-    except Exception as e:
-        logger.error('Error al enviar email de confirmación para pedido %s: %s', pedido.numero_pedido, e)
+
+def notificar_pedido_pagado(evento):
+    """
+    Suscriptor de pedido.pagado: encola el email de confirmación (solo un
+    INSERT en la bandeja, sin llamada a Brevo).
+    """
+    from apps.common.servicios.brevo_service import enviar_confirmacion_pedido
+
+    pedido = Pedido.objects.select_related('usuario', 'pago').get(id=evento.payload['pedido_id'])
+    if not settings.BREVO_TEMPLATE_PEDIDO:
+        # Reintentar no lo resolvería: se registra y el evento sigue su curso
+        logger.error('Email de confirmación del pedido %s omitido: template no configurado.', pedido.numero_pedido)
+        return
+    enviar_confirmacion_pedido(pedido, getattr(pedido, 'pago', None))
+    logger.info('Email de confirmación encolado para pedido %s', pedido.numero_pedido)
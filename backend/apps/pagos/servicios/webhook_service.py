@@ -0,0 +1,102 @@
+"""
+Bandeja de entrada de webhooks de Mercado Pago.
+
+El webhook solo encola (una consulta, sin llamadas salientes) y responde 200;
+el comando `procesar_webhooks` consume la bandeja:
+  - Reclama un lote con SELECT ... FOR UPDATE SKIP LOCKED (varios workers
+    pueden correr en paralelo sin pisarse).
+  - Las notificaciones repetidas del mismo data_id se fusionan en una fila.
+  - Los errores se reintentan con backoff exponencial hasta WEBHOOK_MAX_INTENTOS
+    (reclamo y reintentos: utils/bandeja.py).
+"""
+import logging
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.pagos.models import NotificacionWebhook
+from utils.bandeja import Bandeja
+from utils.metricas import WEBHOOKS
+
+logger = logging.getLogger('clarte')
+
+bandeja = Bandeja(
+    NotificacionWebhook, 'WEBHOOK',
+    pendiente=NotificacionWebhook.EstadoChoices.PENDIENTE,
+    fallido=NotificacionWebhook.EstadoChoices.FALLIDA,
+    describir=lambda notificacion: f'Webhook {notificacion.data_id}',
+)
+
+
+def encolar_notificacion(data_id, topic='payment'):
+    """
+    Registra una notificación verificada en la bandeja.
+    Si ya existe una fila para el data_id:
+      - pendiente: solo incrementa `recibidas` (conserva su programación).
+      - procesada/fallida: se vuelve a encolar para consultar el estado nuevo.
+    """
+    tabla = NotificacionWebhook._meta.db_table
+    pendiente = NotificacionWebhook.EstadoChoices.PENDIENTE
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {tabla}
+                (data_id, topic, estado, recibidas, intentos, proximo_intento,
+                 ultimo_error, created_at, updated_at)
+            VALUES (%s, %s, %s, 1, 0, now(), '', now(), now())
+            ON CONFLICT (data_id) DO UPDATE SET
+                recibidas = {tabla}.recibidas + 1,
+                topic = EXCLUDED.topic,
+                intentos = CASE WHEN {tabla}.estado = %s THEN {tabla}.intentos ELSE 0 END,
+                proximo_intento = CASE WHEN {tabla}.estado = %s
+                    THEN {tabla}.proximo_intento ELSE now() END,
+                estado = %s,
+                updated_at = now()
+            """,
+            [str(data_id), topic, pendiente, pendiente, pendiente, pendiente],
+        )
+
+
+def procesar_notificacion(notificacion):
+    """
+    Procesa una notificación reclamada. Retorna 'procesada', 'reintento'
+    o 'fallida'.
+    """
+    from apps.pagos.servicios.mercadopago_service import procesar_notificacion_webhook
+
+    try:
+        resultado = procesar_notificacion_webhook(notificacion.data_id)
+    except Exception as e:
+        WEBHOOKS.inc(resultado='error')
+        return bandeja.marcar_error(notificacion, e)
+
+    WEBHOOKS.inc(resultado=resultado.get('action', 'desconocido'))
+    ahora = timezone.now()
+    # Solo se marca procesada si no llegó otra notificación mientras tanto;
+    # si llegó, se deja pendiente y disponible de inmediato.
+    marcadas = NotificacionWebhook.objects.filter(
+        id=notificacion.id, recibidas=notificacion.recibidas,
+    ).update(
+        estado=NotificacionWebhook.EstadoChoices.PROCESADA,
+        procesada_at=ahora,
+        ultimo_error='',
+        updated_at=ahora,
+    )
+    if not marcadas:
+        NotificacionWebhook.objects.filter(id=notificacion.id).update(
+            proximo_intento=ahora, intentos=0, updated_at=ahora,
+        )
+
+    logger.info('Webhook %s procesado: %s', notificacion.data_id, resultado)
+    return 'procesada'
+
+
+def procesar_pendientes(lote=20):
+    """
+    Reclama y procesa un lote de la bandeja.
+    Retorna un dict con el conteo por resultado.
+    """
+    conteo = {'procesada': 0, 'reintento': 0, 'fallida': 0}
+    for notificacion in bandeja.reclamar(lote):
+        conteo[procesar_notificacion(notificacion)] += 1
+    return conteo
@@ -1,3 +1,368 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para los endpoints de pagos.
+Las llamadas a Mercado Pago se simulan: solo se mide el trabajo local.
+"""
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.pagos.models import NotificacionWebhook, Pago
+from apps.pagos.servicios import mercadopago_client
+from apps.pagos.servicios.webhook_service import encolar_notificacion, procesar_pendientes
+from utils.testing import PresupuestoAPITestCase
+
+
+class PagosClientePresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pendiente = self.datos['pedidos_pendientes'][0]
+        self.cliente = self.pendiente.usuario
+        self.autenticar(self.cliente)
+
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_crear_preferencia(self, get_sdk):
+        get_sdk.return_value.preference.return_value.create.return_value = {
+            'status': 201, 'response': {'id': 'PREF-1', 'init_point': 'https://mp.test/checkout'},
+        }
+        self.assertPresupuesto(
+            'post', '/api/v1/pagos/crear-preferencia/', 5, status=201,
+            data={'pedido_id': self.pendiente.id},
+        )
+
+    @mock.patch('apps.pagos.servicios.mercadopago_client.crear_pago')
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_procesar_card_aprobado(self, get_sdk, crear_pago):
+        crear_pago.return_value = (201, {
+            'id': 987, 'status': 'approved', 'status_detail': 'accredited', 'payment_method_id': 'visa',
+        })
+        # El presupuesto cubre el pago y la publicación de pago.aprobado;
+        # el post-pago corre al confirmarse, en su propia transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertPresupuesto(
+                'post', '/api/v1/pagos/procesar-card/', 7,
+                data={
+                    'pedido_id': self.pendiente.id, 'token': 'tok', 'payment_method_id': 'visa',
+                    'installments': 1, 'payer': {'email': self.cliente.email},
+                },
+            )
+        self.pendiente.refresh_from_db()
+        self.assertEqual(self.pendiente.estado, 'pagado')
+
+    @mock.patch('apps.pagos.servicios.mercadopago_client.crear_pago')
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_procesar_card_idempotente(self, get_sdk, crear_pago):
+        crear_pago.return_value = (201, {
+            'id': 988, 'status': 'rejected', 'status_detail': 'cc_rejected_other_reason',
+            'payment_method_id': 'visa',
+        })
+        datos = {
+            'pedido_id': self.pendiente.id, 'token': 'tok', 'payment_method_id': 'visa',
+            'installments': 1, 'payer': {'email': self.cliente.email},
+        }
+        primero = self.client.post('/api/v1/pagos/procesar-card/', datos, format='json', HTTP_IDEMPOTENCY_KEY='pago-1')
+        self.assertEqual(primero.status_code, 200)
+        pagos = Pago.objects.filter(pedido=self.pendiente).count()
+
+        reintento = self.assertPresupuesto(
+            'post', '/api/v1/pagos/procesar-card/', 2, data=datos, HTTP_IDEMPOTENCY_KEY='pago-1',
+        )
+        self.assertEqual(reintento.json(), primero.json())
+        self.assertEqual(crear_pago.call_count, 1)
+        self.assertEqual(Pago.objects.filter(pedido=self.pendiente).count(), pagos)
+
+    def test_consultar_pago(self):
+        pago = Pago.objects.select_related('usuario').first()
+        self.autenticar(pago.usuario)
+        self.assertPresupuesto('get', f'/api/v1/pagos/{pago.id}/', 2)
+
+
+class WebhookPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_webhook_encola(self):
+        self.assertPresupuesto('post', '/api/v1/pagos/webhook/?type=payment&data.id=555', 1)
+
+    def test_webhook_ignorado(self):
+        self.assertPresupuesto('post', '/api/v1/pagos/webhook/?type=merchant_order&data.id=1', 0)
+
+    def test_webhook_rechaza_data_id_invalido(self):
+        largo = '9' * 256
+        self.assertPresupuesto('post', f'/api/v1/pagos/webhook/?type=payment&data.id={largo}', 0, status=400)
+        self.assertPresupuesto(
+            'post', '/api/v1/pagos/webhook/', 0, status=400,
+            data={'type': 'payment', 'data': {'id': {'anidado': 1}}},
+        )
+        self.assertPresupuesto(
+            'post', '/api/v1/pagos/webhook/', 0, status=400,
+            data={'type': 'payment', 'data': 'no-es-objeto'},
+        )
+        self.assertFalse(NotificacionWebhook.objects.exists())
+
+    def test_webhook_data_id_numerico_en_body(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/pagos/webhook/', 1,
+            data={'type': 'payment', 'data': {'id': 555}},
+        )
+        self.assertTrue(NotificacionWebhook.objects.filter(data_id='555').exists())
+
+
+class BandejaWebhookTest(PresupuestoAPITestCase):
+    """Worker de la bandeja: fusión de duplicados, reintentos y procesamiento."""
+
+    def setUp(self):
+        super().setUp()
+        pedido = self.datos['pedidos_pendientes'][0]
+        self.pago = Pago.objects.create(pedido=pedido, usuario=pedido.usuario, monto=pedido.total)
+
+    def respuesta_pago(self, estado='approved'):
+        return {
+            'status': 200,
+            'response': {
+                'id': 555, 'status': estado, 'status_detail': 'accredited',
+                'payment_method_id': 'visa', 'external_reference': str(self.pago.id),
+            },
+        }
+
+    def test_duplicados_se_fusionan(self):
+        for _ in range(3):
+            self.client.post('/api/v1/pagos/webhook/?type=payment&data.id=555')
+        notificacion = NotificacionWebhook.objects.get(data_id='555')
+        self.assertEqual(notificacion.recibidas, 3)
+        self.assertEqual(NotificacionWebhook.objects.count(), 1)
+
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_worker_procesa_la_bandeja(self, get_sdk):
+        get_sdk.return_value.payment.return_value.get.return_value = self.respuesta_pago()
+        encolar_notificacion('555')
+        encolar_notificacion('555')
+
+        call_command('procesar_webhooks', stdout=StringIO())
+
+        get_sdk.return_value.payment.return_value.get.assert_called_once_with('555')
+        notificacion = NotificacionWebhook.objects.get(data_id='555')
+        self.assertEqual(notificacion.estado, NotificacionWebhook.EstadoChoices.PROCESADA)
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, Pago.EstadoChoices.APROBADO)
+
+    @override_settings(BREVO_TEMPLATE_PEDIDO=7)
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_pago_aprobado_post_pago_por_etapas(self, get_sdk):
+        from apps.common.models import EmailSaliente, EventoDominio
+        from apps.descuentos.models import CuponUso
+        from apps.pedidos.models import Pedido
+        from apps.ventas.models import Venta
+
+        pedido = self.pago.pedido
+        cupon = self.datos['cupon']
+        Pedido.objects.filter(id=pedido.id).update(cupon=cupon, descuento_monto=10)
+        get_sdk.return_value.payment.return_value.get.return_value = self.respuesta_pago()
+        encolar_notificacion('555')
+
+        # 1. El webhook solo guarda el pago y publica pago.aprobado;
+        # 2. al confirmarse, el mismo proceso marca el pedido como pagado
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('procesar_webhooks', stdout=StringIO())
+
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, Pedido.EstadoChoices.PAGADO)
+        self.assertEqual(EventoDominio.objects.get(tipo='pago.aprobado').estado, 'procesado')
+        evento = EventoDominio.objects.get(tipo='pedido.pagado')
+        self.assertEqual(evento.payload, {'pedido_id': pedido.id})
+        self.assertFalse(Venta.objects.filter(pedido=pedido).exists())
+        self.assertFalse(CuponUso.objects.filter(pedido=pedido).exists())
+
+        # 3. Venta, cupón y email en el worker de eventos
+        call_command('despachar_eventos', stdout=StringIO())
+
+        evento.refresh_from_db()
+        self.assertEqual(evento.estado, EventoDominio.EstadoChoices.PROCESADO)
+        self.assertEqual(len(evento.completados), 3)
+        self.assertTrue(Venta.objects.filter(pedido=pedido).exists())
+        self.assertEqual(CuponUso.objects.get(pedido=pedido).cupon_id, cupon.id)
+        cupon.refresh_from_db()
+        self.assertEqual(cupon.usos_actuales, 1)
+        self.assertTrue(
+            EmailSaliente.objects.filter(template_id=7, params__numero_pedido=pedido.numero_pedido).exists()
+        )
+
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_post_pago_fallido_conserva_el_pago_y_se_reintenta(self, get_sdk):
+        from apps.common.models import EventoDominio
+        from apps.inventario.models import Producto
+        from apps.pedidos.models import Pedido
+
+        pedido = self.pago.pedido
+        productos = list(pedido.items.values_list('producto_id', flat=True))
+        stock = dict(Producto.objects.filter(id__in=productos).values_list('id', 'stock'))
+        Producto.objects.filter(id__in=productos).update(stock=0)
+        get_sdk.return_value.payment.return_value.get.return_value = self.respuesta_pago()
+        encolar_notificacion('555')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('procesar_webhooks', stdout=StringIO())
+
+        # El pago queda aprobado aunque el post-pago falle
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, Pago.EstadoChoices.APROBADO)
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, Pedido.EstadoChoices.PENDIENTE)
+        evento = EventoDominio.objects.get(tipo='pago.aprobado')
+        self.assertEqual((evento.estado, evento.intentos), ('pendiente', 1))
+        self.assertTrue(evento.ultimo_error)
+
+        # Con stock repuesto, el worker de eventos lo completa
+        for producto_id, cantidad in stock.items():
+            Producto.objects.filter(id=producto_id).update(stock=cantidad)
+        EventoDominio.objects.filter(id=evento.id).update(proximo_intento=timezone.now())
+        call_command('despachar_eventos', stdout=StringIO())
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, Pedido.EstadoChoices.PAGADO)
+
+    @override_settings(EVENTOS_MAX_INTENTOS=1)
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_post_pago_agotado_queda_visible_y_no_expira(self, get_sdk):
+        from datetime import timedelta
+
+        from apps.common.models import EventoDominio
+        from apps.inventario.models import Producto
+        from apps.pagos.servicios.post_pago_service import pagos_sin_procesar
+        from apps.pedidos.models import Pedido
+        from apps.pedidos.services import expirar_pedidos
+        from utils.metricas import exportar
+
+        pedido = self.pago.pedido
+        Producto.objects.filter(id__in=pedido.items.values('producto_id')).update(stock=0)
+        get_sdk.return_value.payment.return_value.get.return_value = self.respuesta_pago()
+        encolar_notificacion('555')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('procesar_webhooks', stdout=StringIO())
+
+        self.assertEqual(EventoDominio.objects.get(tipo='pago.aprobado').estado, 'fallido')
+        # Visible para el operador: admin de pagos y /metrics
+        self.assertEqual(list(pagos_sin_procesar()), [self.pago])
+        self.assertIn('clarte_pagos_aprobados_sin_procesar 1', exportar({}))
+        self.client.force_login(self.datos['admin'])
+        response = self.client.get('/admin/pagos/pago/?post_pago=pendiente')
+        self.assertContains(response, pedido.numero_pedido)
+
+        # El barrido de expiración no cancela un pedido cobrado
+        Pedido.objects.filter(id=pedido.id).update(created_at=timezone.now() - timedelta(days=2))
+        expirar_pedidos(timezone.now() - timedelta(hours=24))
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado, Pedido.EstadoChoices.PENDIENTE)
+
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_error_se_reintenta_con_backoff(self, get_sdk):
+        get_sdk.return_value.payment.return_value.get.return_value = {'status': 500, 'response': None}
+        encolar_notificacion('555')
+
+        self.assertEqual(procesar_pendientes(), {'procesada': 0, 'reintento': 1, 'fallida': 0})
+        notificacion = NotificacionWebhook.objects.get(data_id='555')
+        self.assertEqual(notificacion.intentos, 1)
+        self.assertGreater(notificacion.proximo_intento, timezone.now())
+        # Aún en backoff: no se vuelve a reclamar
+        self.assertEqual(procesar_pendientes(), {'procesada': 0, 'reintento': 0, 'fallida': 0})
+
+    @mock.patch('apps.pagos.servicios.mercadopago_service._get_sdk')
+    def test_agotar_intentos_marca_fallida(self, get_sdk):
+        get_sdk.return_value.payment.return_value.get.return_value = {'status': 500, 'response': None}
+        encolar_notificacion('555')
+        NotificacionWebhook.objects.filter(data_id='555').update(intentos=settings.WEBHOOK_MAX_INTENTOS - 1)
+
+        self.assertEqual(procesar_pendientes(), {'procesada': 0, 'reintento': 0, 'fallida': 1})
+        notificacion = NotificacionWebhook.objects.get(data_id='555')
+        self.assertEqual(notificacion.estado, NotificacionWebhook.EstadoChoices.FALLIDA)
+
+        # Una notificación nueva del mismo pago la vuelve a encolar
+        encolar_notificacion('555')
+        notificacion.refresh_from_db()
+        self.assertEqual(notificacion.estado, NotificacionWebhook.EstadoChoices.PENDIENTE)
+        self.assertEqual(notificacion.intentos, 0)
+
+
+@override_settings(MERCADOPAGO_ACCESS_TOKEN='TEST-token')
+class ClienteMercadoPagoTest(PresupuestoAPITestCase):
+    """Cliente HTTP compartido: SDK único, timeouts y métricas de latencia."""
+
+    def test_sdk_compartido(self):
+        sdk = mercadopago_client.obtener_sdk()
+        self.assertIs(sdk, mercadopago_client.obtener_sdk())
+        self.assertIsInstance(sdk.http_client, mercadopago_client.ClienteHttpMP)
+
+    @mock.patch('apps.pagos.servicios.mercadopago_client.obtener_session')
+    def test_sdk_usa_timeout_y_registra_latencia(self, obtener_session):
+        from utils.metricas import exportar, recolectar
+
+        obtener_session.return_value.request.return_value = mock.Mock(
+            status_code=200, content=b'{}', json=mock.Mock(return_value={'id': 1}),
+        )
+        resultado = mercadopago_client.ClienteHttpMP().request(
+            'GET', f'{mercadopago_client.API_URL}/v1/payments/123', timeout=60,
+        )
+        self.assertEqual(resultado, {'status': 200, 'response': {'id': 1}})
+        _, kwargs = obtener_session.return_value.request.call_args
+        self.assertEqual(
+            kwargs['timeout'],
+            (settings.MERCADOPAGO_TIMEOUT_CONEXION, settings.MERCADOPAGO_TIMEOUT_LECTURA),
+        )
+        self.assertIn(
+            'clarte_mercadopago_request_seconds_count{operacion="GET /v1/payments/{id}",resultado="ok"} ',
+            exportar(recolectar()),
+        )
+
+    def test_post_solo_se_reintenta_con_clave_de_idempotencia(self):
+        def reintenta(metodo, idempotente=False):
+            session = mercadopago_client.obtener_session(idempotente=idempotente)
+            return session.get_adapter(mercadopago_client.API_URL).max_retries.is_retry(metodo, 503)
+
+        self.assertTrue(reintenta('GET'))
+        self.assertFalse(reintenta('POST'))
+        self.assertTrue(reintenta('POST', idempotente=True))
+
+        with mock.patch.object(mercadopago_client, 'obtener_session') as obtener_session:
+            obtener_session.return_value.request.return_value = mock.Mock(status_code=201, json=dict)
+            mercadopago_client.crear_pago({}, 'clave-1')
+            obtener_session.assert_called_with(idempotente=True)
+            mercadopago_client.solicitar('POST', f'{mercadopago_client.API_URL}/v1/customers', json={})
+            obtener_session.assert_called_with(idempotente=False)
+
+    @mock.patch('apps.pagos.servicios.mercadopago_client.obtener_session')
+    def test_timeout_conserva_el_pago(self, obtener_session):
+        obtener_session.return_value.request.side_effect = requests.Timeout('lectura')
+        pedido = self.datos['pedidos_pendientes'][0]
+        self.autenticar(pedido.usuario)
+        self.assertPresupuesto(
+            'post', '/api/v1/pagos/procesar-card/', 4, status=400,
+            data={
+                'pedido_id': pedido.id, 'token': 'tok', 'payment_method_id': 'visa',
+                'installments': 1, 'payer': {'email': pedido.usuario.email},
+            },
+        )
+        self.assertTrue(Pago.objects.filter(pedido=pedido, estado=Pago.EstadoChoices.PENDIENTE).exists())
+
+
+class PagosAdminPresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['admin'])
+
+    def test_admin_listar_pagos(self):
+        self.assertPresupuesto('get', '/api/v1/pagos/admin/', 3)
+
+    def test_admin_detalle_pago(self):
+        pago = Pago.objects.first()
+        self.assertPresupuesto('get', f'/api/v1/pagos/admin/{pago.id}/', 2)
+
+    def test_admin_exportar_pagos(self):
+        response = self.assertPresupuesto('get', '/api/v1/pagos/admin/exportar/?estado=aprobado', 2)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            len(response.contenido.decode().splitlines()) - 1,
+            Pago.objects.filter(estado=Pago.EstadoChoices.APROBADO).count(),
+        )
@@ -8,6 +8,7 @@ from . import views
 
 urlpatterns = [
     path('admin/', views.AdminPagosListView.as_view(), name='pago-admin-list'),
+    path('admin/exportar/', views.AdminExportarPagosView.as_view(), name='pago-admin-exportar'),
     path('admin/<int:pk>/', views.AdminPagoDetailView.as_view(), name='pago-admin-detail'),
     path('crear-preferencia/', views.CrearPreferenciaPagoView.as_view(), name='pago-crear-preferencia'),
     path('procesar-card/', views.ProcesarPagoCardView.as_view(), name='pago-procesar-card'),
@@ -14,14 +14,16 @@ from rest_framework.views import APIView
 
 from rest_framework import generics
 from apps.pedidos.models import Pedido
-from .models import Pago
+from utils.exportacion import ExportacionView
+from utils.idempotencia import idempotente
+from .models import NotificacionWebhook, Pago
 from .serializers import PagoSerializer, AdminPagoSerializer, CrearPreferenciaSerializer, ProcesarPagoCardSerializer
 from .servicios.mercadopago_service import (
     crear_preferencia,
     procesar_pago_card,
     verificar_firma_webhook,
-    procesar_notificacion_webhook,
 )
+from .servicios.webhook_service import encolar_notificacion
 
 logger = logging.getLogger('clarte')
 
@@ -72,9 +74,12 @@ class ProcesarPagoCardView(APIView):
     """
     POST /api/v1/pagos/procesar-card/
     Procesa un pago con tarjeta usando datos del Card Payment Brick.
+    Acepta Idempotency-Key: los reintentos reciben el mismo resultado sin
+    crear otro Pago ni volver a llamar a Mercado Pago.
     """
     permission_classes = [permissions.AllowAny]
 
+    @idempotente('pagos:procesar-card')
     def post(self, request):
         logger.info('ProcesarPagoCard request.data: %s', request.data)
         serializer = ProcesarPagoCardSerializer(data=request.data)
@@ -130,7 +135,8 @@ class WebhookView(APIView):
     POST /api/v1/pagos/webhook/
     Recibe notificaciones IPN de Mercado Pago.
     CSRF exempt, AllowAny — autenticado por firma HMAC.
-    Idempotente: verifica si el pago ya fue procesado.
+    Solo encola la notificación y responde 200 de inmediato; el comando
+    `procesar_webhooks` la procesa (idempotente, con reintentos).
     """
     permission_classes = [AllowAny]
 
@@ -140,14 +146,27 @@ class WebhookView(APIView):
         data_id = request.GET.get('data.id') or request.GET.get('id')
 
         if not data_id:
-            body = request.data
+            body = request.data if isinstance(request.data, dict) else {}
             topic = body.get('type', topic)
-            data_id = body.get('data', {}).get('id')
+            data = body.get('data')
+            data_id = data.get('id') if isinstance(data, dict) else None
 
         # Solo procesar notificaciones de tipo payment
         if topic != 'payment':
             return Response({'status': 'ignored'}, status=status.HTTP_200_OK)
 
+        if not data_id:
+            return Response({'error': 'data.id requerido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # data.id llega del cliente: se valida antes de la firma y de la bandeja
+        # (un id más largo que la columna haría fallar el INSERT con un 500 y
+        # Mercado Pago reintentaría indefinidamente)
+        if isinstance(data_id, bool) or not isinstance(data_id, (str, int)):
+            return Response({'error': 'data.id inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        data_id = str(data_id)
+        if len(data_id) > NotificacionWebhook._meta.get_field('data_id').max_length:
+            return Response({'error': 'data.id inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
         # 2. Verificar firma HMAC
         x_signature = request.headers.get('x-signature', '')
         x_request_id = request.headers.get('x-request-id', '')
@@ -159,24 +178,11 @@ class WebhookView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # 3. Procesar la notificación
-        try:
-            resultado = procesar_notificacion_webhook(data_id)
-            logger.info('Webhook procesado: data_id=%s, resultado=%s', data_id, resultado)
-        except Pago.DoesNotExist:
-            logger.warning('Webhook: pago local no encontrado para data_id=%s', data_id)
-            return Response({'error': 'Pago no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
-        except ValueError as e:
-            logger.warning('Webhook error de validación: %s', e)
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            logger.error('Webhook error crítico: %s', e, exc_info=True)
-            return Response(
-                {'error': 'Error interno.'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        # 3. Encolar la notificación (duplicados del mismo data_id se fusionan)
+        encolar_notificacion(data_id, topic)
+        logger.info('Webhook encolado: data_id=%s', data_id)
 
-        return Response({'status': 'ok'}, status=status.HTTP_200_OK)
+        return Response({'status': 'queued'}, status=status.HTTP_200_OK)
 
 
 class AdminPagosListView(generics.ListAPIView):
@@ -221,7 +227,7 @@ class ConsultarPagoView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pago_id):
-        pago = get_object_or_404(Pago, id=pago_id, usuario=request.user)
+        pago = get_object_or_404(Pago.objects.select_related('pedido'), id=pago_id, usuario=request.user)
         serializer = PagoSerializer(pago)
         return Response(
             {
@@ -232,3 +238,25 @@ class ConsultarPagoView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class AdminExportarPagosView(ExportacionView):
+    """
+    GET /api/v1/pagos/admin/exportar/?formato=csv|jsonl&desde=&hasta=&estado=
+    Exporta pagos en streaming (solo admin).
+    """
+    queryset = Pago.objects.all()
+    estados = Pago.EstadoChoices
+    nombre_archivo = 'pagos'
+    columnas = [
+        ('id', 'id'),
+        ('fecha', 'created_at'),
+        ('numero_pedido', 'pedido__numero_pedido'),
+        ('email', 'usuario__email'),
+        ('estado', 'estado'),
+        ('estado_detalle', 'estado_detalle'),
+        ('monto', 'monto'),
+        ('metodo', 'metodo'),
+        ('mercadopago_payment_id', 'mercadopago_payment_id'),
+        ('mercadopago_preference_id', 'mercadopago_preference_id'),
+    ]
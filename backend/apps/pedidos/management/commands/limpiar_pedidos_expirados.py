@@ -1,12 +1,25 @@
 """
 Management command: limpiar_pedidos_expirados
 
-Cancela pedidos en estado PENDIENTE que lleven más de N horas sin ser pagados
-y restaura el stock de cada item.
+1. Elimina las reservas de stock vencidas (barrido por índice sobre expires_at).
+2. Cancela pedidos en estado PENDIENTE que lleven más de N horas sin ser pagados,
+   liberando las reservas que aún conserven. Los que tienen un pago aprobado
+   (post-pago fallido) no se cancelan.
+3. Elimina las respuestas guardadas por Idempotency-Key ya vencidas y los
+   eventos de dominio procesados hace más de EVENTOS_RETENCION_DIAS.
+
+El stock de un pedido pendiente nunca se descuenta (solo se reserva), por lo que
+cancelar no incrementa stock: basta con liberar sus reservas.
+
+Los pedidos se cancelan por lotes (ver pedidos.services.expirar_pedidos): cada
+lote se reclama con SELECT ... FOR UPDATE SKIP LOCKED y se escribe con un
+DELETE de reservas y un UPDATE de estado, así que puede correr cada minuto
+sin bloquear el checkout ni pisar un pago en curso.
 
 Uso:
     python manage.py limpiar_pedidos_expirados
     python manage.py limpiar_pedidos_expirados --horas 48
+    python manage.py limpiar_pedidos_expirados --lote 1000
     python manage.py limpiar_pedidos_expirados --dry-run
 """
 from django.core.management.base import BaseCommand
@@ -15,7 +28,7 @@ from datetime import timedelta
 
 
 class Command(BaseCommand):
-    help = 'Cancela pedidos PENDIENTE expirados y restaura su stock.'
+    help = 'Elimina reservas de stock vencidas y cancela pedidos PENDIENTE expirados.'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -24,6 +37,12 @@ class Command(BaseCommand):
             default=24,
             help='Antigüedad en horas para considerar un pedido expirado (default: 24).',
         )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Pedidos a cancelar por transacción (default: 500).',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -36,47 +55,53 @@ class Command(BaseCommand):
         dry_run = options['dry_run']
 
         # Import here to avoid AppRegistryNotReady at module level
-        from apps.pedidos.models import Pedido
-
-        cutoff = timezone.now() - timedelta(hours=horas)
-
-        pedidos = Pedido.objects.filter(
-            estado='pendiente',
-            created_at__lt=cutoff,
-        ).prefetch_related('items__producto')
+        from apps.common.servicios.eventos import limpiar_eventos_procesados
+        from apps.inventario.models import ReservaStock
+        from apps.inventario.services import limpiar_reservas_expiradas
+        from apps.pedidos.services import expirar_pedidos, pedidos_expirables
+        from utils.idempotencia import limpiar_claves_expiradas
 
-        total = pedidos.count()
+        # 1. Reservas vencidas
+        if dry_run:
+            vencidas = ReservaStock.objects.filter(expires_at__lte=timezone.now()).count()
+            self.stdout.write(self.style.WARNING(f'[DRY-RUN] Se eliminarían {vencidas} reserva(s) vencida(s).'))
+        else:
+            vencidas = limpiar_reservas_expiradas()
+            self.stdout.write(f'Reservas vencidas eliminadas: {vencidas}')
+            claves = limpiar_claves_expiradas()
+            self.stdout.write(f'Claves de idempotencia vencidas eliminadas: {claves}')
+            eventos = limpiar_eventos_procesados()
+            self.stdout.write(f'Eventos de dominio procesados eliminados: {eventos}')
 
-        if total == 0:
-            self.stdout.write(self.style.SUCCESS('No hay pedidos expirados para cancelar.'))
-            return
+        # 2. Pedidos pendientes expirados
+        cutoff = timezone.now() - timedelta(hours=horas)
 
         if dry_run:
+            pedidos = pedidos_expirables(cutoff)
+            total = pedidos.count()
+            if total == 0:
+                self.stdout.write(self.style.SUCCESS('No hay pedidos expirados para cancelar.'))
+                return
             self.stdout.write(
                 self.style.WARNING(
                     f'[DRY-RUN] Se cancelarían {total} pedido(s) con más de {horas}h en estado PENDIENTE:'
                 )
             )
-            for pedido in pedidos:
-                self.stdout.write(f'  • {pedido.numero_pedido} — creado {pedido.created_at}')
+            for numero_pedido, created_at in pedidos.values_list('numero_pedido', 'created_at').iterator():
+                self.stdout.write(f'  • {numero_pedido} — creado {created_at}')
             return
 
-        cancelados = 0
-        for pedido in pedidos:
-            try:
-                for item in pedido.items.all():
-                    item.producto.incrementar_stock(item.cantidad)
-                pedido.estado = 'cancelado'
-                pedido.save(update_fields=['estado', 'updated_at'])
-                cancelados += 1
-                self.stdout.write(f'  Cancelado: {pedido.numero_pedido}')
-            except Exception as exc:
-                self.stderr.write(
-                    self.style.ERROR(f'  Error al cancelar {pedido.numero_pedido}: {exc}')
-                )
+        resultado = expirar_pedidos(cutoff, lote=options['lote'])
+
+        if resultado['cancelados'] == 0:
+            self.stdout.write(self.style.SUCCESS('No hay pedidos expirados para cancelar.'))
+            return
 
+        segundos = resultado['segundos']
+        ritmo = resultado['cancelados'] / segundos if segundos else 0
         self.stdout.write(
             self.style.SUCCESS(
-                f'Listo: {cancelados}/{total} pedidos cancelados y stock restaurado.'
+                f"Listo: {resultado['cancelados']} pedidos cancelados y reservas liberadas "
+                f"en {resultado['lotes']} lote(s), {segundos:.2f} s ({ritmo:.0f} pedidos/s)."
             )
         )
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:49
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def inicializar_contadores(apps, schema_editor):
+    """Siembra un contador por día con el mayor sufijo ya emitido."""
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    ContadorPedidoDiario = apps.get_model('pedidos', 'ContadorPedidoDiario')
+
+    maximos = {}
+    for numero in Pedido.objects.values_list('numero_pedido', flat=True).iterator():
+        try:
+            _, fecha, secuencial = numero.split('-')
+            fecha = datetime.strptime(fecha, '%Y%m%d').date()
+            secuencial = int(secuencial)
+        except ValueError:
+            continue
+        maximos[fecha] = max(maximos.get(fecha, 0), secuencial)
+
+    ContadorPedidoDiario.objects.bulk_create([
+        ContadorPedidoDiario(fecha=fecha, ultimo=ultimo) for fecha, ultimo in maximos.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0004_pedido_guest_email_pedido_guest_nombre_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorPedidoDiario',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False, verbose_name='fecha')),
+                ('ultimo', models.PositiveIntegerField(default=0, verbose_name='último secuencial')),
+            ],
+            options={
+                'verbose_name': 'contador diario de pedidos',
+                'verbose_name_plural': 'contadores diarios de pedidos',
+            },
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
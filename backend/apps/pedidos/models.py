@@ -5,13 +5,52 @@ y validación de transiciones de estado.
 """
 import logging
 from django.conf import settings
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger('clarte')
 
 
+class ContadorPedidoDiario(models.Model):
+    """
+    Contador diario para el sufijo de numero_pedido.
+    Una fila por día; el sufijo se asigna con un único UPSERT atómico.
+    """
+
+    fecha = models.DateField(_('fecha'), primary_key=True)
+    ultimo = models.PositiveIntegerField(_('último secuencial'), default=0)
+
+    class Meta:
+        verbose_name = _('contador diario de pedidos')
+        verbose_name_plural = _('contadores diarios de pedidos')
+
+    def __str__(self):
+        return f'{self.fecha}: {self.ultimo}'
+
+    @classmethod
+    def siguiente(cls, fecha):
+        """
+        Retorna el siguiente secuencial del día en una sola sentencia:
+          INSERT ... ON CONFLICT (fecha) DO UPDATE SET ultimo = ultimo + 1 RETURNING ultimo
+        Sin escaneos ni reintentos; dos pedidos concurrentes nunca reciben el mismo valor.
+
+        La fila del día queda bloqueada hasta que termina la transacción que
+        ejecutó el UPSERT: llamarlo fuera de la transacción del checkout
+        (autocommit) para no serializar los checkouts del día. Si el checkout
+        falla después, el sufijo se pierde (hueco en la numeración).
+        """
+        tabla = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {tabla} (fecha, ultimo) VALUES (%s, 1) '
+                f'ON CONFLICT (fecha) DO UPDATE SET ultimo = {tabla}.ultimo + 1 '
+                f'RETURNING ultimo',
+                [fecha],
+            )
+            return cursor.fetchone()[0]
+
+
 class Pedido(models.Model):
     """
     Pedido de compra. Agrupa items, dirección de envío y estado del flujo.
@@ -109,32 +148,19 @@ class Pedido(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.numero_pedido:
-            self.numero_pedido = self._generar_numero_pedido()
+            self.numero_pedido = self.generar_numero_pedido()
         super().save(*args, **kwargs)
 
     @staticmethod
-    def _generar_numero_pedido():
+    def generar_numero_pedido():
         """
         Genera un número de pedido único con formato LP-YYYYMMDD-XXXX.
-        El sufijo XXXX es un secuencial diario que se auto-incrementa.
+        El sufijo XXXX es un secuencial diario asignado por ContadorPedidoDiario
+        (ver ContadorPedidoDiario.siguiente sobre llamarlo fuera de transacciones).
         """
         hoy = timezone.localdate()
-        prefijo = f'LP-{hoy.strftime("%Y%m%d")}-'
-
-        ultimo = (
-            Pedido.objects
-            .filter(numero_pedido__startswith=prefijo)
-            .order_by('-numero_pedido')
-            .values_list('numero_pedido', flat=True)
-            .first()
-        )
-
-        if ultimo:
-            secuencial = int(ultimo.split('-')[-1]) + 1
-        else:
-            secuencial = 1
-
-        return f'{prefijo}{secuencial:04d}'
+        secuencial = ContadorPedidoDiario.siguiente(hoy)
+        return f'LP-{hoy.strftime("%Y%m%d")}-{secuencial:04d}'
 
     def puede_transicionar_a(self, nuevo_estado):
         """Verifica si la transición de estado es válida."""
@@ -143,30 +169,46 @@ class Pedido(models.Model):
     def cambiar_estado(self, nuevo_estado):
         """
         Cambia el estado del pedido validando la transición.
+        Al cancelar, libera las reservas de stock del pedido. Publica el
+        evento pedido.estado_cambiado en la misma transacción.
         Lanza ValueError si la transición no es válida.
         """
+        from apps.common.servicios.eventos import PEDIDO_ESTADO_CAMBIADO, publicar_evento
+
         if not self.puede_transicionar_a(nuevo_estado):
             raise ValueError(
                 f'Transición inválida: {self.estado} → {nuevo_estado}. '
                 f'Transiciones permitidas: {self.TRANSICIONES_VALIDAS.get(self.estado, [])}'
             )
         estado_anterior = self.estado
-        self.estado = nuevo_estado
-        self.save(update_fields=['estado', 'updated_at'])
+        with transaction.atomic():
+            self.estado = nuevo_estado
+            self.save(update_fields=['estado', 'updated_at'])
+            if nuevo_estado == self.EstadoChoices.CANCELADO:
+                from apps.inventario.services import liberar_reservas
+                liberar_reservas(self)
+            publicar_evento(
+                PEDIDO_ESTADO_CAMBIADO,
+                pedido_id=self.id, anterior=estado_anterior, nuevo=nuevo_estado,
+            )
         logger.info(
             'Pedido %s cambió de estado: %s → %s',
             self.numero_pedido, estado_anterior, nuevo_estado,
         )
 
-    def calcular_totales(self):
-        """Recalcula subtotal, descuento y total a partir de los items y el cupón."""
+    def asignar_totales(self, subtotal):
+        """Asigna subtotal, descuento y total a partir de un subtotal ya calculado (sin consultas)."""
         from decimal import Decimal
-        self.subtotal = sum(item.subtotal for item in self.items.all())
+        self.subtotal = subtotal
         if self.cupon:
             self.descuento_monto = self.cupon.calcular_descuento(self.subtotal)
         else:
             self.descuento_monto = Decimal('0')
         self.total = max(Decimal('0'), self.subtotal - self.descuento_monto)
+
+    def calcular_totales(self):
+        """Recalcula subtotal, descuento y total a partir de los items y el cupón."""
+        self.asignar_totales(sum(item.subtotal for item in self.items.all()))
         self.save(update_fields=['subtotal', 'descuento_monto', 'total', 'updated_at'])
 
 
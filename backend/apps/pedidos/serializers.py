@@ -7,7 +7,8 @@ from decimal import Decimal
 from django.db import transaction
 from rest_framework import serializers
 
-from apps.inventario.models import Producto
+from apps.inventario.models import Producto, StockInsuficienteError
+from apps.inventario.services import bloquear_productos, reservar_stock
 from .models import Pedido, ItemPedido
 
 
@@ -40,8 +41,11 @@ class ItemPedidoCrearSerializer(serializers.Serializer):
 # ──────────────────────────────────────────────
 
 class PedidoListSerializer(serializers.ModelSerializer):
-    """Serializer resumido para listado de pedidos."""
-    items_count = serializers.SerializerMethodField()
+    """
+    Serializer resumido para listado de pedidos.
+    items_count viene anotado en el queryset (Count('items')) para evitar N+1.
+    """
+    items_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Pedido
@@ -50,9 +54,6 @@ class PedidoListSerializer(serializers.ModelSerializer):
             'items_count', 'created_at',
         ]
 
-    def get_items_count(self, obj):
-        return obj.items.count()
-
 
 class AdminPedidoListSerializer(PedidoListSerializer):
     """Serializer para listado de pedidos en el panel admin (incluye email)."""
@@ -112,8 +113,11 @@ class PedidoSerializer(serializers.ModelSerializer):
 class CrearPedidoSerializer(serializers.Serializer):
     """
     Serializer para crear un pedido.
-    Valida stock disponible de cada producto antes de crear.
-    La creación es atómica (transaction.atomic).
+    Valida stock disponible (stock - reservas vigentes) de cada producto antes de crear.
+    La creación es atómica (transaction.atomic) y reserva el stock del pedido.
+    El número de consultas es constante sin importar el tamaño del carrito:
+    los productos se cargan una vez al validar y se bloquean con un único
+    SELECT ... FOR UPDATE al crear; los items se insertan con bulk_create.
     """
     direccion_envio = serializers.CharField(max_length=255)
     ciudad = serializers.CharField(max_length=100)
@@ -127,7 +131,7 @@ class CrearPedidoSerializer(serializers.Serializer):
     guest_telefono = serializers.CharField(max_length=30, required=False, allow_blank=True, default='')
 
     def validate_items(self, items):
-        """Valida que los productos existan, estén activos y tengan stock."""
+        """Valida que los productos existan, estén activos y tengan stock disponible."""
         producto_ids = [item['producto_id'] for item in items]
 
         # Verificar duplicados
@@ -135,8 +139,10 @@ class CrearPedidoSerializer(serializers.Serializer):
             raise serializers.ValidationError('No se permiten productos duplicados en el pedido.')
 
         # Obtener productos activos
-        productos = Producto.objects.activos().filter(id__in=producto_ids)
+        productos = Producto.objects.activos().con_disponible().filter(id__in=producto_ids)
         productos_dict = {p.id: p for p in productos}
+        # Reutilizados por validate() para calcular el subtotal del cupón
+        self._productos = productos_dict
 
         errores = []
         for item in items:
@@ -144,10 +150,10 @@ class CrearPedidoSerializer(serializers.Serializer):
             if not producto:
                 errores.append(f'Producto con ID {item["producto_id"]} no encontrado o no disponible.')
                 continue
-            if not producto.verificar_stock(item['cantidad']):
+            if producto.stock_disponible < item['cantidad']:
                 errores.append(
                     f'Stock insuficiente para "{producto.nombre}". '
-                    f'Disponible: {producto.stock}, solicitado: {item["cantidad"]}.'
+                    f'Disponible: {max(producto.stock_disponible, 0)}, solicitado: {item["cantidad"]}.'
                 )
 
         if errores:
@@ -177,9 +183,9 @@ class CrearPedidoSerializer(serializers.Serializer):
             except Cupon.DoesNotExist:
                 raise serializers.ValidationError({'codigo_cupon': 'Código de cupón no válido.'})
 
-            # Calcular subtotal proyectado desde los items ya validados
+            # Calcular subtotal proyectado desde los productos ya cargados en validate_items
             subtotal_proyectado = sum(
-                Decimal(str(Producto.objects.get(id=item['producto_id']).precio_final)) * item['cantidad']
+                Decimal(str(self._productos[item['producto_id']].precio_final)) * item['cantidad']
                 for item in attrs.get('items', [])
             )
 
@@ -192,7 +198,14 @@ class CrearPedidoSerializer(serializers.Serializer):
         return attrs
 
     def create(self, validated_data):
-        """Crea pedido + items dentro de una transacción atómica."""
+        """
+        Asigna el numero_pedido en autocommit (el contador diario no queda
+        bloqueado durante el checkout) y crea pedido + items dentro de una
+        transacción atómica:
+          1. Bloquea todos los productos (una consulta) y verifica stock disponible.
+          2. Inserta el pedido con los totales ya calculados en memoria.
+          3. Inserta los items y las reservas de stock con bulk_create.
+        """
         items_data = validated_data.pop('items')
         cupon = validated_data.pop('_cupon', None)
         validated_data.pop('codigo_cupon', None)
@@ -201,10 +214,35 @@ class CrearPedidoSerializer(serializers.Serializer):
         guest_nombre = validated_data.pop('guest_nombre', '')
         guest_email = validated_data.pop('guest_email', '')
         guest_telefono = validated_data.pop('guest_telefono', '')
+        cantidades = {item['producto_id']: item['cantidad'] for item in items_data}
+        numero_pedido = Pedido.generar_numero_pedido()
 
         with transaction.atomic():
-            # Crear pedido
-            pedido = Pedido.objects.create(
+            try:
+                productos = bloquear_productos(cantidades)
+            except StockInsuficienteError as e:
+                raise serializers.ValidationError({'items': [str(e)]})
+
+            faltantes = [pk for pk in cantidades if pk not in productos]
+            if faltantes:
+                raise serializers.ValidationError(
+                    {'items': [f'Producto con ID {pk} no encontrado o no disponible.' for pk in faltantes]}
+                )
+
+            # Items con precio al momento de la compra
+            items = [
+                ItemPedido(
+                    producto=productos[pk],
+                    cantidad=cantidad,
+                    precio_unitario=productos[pk].precio_final,
+                    subtotal=productos[pk].precio_final * cantidad,
+                )
+                for pk, cantidad in cantidades.items()
+            ]
+
+            # Crear pedido con totales calculados en memoria
+            pedido = Pedido(
+                numero_pedido=numero_pedido,
                 usuario=usuario,
                 guest_nombre=guest_nombre,
                 guest_email=guest_email,
@@ -216,19 +254,14 @@ class CrearPedidoSerializer(serializers.Serializer):
                 codigo_postal=validated_data['codigo_postal'],
                 notas=validated_data.get('notas', ''),
             )
+            pedido.asignar_totales(sum(item.subtotal for item in items))
+            pedido.save()
 
-            # Crear items con precio al momento de la compra
-            for item_data in items_data:
-                producto = Producto.objects.select_for_update().get(id=item_data['producto_id'])
-                ItemPedido.objects.create(
-                    pedido=pedido,
-                    producto=producto,
-                    cantidad=item_data['cantidad'],
-                    precio_unitario=producto.precio_final,
-                )
+            for item in items:
+                item.pedido = pedido
+            ItemPedido.objects.bulk_create(items)
 
-            # Calcular totales
-            pedido.calcular_totales()
+            reservar_stock(pedido, cantidades)
 
         return pedido
 
@@ -1,11 +1,24 @@
 """
 Servicios de lógica de negocio para pedidos.
-Desacoplado de las views. Usado por la app de pagos al confirmar un pago.
+Desacoplado de las views. Usado por la app de pagos al confirmar un pago
+y por el comando limpiar_pedidos_expirados.
+
+Los cambios de estado publican su evento de dominio en la misma transacción
+(ver apps/common/servicios/eventos.py); lo que reacciona a ellos (venta,
+uso de cupón, emails) corre en el comando despachar_eventos.
 """
 import logging
+import time
 
-from django.db import models as db_models, transaction
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 
+from apps.common.models import EventoDominio
+from apps.common.servicios.eventos import PEDIDO_ESTADO_CAMBIADO, PEDIDO_PAGADO, publicar_evento
+from apps.inventario.models import Producto, ReservaStock
+from apps.inventario.services import liberar_reservas
+from apps.pagos.models import Pago
 from .models import Pedido
 
 logger = logging.getLogger('clarte')
@@ -15,9 +28,10 @@ def procesar_pedido_pagado(pedido_id):
     """
     Procesa un pedido tras confirmarse el pago.
     Ejecuta dentro de una transacción atómica:
-      1. Marca el pedido como 'pagado'.
-      2. Decrementa stock de cada producto (atómico con F()).
-      3. Retorna resultado para que pagos/ventas lo usen.
+      1. Decrementa el stock de todos los items en una sola sentencia (todo o nada).
+      2. Marca el pedido como 'pagado'.
+      3. Publica el evento pedido.pagado: sus suscriptores registran el uso
+         del cupón, crean la venta y encolan el email de confirmación.
 
     Lanza ValueError si el pedido no existe, ya fue procesado,
     o no hay stock suficiente.
@@ -39,42 +53,25 @@ def procesar_pedido_pagado(pedido_id):
                 f'Estado actual: {pedido.get_estado_display()}'
             )
 
-        # Decrementar stock de cada item
-        for item in pedido.items.select_related('producto'):
-            exito = item.producto.decrementar_stock(item.cantidad)
-            if not exito:
-                raise ValueError(
-                    f'Stock insuficiente para "{item.producto.nombre}" '
-                    f'(SKU: {item.producto.sku}). '
-                    f'Solicitado: {item.cantidad}, disponible: {item.producto.stock}.'
-                )
+        # Decrementar stock de todos los items en lote, sin tocar lo que
+        # reservan otros pedidos (la reserva propia pudo haber vencido).
+        # Lanza StockInsuficienteError (ValueError) con los SKUs sin stock.
+        cantidades = {}
+        for producto_id, cantidad in pedido.items.values_list('producto_id', 'cantidad'):
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        Producto.objects.decrementar_stock_lote(cantidades, excluir_pedido_id=pedido.id)
+        # El stock ya fue descontado: las reservas del pedido quedan consumidas
+        liberar_reservas(pedido)
 
         # Cambiar estado del pedido
         pedido.estado = Pedido.EstadoChoices.PAGADO
         pedido.save(update_fields=['estado', 'updated_at'])
-
-        # Registrar uso de cupón (si aplica)
-        if pedido.cupon_id:
-            from apps.descuentos.models import Cupon, CuponUso
-            # Incrementar usos de forma atómica
-            Cupon.objects.filter(id=pedido.cupon_id).update(
-                usos_actuales=db_models.F('usos_actuales') + 1
-            )
-            CuponUso.objects.create(
-                cupon_id=pedido.cupon_id,
-                pedido=pedido,
-                usuario=pedido.usuario,
-                descuento_aplicado=pedido.descuento_monto,
-            )
-            logger.info(
-                'Cupón id=%s consumido para pedido %s, descuento=%s',
-                pedido.cupon_id, pedido.numero_pedido, pedido.descuento_monto,
-            )
+        publicar_evento(PEDIDO_PAGADO, pedido_id=pedido.id)
 
         logger.info(
             'Pedido %s procesado como pagado. Stock decrementado para %d items.',
             pedido.numero_pedido,
-            pedido.items.count(),
+            len(cantidades),
         )
 
         return {
@@ -82,3 +79,88 @@ def procesar_pedido_pagado(pedido_id):
             'message': f'Pedido {pedido.numero_pedido} procesado exitosamente.',
             'pedido': pedido,
         }
+
+
+def _sin_pago_aprobado(pedidos):
+    """Filtra los pedidos PENDIENTE de `pedidos` que no tienen un pago aprobado."""
+    return (
+        pedidos
+        .filter(estado=Pedido.EstadoChoices.PENDIENTE)
+        .exclude(Exists(Pago.objects.filter(pedido=OuterRef('pk'), estado=Pago.EstadoChoices.APROBADO)))
+    )
+
+
+def pedidos_expirables(antes_de):
+    """
+    Pedidos PENDIENTE creados antes de `antes_de` sin un pago aprobado: un
+    pedido cobrado cuyo post-pago falló no se cancela (ver post_pago_service).
+    """
+    return _sin_pago_aprobado(Pedido.objects.filter(created_at__lt=antes_de))
+
+
+def expirar_pedidos(antes_de, lote=500):
+    """
+    Cancela los pedidos expirables (ver pedidos_expirables), por lotes.
+    Cada lote es una transacción corta:
+      1. SELECT ... FOR UPDATE SKIP LOCKED reclama hasta `lote` pedidos; los
+         que está procesando un pago (procesar_pedido_pagado los bloquea) se
+         saltan y no se cancelan bajo sus pies.
+      2. Un UPDATE marca el lote como CANCELADO volviendo a comprobar el
+         estado y el pago aprobado: FOR UPDATE solo bloquea los pedidos, y
+         un pago aprobado tras el SELECT no lo ve la consulta del paso 1.
+         Los pedidos cancelados se leen de vuelta (siguen bloqueados).
+      3. Un DELETE libera las reservas de stock de los cancelados (el stock
+         de un pedido pendiente nunca se descuenta: solo se reserva) y un
+         INSERT publica sus eventos pedido.estado_cambiado.
+
+    Retorna {'cancelados': n, 'lotes': n, 'segundos': float}.
+    """
+    inicio = time.perf_counter()
+    cancelados = 0
+    lotes = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                pedidos_expirables(antes_de)
+                .select_for_update(skip_locked=True)
+                .order_by('created_at')
+                .values_list('id', flat=True)[:lote]
+            )
+            if not ids:
+                break
+            actualizados = _sin_pago_aprobado(Pedido.objects.filter(id__in=ids)).update(
+                estado=Pedido.EstadoChoices.CANCELADO,
+                updated_at=timezone.now(),
+            )
+            reservas = 0
+            if actualizados:
+                cancelados_lote = list(
+                    Pedido.objects
+                    .filter(id__in=ids, estado=Pedido.EstadoChoices.CANCELADO)
+                    .values_list('id', flat=True)
+                )
+                reservas, _ = ReservaStock.objects.filter(pedido_id__in=cancelados_lote).delete()
+                EventoDominio.objects.bulk_create([
+                    EventoDominio(tipo=PEDIDO_ESTADO_CAMBIADO, payload={
+                        'pedido_id': pedido_id,
+                        'anterior': Pedido.EstadoChoices.PENDIENTE,
+                        'nuevo': Pedido.EstadoChoices.CANCELADO,
+                    })
+                    for pedido_id in cancelados_lote
+                ])
+        cancelados += actualizados
+        lotes += 1
+        logger.info(
+            'Lote de pedidos expirados cancelado: %d de %d pedidos, %d reservas liberadas.',
+            actualizados, len(ids), reservas,
+        )
+        if len(ids) < lote:
+            break
+
+    segundos = time.perf_counter() - inicio
+    if cancelados:
+        logger.info(
+            'Pedidos expirados cancelados: %d en %d lote(s), %.2f s.',
+            cancelados, lotes, segundos,
+        )
+    return {'cancelados': cancelados, 'lotes': lotes, 'segundos': segundos}
@@ -1,3 +1,327 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para los endpoints de pedidos.
+"""
+import json
 
-# Create your tests here.
+from django.utils import timezone
+
+from utils.testing import PresupuestoAPITestCase
+
+
+def datos_pedido(productos, **extra):
+    return {
+        'direccion_envio': 'Av. Reforma 1', 'ciudad': 'CDMX',
+        'estado_envio': 'CDMX', 'codigo_postal': '06600',
+        'items': [{'producto_id': p.id, 'cantidad': 1} for p in productos],
+        **extra,
+    }
+
+
+class PedidosClientePresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pendiente = self.datos['pedidos_pendientes'][0]
+        self.cliente = self.pendiente.usuario
+        self.autenticar(self.cliente)
+        self.con_stock = [p for p in self.datos['productos'] if p.stock >= 5]
+
+    def test_mis_pedidos(self):
+        self.assertPresupuesto('get', '/api/v1/pedidos/', 3)
+
+    def test_detalle_pedido(self):
+        self.assertPresupuesto('get', f'/api/v1/pedidos/{self.pendiente.numero_pedido}/', 4)
+
+    def test_crear_pedido_consultas_constantes(self):
+        """El número de consultas no depende del tamaño del carrito."""
+        uno = self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 12, status=201,
+            data=datos_pedido(self.con_stock[:1]),
+        )
+        seis = self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 12, status=201,
+            data=datos_pedido(self.con_stock[1:7]),
+        )
+        self.assertEqual(len(seis.data['data']['items']), 6)
+        self.assertEqual(len(uno.data['data']['items']), 1)
+
+    def test_numero_pedido_fuera_de_la_transaccion(self):
+        """
+        El sufijo diario es consecutivo y se asigna antes del SAVEPOINT del
+        checkout: el UPSERT del contador no retiene su lock durante la compra.
+        """
+        from django.db import connection
+
+        from apps.pedidos.models import ContadorPedidoDiario
+
+        sql = []
+
+        def registrar(execute, consulta, *args):
+            sql.append(consulta)
+            return execute(consulta, *args)
+
+        ultimo = ContadorPedidoDiario.objects.get(fecha=timezone.localdate()).ultimo
+        with connection.execute_wrapper(registrar):
+            primero = self.client.post('/api/v1/pedidos/crear/', datos_pedido(self.con_stock[:1]), format='json')
+        segundo = self.client.post('/api/v1/pedidos/crear/', datos_pedido(self.con_stock[1:2]), format='json')
+
+        prefijo = f'LP-{timezone.localdate():%Y%m%d}-'
+        self.assertEqual(
+            [primero.data['data']['numero_pedido'], segundo.data['data']['numero_pedido']],
+            [f'{prefijo}{ultimo + 1:04d}', f'{prefijo}{ultimo + 2:04d}'],
+        )
+        contador = next(i for i, q in enumerate(sql) if ContadorPedidoDiario._meta.db_table in q)
+        savepoint = next(i for i, q in enumerate(sql) if q.startswith('SAVEPOINT'))
+        self.assertLess(contador, savepoint)
+
+    def test_crear_pedido_con_cupon(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 13, status=201,
+            data=datos_pedido(self.con_stock[:3], codigo_cupon='BIENVENIDA'),
+        )
+
+    def test_cancelar_pedido(self):
+        self.assertPresupuesto('post', f'/api/v1/pedidos/{self.pendiente.numero_pedido}/cancelar/', 9)
+
+    def test_crear_pedido_idempotente(self):
+        from apps.pedidos.models import Pedido
+
+        datos = datos_pedido(self.con_stock[:2])
+        primero = self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 17, status=201, data=datos,
+            HTTP_IDEMPOTENCY_KEY='clave-1',
+        )
+        total = Pedido.objects.count()
+
+        # El reintento reutiliza la respuesta: usuario del JWT + una consulta indexada
+        reintento = self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 2, status=201, data=datos,
+            HTTP_IDEMPOTENCY_KEY='clave-1',
+        )
+        self.assertEqual(reintento['Idempotent-Replayed'], 'true')
+        self.assertEqual(reintento.json(), primero.json())
+        self.assertEqual(Pedido.objects.count(), total)
+
+        # Misma clave, otro cuerpo
+        self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 2, status=422,
+            data=datos_pedido(self.con_stock[2:3]), HTTP_IDEMPOTENCY_KEY='clave-1',
+        )
+
+    def test_idempotencia_no_guarda_errores_de_validacion(self):
+        from apps.common.models import ClaveIdempotencia
+
+        self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 6, status=400,
+            data={'items': []}, HTTP_IDEMPOTENCY_KEY='clave-invalida',
+        )
+        self.assertFalse(ClaveIdempotencia.objects.filter(clave='clave-invalida').exists())
+
+
+class PedidosInvitadoPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_crear_pedido_invitado(self):
+        productos = [p for p in self.datos['productos'] if p.stock >= 5][:3]
+        self.assertPresupuesto(
+            'post', '/api/v1/pedidos/crear/', 11, status=201,
+            data=datos_pedido(productos, guest_nombre='Invitado', guest_email='invitado@ocaso.test',
+                              guest_telefono='5512345678'),
+        )
+
+
+class PedidosAdminPresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['admin'])
+
+    def test_admin_listar_pedidos(self):
+        self.assertPresupuesto('get', '/api/v1/pedidos/admin/', 3)
+
+    def test_admin_detalle_pedido(self):
+        pedido = self.datos['pedidos_pagados'][0]
+        self.assertPresupuesto('get', f'/api/v1/pedidos/admin/{pedido.numero_pedido}/', 4)
+
+    def test_admin_actualizar_estado(self):
+        pedido = self.datos['pedidos_pagados'][0]
+        self.assertPresupuesto(
+            'patch', f'/api/v1/pedidos/admin/{pedido.numero_pedido}/estado/', 8,
+            data={'estado': 'enviado'},
+        )
+
+
+class ExportarPedidosTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['admin'])
+
+    def test_exportar_csv(self):
+        response = self.assertPresupuesto('get', '/api/v1/pedidos/admin/exportar/', 2)
+        lineas = response.contenido.decode().splitlines()
+        self.assertEqual(lineas[0].split(',')[0], 'numero_pedido')
+        self.assertEqual(len(lineas) - 1, len(self.datos['pedidos_pagados']) + len(self.datos['pedidos_pendientes']))
+
+    def test_exportar_jsonl_filtrado(self):
+        hoy = timezone.localdate().isoformat()
+        response = self.assertPresupuesto(
+            'get', f'/api/v1/pedidos/admin/exportar/?formato=jsonl&estado=pendiente&desde={hoy}&hasta={hoy}', 2,
+        )
+        filas = [json.loads(linea) for linea in response.contenido.decode().splitlines()]
+        self.assertEqual(len(filas), len(self.datos['pedidos_pendientes']))
+        self.assertTrue(all(f['estado'] == 'pendiente' for f in filas))
+
+    def test_estado_invalido(self):
+        self.assertPresupuesto('get', '/api/v1/pedidos/admin/exportar/?estado=perdido', 1, status=400)
+
+
+class ExpirarPedidosTest(PresupuestoAPITestCase):
+
+    def test_cancela_por_lotes_y_libera_reservas(self):
+        from datetime import timedelta
+
+        from apps.common.models import EventoDominio
+        from apps.inventario.models import ReservaStock
+        from apps.pedidos.models import Pedido
+        from apps.pedidos.services import expirar_pedidos
+
+        pendientes = self.datos['pedidos_pendientes']
+        reciente, expirados = pendientes[0], pendientes[1:]
+        hace_dos_dias = timezone.now() - timedelta(days=2)
+        Pedido.objects.filter(id__in=[p.id for p in expirados]).update(created_at=hace_dos_dias)
+        # Un pedido pagado antiguo no se toca
+        pagado = self.datos['pedidos_pagados'][0]
+        Pedido.objects.filter(id=pagado.id).update(created_at=hace_dos_dias)
+
+        for pedido in pendientes:
+            item = pedido.items.first()
+            ReservaStock.objects.create(
+                pedido=pedido, producto_id=item.producto_id, cantidad=item.cantidad,
+                expires_at=timezone.now() + timedelta(minutes=30),
+            )
+
+        # 5 consultas por lote: reclamar, marcar cancelados, leerlos, liberar
+        # sus reservas y publicar sus eventos
+        with self.assertNumQueries(5 * 2 + 2 * 2):  # + SAVEPOINT/RELEASE por lote
+            resultado = expirar_pedidos(timezone.now() - timedelta(hours=24), lote=2)
+
+        self.assertEqual(resultado['cancelados'], len(expirados))
+        self.assertEqual(resultado['lotes'], 2)
+        self.assertEqual(
+            sorted(EventoDominio.objects.filter(tipo='pedido.estado_cambiado').values_list('payload__pedido_id', flat=True)),
+            sorted(p.id for p in expirados),
+        )
+        self.assertFalse(
+            Pedido.objects.filter(id__in=[p.id for p in expirados]).exclude(estado='cancelado').exists()
+        )
+        self.assertEqual(
+            set(ReservaStock.objects.values_list('pedido_id', flat=True)), {reciente.id},
+        )
+        reciente.refresh_from_db()
+        pagado.refresh_from_db()
+        self.assertEqual((reciente.estado, pagado.estado), ('pendiente', 'pagado'))
+
+
+    def test_pago_aprobado_tras_reclamar_no_se_cancela(self):
+        from datetime import timedelta
+        from unittest import mock
+
+        from apps.common.models import EventoDominio
+        from apps.inventario.models import ReservaStock
+        from apps.pagos.models import Pago
+        from apps.pedidos import services
+        from apps.pedidos.models import Pedido
+
+        cobrado, expirado = self.datos['pedidos_pendientes'][:2]
+        Pedido.objects.filter(id__in=[cobrado.id, expirado.id]).update(
+            created_at=timezone.now() - timedelta(days=2),
+        )
+        for pedido in (cobrado, expirado):
+            item = pedido.items.first()
+            ReservaStock.objects.create(
+                pedido=pedido, producto_id=item.producto_id, cantidad=item.cantidad,
+                expires_at=timezone.now() + timedelta(minutes=30),
+            )
+        Pago.objects.create(
+            pedido=cobrado, usuario=cobrado.usuario, monto=cobrado.total,
+            estado=Pago.EstadoChoices.APROBADO,
+        )
+
+        # El SELECT reclama ambos, como si el pago se aprobara justo después
+        def reclamar_sin_ver_el_pago(antes_de):
+            return Pedido.objects.filter(id__in=[cobrado.id, expirado.id], estado='pendiente')
+
+        with mock.patch.object(services, 'pedidos_expirables', reclamar_sin_ver_el_pago):
+            resultado = services.expirar_pedidos(timezone.now() - timedelta(hours=24))
+
+        self.assertEqual(resultado['cancelados'], 1)
+        cobrado.refresh_from_db()
+        expirado.refresh_from_db()
+        self.assertEqual((cobrado.estado, expirado.estado), ('pendiente', 'cancelado'))
+        self.assertEqual(set(ReservaStock.objects.values_list('pedido_id', flat=True)), {cobrado.id})
+        self.assertEqual(
+            list(EventoDominio.objects.filter(tipo='pedido.estado_cambiado').values_list('payload__pedido_id', flat=True)),
+            [expirado.id],
+        )
+
+
+class ProcesarPedidoPagadoStockTest(PresupuestoAPITestCase):
+    """El pago descuenta stock sin consumir lo reservado por otros pedidos."""
+
+    def setUp(self):
+        super().setUp()
+        from apps.pedidos.models import ItemPedido
+
+        self.producto = self.datos['productos'][0]
+        self.producto.stock = 2
+        self.producto.save(update_fields=['stock'])
+        self.vencido, self.vigente = self.datos['pedidos_pendientes'][:2]
+        for pedido in (self.vencido, self.vigente):
+            pedido.items.all().delete()
+            ItemPedido.objects.create(
+                pedido=pedido, producto=self.producto, cantidad=2,
+                precio_unitario=self.producto.precio_final,
+            )
+
+    def reservar(self, pedido, minutos):
+        from datetime import timedelta
+
+        from apps.inventario.models import ReservaStock
+
+        ReservaStock.objects.create(
+            pedido=pedido, producto=self.producto, cantidad=2,
+            expires_at=timezone.now() + timedelta(minutes=minutos),
+        )
+
+    def test_reserva_propia_no_resta(self):
+        from apps.inventario.models import ReservaStock
+        from apps.pedidos.services import procesar_pedido_pagado
+
+        self.reservar(self.vigente, 30)
+        procesar_pedido_pagado(self.vigente.id)
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+        self.assertFalse(ReservaStock.objects.filter(pedido=self.vigente).exists())
+
+    def test_reserva_vencida_no_consume_la_de_otro_pedido(self):
+        from apps.inventario.models import StockInsuficienteError
+        from apps.pedidos.services import procesar_pedido_pagado
+
+        # Compiten por las 2 unidades: la reserva de `vencido` expiró y la
+        # de `vigente` sigue activa
+        self.reservar(self.vencido, -5)
+        self.reservar(self.vigente, 30)
+
+        with self.assertRaises(StockInsuficienteError) as ctx:
+            procesar_pedido_pagado(self.vencido.id)
+        self.assertEqual(ctx.exception.fallidos[0]['disponible'], 0)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 2)
+
+        procesar_pedido_pagado(self.vigente.id)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+        self.vencido.refresh_from_db()
+        self.vigente.refresh_from_db()
+        self.assertEqual((self.vencido.estado, self.vigente.estado), ('pendiente', 'pagado'))
@@ -14,6 +14,7 @@ urlpatterns = [
 
     # Endpoints admin (antes de <str:numero_pedido> para evitar colisión)
     path('admin/', views.AdminPedidosListView.as_view(), name='admin-pedido-list'),
+    path('admin/exportar/', views.AdminExportarPedidosView.as_view(), name='admin-pedido-exportar'),
     path('admin/<str:numero_pedido>/', views.AdminPedidoDetailView.as_view(), name='admin-pedido-detail'),
     path('admin/<str:numero_pedido>/estado/', views.AdminActualizarEstadoView.as_view(), name='admin-pedido-estado'),
 
@@ -4,11 +4,14 @@ Endpoints de usuario (mis pedidos) y endpoints admin (gestión).
 """
 import logging
 
+from django.db.models import Count
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.usuarios.permissions import IsOwner
+from utils.exportacion import ExportacionView
+from utils.idempotencia import idempotente
 from .models import Pedido
 from .serializers import (
     PedidoSerializer,
@@ -27,12 +30,14 @@ logger = logging.getLogger('clarte')
 
 class CrearPedidoView(generics.CreateAPIView):
     """
-    POST /api/v1/pedidos/
+    POST /api/v1/pedidos/crear/
     Crea un nuevo pedido para el usuario autenticado.
+    Acepta Idempotency-Key: los reintentos reciben el mismo pedido.
     """
     serializer_class = CrearPedidoSerializer
     permission_classes = [permissions.AllowAny]
 
+    @idempotente('pedidos:crear')
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -41,6 +46,14 @@ class CrearPedidoView(generics.CreateAPIView):
         user_id = request.user.id if request.user.is_authenticated else 'guest'
         logger.info('Pedido creado: %s por usuario %s', pedido.numero_pedido, user_id)
 
+        # Recargar con relaciones precargadas: la respuesta no depende del tamaño del carrito
+        pedido = (
+            Pedido.objects
+            .select_related('usuario', 'cupon')
+            .prefetch_related('items__producto')
+            .get(pk=pedido.pk)
+        )
+
         return Response(
             {
                 'success': True,
@@ -66,7 +79,7 @@ class MisPedidosListView(generics.ListAPIView):
         return (
             Pedido.objects
             .filter(usuario=self.request.user)
-            .prefetch_related('items')
+            .annotate(items_count=Count('items'))
             .order_by('-created_at')
         )
 
@@ -108,9 +121,11 @@ class CancelarPedidoView(APIView):
 
     def post(self, request, numero_pedido):
         try:
-            pedido = Pedido.objects.get(
-                numero_pedido=numero_pedido,
-                usuario=request.user,
+            pedido = (
+                Pedido.objects
+                .select_related('usuario')
+                .prefetch_related('items__producto')
+                .get(numero_pedido=numero_pedido, usuario=request.user)
             )
         except Pedido.DoesNotExist:
             return Response(
@@ -159,7 +174,7 @@ class AdminPedidosListView(generics.ListAPIView):
     """
     serializer_class = AdminPedidoListSerializer
     permission_classes = [permissions.IsAdminUser]
-    queryset = Pedido.objects.select_related('usuario').prefetch_related('items')
+    queryset = Pedido.objects.select_related('usuario').annotate(items_count=Count('items'))
     search_fields = ['numero_pedido', 'usuario__email']
     filterset_fields = ['estado']
     ordering_fields = ['created_at', 'total']
@@ -201,7 +216,12 @@ class AdminActualizarEstadoView(APIView):
 
     def patch(self, request, numero_pedido):
         try:
-            pedido = Pedido.objects.get(numero_pedido=numero_pedido)
+            pedido = (
+                Pedido.objects
+                .select_related('usuario')
+                .prefetch_related('items__producto')
+                .get(numero_pedido=numero_pedido)
+            )
         except Pedido.DoesNotExist:
             return Response(
                 {
@@ -230,3 +250,29 @@ class AdminActualizarEstadoView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class AdminExportarPedidosView(ExportacionView):
+    """
+    GET /api/v1/pedidos/admin/exportar/?formato=csv|jsonl&desde=&hasta=&estado=
+    Exporta pedidos en streaming (solo admin).
+    """
+    queryset = Pedido.objects.all()
+    estados = Pedido.EstadoChoices
+    nombre_archivo = 'pedidos'
+    columnas = [
+        ('numero_pedido', 'numero_pedido'),
+        ('fecha', 'created_at'),
+        ('estado', 'estado'),
+        ('email', 'usuario__email'),
+        ('email_invitado', 'guest_email'),
+        ('subtotal', 'subtotal'),
+        ('descuento', 'descuento_monto'),
+        ('total', 'total'),
+        ('cupon', 'cupon__codigo'),
+        ('metodo_pago', 'metodo_pago'),
+        ('mercadopago_payment_id', 'mercadopago_payment_id'),
+        ('ciudad', 'ciudad'),
+        ('estado_envio', 'estado_envio'),
+        ('codigo_postal', 'codigo_postal'),
+    ]
@@ -0,0 +1,73 @@
+"""
+Autenticación JWT con el usuario en caché.
+
+JWTAuthentication de simplejwt consulta el usuario en la BD en cada request
+autenticada. JWTAutenticacionCacheada guarda los campos de autorización del
+usuario (solo si está activo) USUARIOS_CACHE_TTL segundos bajo
+`usuarios:auth:<id>`. No se guarda el hash de contraseña ni los datos de
+perfil: el usuario se reconstruye con el resto de campos diferidos, que se
+cargan de la BD solo si se leen (PerfilView recarga el usuario completo).
+
+  - Usuario.save() y Usuario.delete() invalidan la entrada al confirmarse
+    la transacción: perfil, is_active desde el admin, cambio y reset de
+    contraseña, logins sociales y el admin de Django.
+  - Los cambios hechos con QuerySet.update() no pasan por save(): el TTL
+    corto acota cuánto tiempo puede servirse el usuario anterior.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# Campos que viajan en la caché; los demás quedan diferidos
+CAMPOS_CACHEADOS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def clave_usuario(usuario_id):
+    return f'usuarios:auth:{usuario_id}'
+
+
+def invalidar_usuario(usuario_id):
+    """Elimina el usuario de la caché de autenticación."""
+    cache.delete(clave_usuario(usuario_id))
+
+
+class JWTAutenticacionCacheada(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario desde la caché (ver módulo)."""
+
+    def get_user(self, validated_token):
+        usuario_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if usuario_id is None:
+            return super().get_user(validated_token)  # InvalidToken
+
+        clave = clave_usuario(usuario_id)
+        datos = cache.get(clave)
+        if datos is None:
+            # Valida existencia, is_active y revocación como simplejwt
+            usuario = super().get_user(validated_token)
+            datos = {campo: getattr(usuario, campo) for campo in CAMPOS_CACHEADOS}
+            datos['revocacion'] = get_md5_hash_password(usuario.password)
+            cache.set(clave, datos, timeout=settings.USUARIOS_CACHE_TTL)
+            return usuario
+
+        # Un usuario en caché está activo (desactivarlo lo invalida); la
+        # revocación por cambio de contraseña depende del token
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != datos['revocacion']:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code='password_changed'
+            )
+        # from_db espera los campos en el orden del modelo
+        campos = [
+            f.attname for f in self.user_model._meta.concrete_fields
+            if f.attname in CAMPOS_CACHEADOS
+        ]
+        return self.user_model.from_db('default', campos, [datos[campo] for campo in campos])
@@ -3,7 +3,7 @@ Modelo de Usuario personalizado para Clarté.
 Extiende AbstractUser con campos adicionales de perfil y dirección.
 """
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 
@@ -61,6 +61,21 @@ class Usuario(AbstractUser):
     def __str__(self):
         return self.email or self.username
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidar_cache_autenticacion()
+
+    def delete(self, *args, **kwargs):
+        self._invalidar_cache_autenticacion()
+        return super().delete(*args, **kwargs)
+
+    def _invalidar_cache_autenticacion(self):
+        """La autenticación JWT cachea el usuario (ver authentication.py)."""
+        from .authentication import invalidar_usuario
+
+        usuario_id = self.pk
+        transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+
     def get_direccion_completa(self):
         """Retorna la dirección formateada en una sola línea."""
         partes = filter(None, [
@@ -1,3 +1,167 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para autenticación y usuarios.
+"""
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from utils.testing import PASSWORD_PRUEBA, PresupuestoAPITestCase
+
+
+class AuthPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_registro(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/auth/registro/', 5, status=201,
+            data={
+                'username': 'nuevo', 'email': 'nuevo@ocaso.test',
+                'password': 'Otra-Clave-2024!', 'password_confirm': 'Otra-Clave-2024!',
+            },
+        )
+
+    def test_login(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/auth/login/', 3,
+            data={'username': 'cliente0', 'password': PASSWORD_PRUEBA},
+        )
+
+    def test_refresh(self):
+        refresh = RefreshToken.for_user(self.datos['clientes'][0])
+        self.assertPresupuesto('post', '/api/v1/auth/refresh/', 13, data={'refresh': str(refresh)})
+
+    def test_logout(self):
+        cliente = self.datos['clientes'][0]
+        refresh = RefreshToken.for_user(cliente)
+        self.autenticar(cliente)
+        self.assertPresupuesto('post', '/api/v1/auth/logout/', 8, data={'refresh': str(refresh)})
+
+    def test_solicitar_reset(self):
+        self.assertPresupuesto(
+            'post', '/api/v1/auth/solicitar-reset/', 2,
+            data={'email': 'cliente0@ocaso.test'},
+        )
+
+    def test_reset_password(self):
+        cliente = self.datos['clientes'][1]
+        self.assertPresupuesto(
+            'post', '/api/v1/auth/reset-password/', 2,
+            data={
+                'uid': urlsafe_base64_encode(force_bytes(cliente.pk)),
+                'token': default_token_generator.make_token(cliente),
+                'password': 'Nueva-Clave-2024!', 'password_confirm': 'Nueva-Clave-2024!',
+            },
+        )
+
+    @mock.patch('apps.usuarios.views.http_requests.get')
+    def test_google(self, get):
+        get.return_value.json.return_value = {
+            'email': 'cliente0@ocaso.test', 'email_verified': True, 'given_name': 'Cliente',
+        }
+        self.assertPresupuesto('post', '/api/v1/auth/google/', 2, data={'access_token': 'tok'})
+
+    @mock.patch('apps.usuarios.views.http_requests.get')
+    def test_facebook(self, get):
+        get.return_value.json.return_value = {
+            'id': 'fb-1', 'email': 'cliente1@ocaso.test', 'first_name': 'Cliente',
+        }
+        self.assertPresupuesto(
+            'post', '/api/v1/auth/facebook/', 2,
+            data={'accessToken': 'tok', 'userID': 'fb-1'},
+        )
+
+
+class UsuariosPresupuestoTest(PresupuestoAPITestCase):
+
+    def test_perfil(self):
+        self.autenticar(self.datos['clientes'][0])
+        self.assertPresupuesto('get', '/api/v1/usuarios/perfil/', 2)
+
+    def test_actualizar_perfil(self):
+        self.autenticar(self.datos['clientes'][0])
+        self.assertPresupuesto('patch', '/api/v1/usuarios/perfil/', 3, data={'ciudad': 'Puebla'})
+
+    def test_cambiar_password(self):
+        self.autenticar(self.datos['clientes'][2])
+        self.assertPresupuesto(
+            'post', '/api/v1/usuarios/cambiar-password/', 2,
+            data={
+                'password_actual': PASSWORD_PRUEBA,
+                'password_nuevo': 'Nueva-Clave-2024!', 'password_nuevo_confirm': 'Nueva-Clave-2024!',
+            },
+        )
+
+    def test_admin_usuarios(self):
+        self.autenticar(self.datos['admin'])
+        self.assertPresupuesto('get', '/api/v1/usuarios/admin/', 3)
+
+    def test_admin_actualizar_usuario(self):
+        self.autenticar(self.datos['admin'])
+        cliente = self.datos['clientes'][0]
+        self.assertPresupuesto(
+            'patch', f'/api/v1/usuarios/admin/{cliente.id}/', 3,
+            data={'is_active': True},
+        )
+
+
+class JWTCacheadoTest(PresupuestoAPITestCase):
+    """El usuario del JWT se resuelve desde la caché hasta que se guarda."""
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = self.datos['clientes'][0]
+        self.autenticar(self.cliente)
+
+    def test_segunda_request_sin_consulta_de_usuario(self):
+        self.assertPresupuesto('get', '/api/v1/pedidos/', 3)
+        self.assertPresupuesto('get', '/api/v1/pedidos/', 2)
+
+    def test_cache_sin_hash_ni_perfil(self):
+        from django.core.cache import cache
+
+        from apps.usuarios.authentication import clave_usuario
+
+        self.client.get('/api/v1/pedidos/')
+        datos = cache.get(clave_usuario(self.cliente.id))
+        self.assertNotIn('password', datos)
+        self.assertNotIn(self.cliente.password, datos.values())
+        self.assertNotIn('ciudad', datos)
+
+    def test_actualizar_perfil_invalida(self):
+        self.assertPresupuesto('get', '/api/v1/usuarios/perfil/', 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/v1/usuarios/perfil/', {'ciudad': 'Puebla'}, format='json')
+        response = self.assertPresupuesto('get', '/api/v1/usuarios/perfil/', 2)
+        self.assertEqual(response.data['data']['ciudad'], 'Puebla')
+
+    def test_cambiar_password_con_usuario_cacheado(self):
+        from django.core.cache import cache
+
+        from apps.usuarios.authentication import clave_usuario
+        from apps.usuarios.models import Usuario
+
+        Usuario.objects.filter(pk=self.cliente.pk).update(ciudad='Puebla')
+        self.client.get('/api/v1/pedidos/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertPresupuesto(
+                'post', '/api/v1/usuarios/cambiar-password/', 2,
+                data={
+                    'password_actual': PASSWORD_PRUEBA,
+                    'password_nuevo': 'Nueva-Clave-2024!', 'password_nuevo_confirm': 'Nueva-Clave-2024!',
+                },
+            )
+        usuario = Usuario.objects.get(pk=self.cliente.pk)
+        self.assertTrue(usuario.check_password('Nueva-Clave-2024!'))
+        # Guardar el usuario parcial no pisa los campos diferidos
+        self.assertEqual(usuario.ciudad, 'Puebla')
+        self.assertIsNone(cache.get(clave_usuario(self.cliente.id)))
+
+    def test_desactivar_desde_admin_invalida(self):
+        self.assertPresupuesto('get', '/api/v1/usuarios/perfil/', 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.autenticar(self.datos['admin'])
+            self.client.patch(f'/api/v1/usuarios/admin/{self.cliente.id}/', {'is_active': False}, format='json')
+        self.autenticar(self.cliente)
+        self.assertPresupuesto('get', '/api/v1/usuarios/perfil/', 1, status=401)
@@ -22,6 +22,7 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.common.servicios.brevo_service import enviar_email_registro, enviar_reset_password
+from utils.instrumentacion import medir_externo
 from .serializers import (
     RegistroSerializer, UsuarioSerializer, AdminUsuarioSerializer,
     CambioPasswordSerializer, SolicitarResetPasswordSerializer, ResetPasswordSerializer,
@@ -50,11 +51,11 @@ class RegistroView(generics.CreateAPIView):
 
         logger.info('Nuevo usuario registrado: %s (ID: %s)', usuario.email, usuario.id)
 
-        # Enviar email de bienvenida (no bloquea el registro si falla)
+        # Encolar email de bienvenida (se entrega fuera del request)
         try:
             enviar_email_registro(usuario)
         except Exception as e:
-            logger.error('Error al enviar email de registro a %s: %s', usuario.email, e)
+            logger.error('Error al encolar email de registro a %s: %s', usuario.email, e)
 
         return Response(
             {
@@ -128,7 +129,9 @@ class PerfilView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user puede venir de la caché de autenticación con los
+        # campos de perfil diferidos: se carga completo en una consulta
+        return Usuario.objects.get(pk=self.request.user.pk)
 
     def retrieve(self, request, *args, **kwargs):
         serializer = self.get_serializer(self.get_object())
@@ -224,9 +227,9 @@ class SolicitarResetPasswordView(APIView):
             reset_url = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}"
             try:
                 enviar_reset_password(usuario, reset_url)
-                logger.info('Reset password email enviado a %s', email)
+                logger.info('Reset password email encolado para %s', email)
             except Exception as e:
-                logger.error('Error enviando reset password email a %s: %s', email, e)
+                logger.error('Error encolando reset password email a %s: %s', email, e)
 
         return Response(
             {
@@ -342,11 +345,12 @@ class GoogleLoginView(APIView):
             )
 
         try:
-            userinfo_response = http_requests.get(
-                'https://www.googleapis.com/oauth2/v3/userinfo',
-                headers={'Authorization': f'Bearer {access_token}'},
-                timeout=10,
-            )
+            with medir_externo('google'):
+                userinfo_response = http_requests.get(
+                    'https://www.googleapis.com/oauth2/v3/userinfo',
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    timeout=10,
+                )
             userinfo = userinfo_response.json()
         except Exception as e:
             logger.error('Error al contactar Google userinfo API: %s', e)
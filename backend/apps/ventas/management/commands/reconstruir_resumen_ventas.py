@@ -0,0 +1,28 @@
+"""
+Management command: reconstruir_resumen_ventas
+
+Recalcula desde cero los resúmenes diario, mensual y por producto que usa
+el dashboard (/api/v1/ventas/resumen/). Normalmente se mantienen solos al
+crear cada venta; usar tras correcciones manuales de datos o un cambio de
+TIME_ZONE.
+
+Uso:
+    python manage.py reconstruir_resumen_ventas
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes pre-agregados de ventas.'
+
+    def handle(self, *args, **options):
+        # Import here to avoid AppRegistryNotReady at module level
+        from apps.ventas.services import reconstruir_resumenes
+
+        filas = reconstruir_resumenes()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Resúmenes reconstruidos: {filas['diario']} días, {filas['mensual']} meses, "
+                f"{filas['productos']} filas por producto."
+            )
+        )
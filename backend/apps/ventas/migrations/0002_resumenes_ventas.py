@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:59
+
+from django.db import migrations, models
+from django.db.models import Count, DateField, Max, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Carga inicial de los resúmenes con las ventas existentes."""
+    Venta = apps.get_model('ventas', 'Venta')
+    ItemVenta = apps.get_model('ventas', 'ItemVenta')
+    ResumenVentaDiario = apps.get_model('ventas', 'ResumenVentaDiario')
+    ResumenVentaMensual = apps.get_model('ventas', 'ResumenVentaMensual')
+    ResumenProductoMensual = apps.get_model('ventas', 'ResumenProductoMensual')
+
+    ResumenVentaDiario.objects.bulk_create([
+        ResumenVentaDiario(fecha=fila['dia'], total=fila['total'], cantidad=fila['cantidad'])
+        for fila in Venta.objects.annotate(dia=TruncDate('fecha_venta'))
+        .values('dia').annotate(total=Sum('total'), cantidad=Count('id')).order_by()
+    ])
+    ResumenVentaMensual.objects.bulk_create([
+        ResumenVentaMensual(mes=fila['mes'], total=fila['total'], cantidad=fila['cantidad'])
+        for fila in Venta.objects.annotate(mes=TruncMonth('fecha_venta', output_field=DateField()))
+        .values('mes').annotate(total=Sum('total'), cantidad=Count('id')).order_by()
+    ])
+    ResumenProductoMensual.objects.bulk_create([
+        ResumenProductoMensual(
+            mes=fila['mes'], sku=fila['sku'], nombre_producto=fila['nombre'],
+            unidades=fila['unidades'], ingresos=fila['ingresos'],
+        )
+        for fila in ItemVenta.objects.annotate(mes=TruncMonth('venta__fecha_venta', output_field=DateField()))
+        .values('mes', 'sku')
+        .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'), nombre=Max('nombre_producto'))
+        .order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiario',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False, verbose_name='fecha')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='total')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='cantidad de ventas')),
+            ],
+            options={
+                'verbose_name': 'resumen diario de ventas',
+                'verbose_name_plural': 'resúmenes diarios de ventas',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentaMensual',
+            fields=[
+                ('mes', models.DateField(primary_key=True, serialize=False, verbose_name='mes')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='total')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='cantidad de ventas')),
+            ],
+            options={
+                'verbose_name': 'resumen mensual de ventas',
+                'verbose_name_plural': 'resúmenes mensuales de ventas',
+                'ordering': ['-mes'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenProductoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='mes')),
+                ('sku', models.CharField(max_length=50, verbose_name='SKU')),
+                ('nombre_producto', models.CharField(max_length=300, verbose_name='nombre del producto')),
+                ('unidades', models.PositiveIntegerField(default=0, verbose_name='unidades')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ingresos')),
+            ],
+            options={
+                'verbose_name': 'resumen mensual por producto',
+                'verbose_name_plural': 'resúmenes mensuales por producto',
+                'ordering': ['-mes', '-unidades'],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'sku'), name='resumen_producto_mes_sku_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -81,3 +81,63 @@ class ItemVenta(models.Model):
 
     def __str__(self):
         return f'{self.nombre_producto} x{self.cantidad}'
+
+
+# ──────────────────────────────────────────────
+# RESÚMENES PRE-AGREGADOS (dashboard)
+# ──────────────────────────────────────────────
+# Se actualizan de forma incremental en crear_venta_desde_pedido y se pueden
+# reconstruir con `python manage.py reconstruir_resumen_ventas`.
+# Las fechas son locales (TIME_ZONE), igual que TruncDate/TruncMonth.
+
+class ResumenVentaDiario(models.Model):
+    """Ingresos y número de ventas por día."""
+
+    fecha = models.DateField(_('fecha'), primary_key=True)
+    total = models.DecimalField(_('total'), max_digits=14, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(_('cantidad de ventas'), default=0)
+
+    class Meta:
+        verbose_name = _('resumen diario de ventas')
+        verbose_name_plural = _('resúmenes diarios de ventas')
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f'{self.fecha} - {self.cantidad} ventas - ${self.total}'
+
+
+class ResumenVentaMensual(models.Model):
+    """Ingresos y número de ventas por mes (mes = primer día del mes)."""
+
+    mes = models.DateField(_('mes'), primary_key=True)
+    total = models.DecimalField(_('total'), max_digits=14, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(_('cantidad de ventas'), default=0)
+
+    class Meta:
+        verbose_name = _('resumen mensual de ventas')
+        verbose_name_plural = _('resúmenes mensuales de ventas')
+        ordering = ['-mes']
+
+    def __str__(self):
+        return f'{self.mes:%Y-%m} - {self.cantidad} ventas - ${self.total}'
+
+
+class ResumenProductoMensual(models.Model):
+    """Unidades e ingresos por SKU y mes."""
+
+    mes = models.DateField(_('mes'))
+    sku = models.CharField(_('SKU'), max_length=50)
+    nombre_producto = models.CharField(_('nombre del producto'), max_length=300)
+    unidades = models.PositiveIntegerField(_('unidades'), default=0)
+    ingresos = models.DecimalField(_('ingresos'), max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _('resumen mensual por producto')
+        verbose_name_plural = _('resúmenes mensuales por producto')
+        ordering = ['-mes', '-unidades']
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'sku'], name='resumen_producto_mes_sku_unico'),
+        ]
+
+    def __str__(self):
+        return f'{self.mes:%Y-%m} - {self.sku} x{self.unidades}'
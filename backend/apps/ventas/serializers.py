@@ -18,10 +18,13 @@ class ItemVentaSerializer(serializers.ModelSerializer):
 
 
 class VentaListSerializer(serializers.ModelSerializer):
-    """Serializer resumido para listado de ventas."""
+    """
+    Serializer resumido para listado de ventas.
+    items_count viene anotado en el queryset (Count('items')) para evitar N+1.
+    """
     numero_pedido = serializers.CharField(source='pedido.numero_pedido', read_only=True)
     usuario_email = serializers.CharField(source='usuario.email', read_only=True)
-    items_count = serializers.SerializerMethodField()
+    items_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Venta
@@ -30,9 +33,6 @@ class VentaListSerializer(serializers.ModelSerializer):
             'total', 'items_count', 'fecha_venta',
         ]
 
-    def get_items_count(self, obj):
-        return obj.items.count()
-
 
 class VentaDetailSerializer(serializers.ModelSerializer):
     """Serializer completo con items nested."""
@@ -1,12 +1,27 @@
 """
 Servicio de creación de ventas.
-Llamado por el post_pago_service al confirmarse un pago.
+crear_venta_por_evento es suscriptor del evento pedido.pagado
+(settings.EVENTOS_SUSCRIPTORES).
+Mantiene además los resúmenes pre-agregados que lee ResumenVentasView.
 """
 import logging
+from collections import defaultdict
+from decimal import Decimal
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Max, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
 
-from .models import Venta, ItemVenta
+from apps.pedidos.models import Pedido
+
+from .models import (
+    ItemVenta,
+    ResumenProductoMensual,
+    ResumenVentaDiario,
+    ResumenVentaMensual,
+    Venta,
+)
 
 logger = logging.getLogger('clarte')
 
@@ -25,6 +40,7 @@ def crear_venta_desde_pedido(pedido):
 
     items_pedido = pedido.items.select_related('producto')
     snapshot = []
+    items_venta = []
 
     with transaction.atomic():
         venta = Venta.objects.create(
@@ -44,7 +60,7 @@ def crear_venta_desde_pedido(pedido):
             }
             snapshot.append(item_data)
 
-            ItemVenta.objects.create(
+            items_venta.append(ItemVenta(
                 venta=venta,
                 producto=item.producto,
                 nombre_producto=item.producto.nombre,
@@ -52,13 +68,140 @@ def crear_venta_desde_pedido(pedido):
                 cantidad=item.cantidad,
                 precio_unitario=item.precio_unitario,
                 subtotal=item.subtotal,
-            )
+            ))
 
+        ItemVenta.objects.bulk_create(items_venta)
         venta.items_snapshot = snapshot
         venta.save(update_fields=['items_snapshot'])
 
+        acumular_venta(venta, items_venta)
+
     logger.info(
         'Venta #%s creada para pedido %s (%d items, total $%s).',
         venta.id, pedido.numero_pedido, len(snapshot), venta.total,
     )
     return venta
+
+
+def crear_venta_por_evento(evento):
+    """Suscriptor de pedido.pagado: crea la venta del pedido (idempotente)."""
+    crear_venta_desde_pedido(Pedido.objects.get(id=evento.payload['pedido_id']))
+
+
+# ──────────────────────────────────────────────
+# RESÚMENES PRE-AGREGADOS
+# ──────────────────────────────────────────────
+
+def acumular_venta(venta, items):
+    """
+    Suma una venta (y sus ItemVenta) a los resúmenes diario, mensual y por SKU.
+    Tres upserts (INSERT ... ON CONFLICT DO UPDATE), sin importar el número de
+    items. Debe llamarse dentro de la transacción que crea la venta.
+    """
+    fecha = timezone.localdate(venta.fecha_venta)
+    mes = fecha.replace(day=1)
+
+    # Agrupar por SKU: ON CONFLICT no admite dos filas con la misma clave
+    por_sku = defaultdict(lambda: {'nombre': '', 'unidades': 0, 'ingresos': Decimal('0')})
+    for item in items:
+        acumulado = por_sku[item.sku]
+        acumulado['nombre'] = item.nombre_producto
+        acumulado['unidades'] += item.cantidad
+        acumulado['ingresos'] += item.subtotal
+
+    diario = ResumenVentaDiario._meta.db_table
+    mensual = ResumenVentaMensual._meta.db_table
+    productos = ResumenProductoMensual._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {diario} (fecha, total, cantidad) VALUES (%s, %s, 1)
+            ON CONFLICT (fecha) DO UPDATE SET
+                total = {diario}.total + EXCLUDED.total,
+                cantidad = {diario}.cantidad + 1
+            """,
+            [fecha, venta.total],
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {mensual} (mes, total, cantidad) VALUES (%s, %s, 1)
+            ON CONFLICT (mes) DO UPDATE SET
+                total = {mensual}.total + EXCLUDED.total,
+                cantidad = {mensual}.cantidad + 1
+            """,
+            [mes, venta.total],
+        )
+        if por_sku:
+            valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(por_sku))
+            params = []
+            for sku, acumulado in por_sku.items():
+                params += [mes, sku, acumulado['nombre'], acumulado['unidades'], acumulado['ingresos']]
+            cursor.execute(
+                f"""
+                INSERT INTO {productos} (mes, sku, nombre_producto, unidades, ingresos)
+                VALUES {valores}
+                ON CONFLICT (mes, sku) DO UPDATE SET
+                    nombre_producto = EXCLUDED.nombre_producto,
+                    unidades = {productos}.unidades + EXCLUDED.unidades,
+                    ingresos = {productos}.ingresos + EXCLUDED.ingresos
+                """,
+                params,
+            )
+
+
+@transaction.atomic
+def reconstruir_resumenes():
+    """
+    Recalcula todos los resúmenes desde Venta/ItemVenta.
+    Bloquea las tablas de resumen mientras tanto: las ventas concurrentes
+    esperan y se acumulan sobre el resultado reconstruido.
+    Retorna el número de filas generadas por tabla.
+    """
+    tablas = [m._meta.db_table for m in (ResumenVentaDiario, ResumenVentaMensual, ResumenProductoMensual)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {', '.join(tablas)} IN EXCLUSIVE MODE")
+
+    ResumenVentaDiario.objects.all().delete()
+    ResumenVentaMensual.objects.all().delete()
+    ResumenProductoMensual.objects.all().delete()
+
+    diarios = ResumenVentaDiario.objects.bulk_create([
+        ResumenVentaDiario(fecha=fila['dia'], total=fila['total'], cantidad=fila['cantidad'])
+        for fila in (
+            Venta.objects
+            .annotate(dia=TruncDate('fecha_venta'))
+            .values('dia')
+            .annotate(total=Sum('total'), cantidad=Count('id'))
+            .order_by()
+        )
+    ])
+    mensuales = ResumenVentaMensual.objects.bulk_create([
+        ResumenVentaMensual(mes=fila['mes'], total=fila['total'], cantidad=fila['cantidad'])
+        for fila in (
+            Venta.objects
+            .annotate(mes=TruncMonth('fecha_venta', output_field=DateField()))
+            .values('mes')
+            .annotate(total=Sum('total'), cantidad=Count('id'))
+            .order_by()
+        )
+    ])
+    por_producto = ResumenProductoMensual.objects.bulk_create([
+        ResumenProductoMensual(
+            mes=fila['mes'], sku=fila['sku'], nombre_producto=fila['nombre'],
+            unidades=fila['unidades'], ingresos=fila['ingresos'],
+        )
+        for fila in (
+            ItemVenta.objects
+            .annotate(mes=TruncMonth('venta__fecha_venta', output_field=DateField()))
+            .values('mes', 'sku')
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'), nombre=Max('nombre_producto'))
+            .order_by()
+        )
+    ], batch_size=1000)
+
+    logger.info(
+        'Resúmenes de ventas reconstruidos: %d días, %d meses, %d filas por producto.',
+        len(diarios), len(mensuales), len(por_producto),
+    )
+    return {'diario': len(diarios), 'mensual': len(mensuales), 'productos': len(por_producto)}
@@ -1,3 +1,82 @@
-from django.test import TestCase
+"""
+Presupuestos de consultas y tiempo para los endpoints de ventas.
+"""
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.ventas.models import (
+    ItemVenta,
+    ResumenProductoMensual,
+    ResumenVentaDiario,
+    ResumenVentaMensual,
+    Venta,
+)
+from utils.testing import PresupuestoAPITestCase
+
+
+class VentasAdminPresupuestoTest(PresupuestoAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar(self.datos['admin'])
+
+    def test_listar_ventas(self):
+        self.assertPresupuesto('get', '/api/v1/ventas/', 3)
+
+    def test_detalle_venta(self):
+        venta = Venta.objects.first()
+        self.assertPresupuesto('get', f'/api/v1/ventas/{venta.id}/', 4)
+
+    def test_resumen_ventas(self):
+        self.assertPresupuesto('get', '/api/v1/ventas/resumen/', 5)
+
+    def test_exportar_ventas(self):
+        response = self.assertPresupuesto('get', '/api/v1/ventas/exportar/?formato=jsonl', 2)
+        self.assertEqual(len(response.contenido.decode().splitlines()), Venta.objects.count())
+
+    def test_exportar_ventas_rechaza_estado(self):
+        # Venta no tiene estado: el filtro se rechaza en vez de llegar al ORM
+        response = self.client.get('/api/v1/ventas/exportar/?estado=x')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('estado', response.json()['errors'])
+
+
+class ResumenesVentasTest(PresupuestoAPITestCase):
+    """Los resúmenes incrementales coinciden con las tablas de ventas."""
+
+    def filas(self):
+        return (
+            list(ResumenVentaDiario.objects.values_list('fecha', 'total', 'cantidad')),
+            list(ResumenVentaMensual.objects.values_list('mes', 'total', 'cantidad')),
+            list(ResumenProductoMensual.objects.order_by('sku').values_list('mes', 'sku', 'unidades', 'ingresos')),
+        )
+
+    def test_incremental_igual_a_reconstruccion(self):
+        incrementales = self.filas()
+        call_command('reconstruir_resumen_ventas', stdout=StringIO())
+        self.assertEqual(self.filas(), incrementales)
+
+    def test_resumen_refleja_las_ventas(self):
+        self.autenticar(self.datos['admin'])
+        data = self.client.get('/api/v1/ventas/resumen/').data['data']
+
+        self.assertEqual(data['cantidad_ventas'], Venta.objects.count())
+        self.assertEqual(data['total_ventas'], Venta.objects.aggregate(t=Sum('total'))['t'])
+        top = (
+            ItemVenta.objects.values('sku').annotate(u=Sum('cantidad'))
+            .order_by('-u').first()
+        )
+        self.assertEqual(data['producto_mas_vendido']['total_vendido'], top['u'])
+
+    def test_mes_como_datetime_local(self):
+        self.autenticar(self.datos['admin'])
+        meses = self.client.get('/api/v1/ventas/resumen/').json()['data']['ventas_por_mes']
+
+        esperado = timezone.localtime(Venta.objects.latest('fecha_venta').fecha_venta).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0,
+        )
+        # Mismo formato que TruncMonth: '2026-10-01T00:00:00-06:00'
+        self.assertEqual(meses[0]['mes'], esperado.isoformat())
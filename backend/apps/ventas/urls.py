@@ -9,5 +9,6 @@ from . import views
 urlpatterns = [
     path('', views.VentaListView.as_view(), name='venta-list'),
     path('resumen/', views.ResumenVentasView.as_view(), name='venta-resumen'),
+    path('exportar/', views.ExportarVentasView.as_view(), name='venta-exportar'),
     path('<int:pk>/', views.VentaDetailView.as_view(), name='venta-detail'),
 ]
@@ -2,13 +2,16 @@
 Vistas de la app de ventas (solo admin).
 Listado, detalle y estadísticas.
 """
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDate, TruncMonth
+from datetime import datetime, time
+
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Venta, ItemVenta
+from utils.exportacion import ExportacionView
+from .models import ResumenProductoMensual, ResumenVentaDiario, ResumenVentaMensual, Venta
 from .serializers import VentaListSerializer, VentaDetailSerializer
 
 
@@ -23,7 +26,7 @@ class VentaListView(generics.ListAPIView):
     queryset = (
         Venta.objects
         .select_related('pedido', 'usuario')
-        .prefetch_related('items')
+        .annotate(items_count=Count('items'))
     )
     filterset_fields = ['usuario']
     search_fields = ['pedido__numero_pedido', 'usuario__email']
@@ -63,42 +66,49 @@ class ResumenVentasView(APIView):
       - Ventas agrupadas por día (últimos 30 registros).
       - Ventas agrupadas por mes (últimos 12 registros).
       - Producto más vendido.
+    Lee los resúmenes pre-agregados (ResumenVenta*), no la tabla de ventas.
     """
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        # Totales generales
-        totales = Venta.objects.aggregate(
+        # Totales generales (una fila por mes)
+        totales = ResumenVentaMensual.objects.aggregate(
             total_ventas=Sum('total'),
-            cantidad_ventas=Count('id'),
+            cantidad_ventas=Sum('cantidad'),
         )
 
         # Ventas por día (últimos 30 días con ventas)
         ventas_por_dia = list(
-            Venta.objects
-            .annotate(dia=TruncDate('fecha_venta'))
-            .values('dia')
-            .annotate(total=Sum('total'), cantidad=Count('id'))
-            .order_by('-dia')[:30]
+            ResumenVentaDiario.objects
+            .values('total', 'cantidad', dia=F('fecha'))
+            .order_by('-fecha')[:30]
         )
 
         # Ventas por mes (últimos 12 meses con ventas)
         ventas_por_mes = list(
-            Venta.objects
-            .annotate(mes=TruncMonth('fecha_venta'))
-            .values('mes')
-            .annotate(total=Sum('total'), cantidad=Count('id'))
+            ResumenVentaMensual.objects
+            .values('mes', 'total', 'cantidad')
             .order_by('-mes')[:12]
         )
+        # `mes` se sirve como datetime local (inicio del mes), igual que
+        # cuando se calculaba con TruncMonth sobre fecha_venta
+        for fila in ventas_por_mes:
+            fila['mes'] = timezone.make_aware(datetime.combine(fila['mes'], time.min))
 
         # Producto más vendido
         top_producto = (
-            ItemVenta.objects
-            .values('nombre_producto', 'sku')
-            .annotate(total_vendido=Sum('cantidad'), ingresos=Sum('subtotal'))
+            ResumenProductoMensual.objects
+            .values('sku')
+            .annotate(
+                nombre=Max('nombre_producto'),
+                total_vendido=Sum('unidades'),
+                ingresos=Sum('ingresos'),
+            )
             .order_by('-total_vendido')
             .first()
         )
+        if top_producto:
+            top_producto['nombre_producto'] = top_producto.pop('nombre')
 
         return Response(
             {
@@ -114,3 +124,21 @@ class ResumenVentasView(APIView):
                 'errors': None,
             },
         )
+
+
+class ExportarVentasView(ExportacionView):
+    """
+    GET /api/v1/ventas/exportar/?formato=csv|jsonl&desde=&hasta=
+    Exporta ventas en streaming (solo admin).
+    """
+    queryset = Venta.objects.annotate(items_count=Count('items'))
+    campo_fecha = 'fecha_venta'
+    nombre_archivo = 'ventas'
+    columnas = [
+        ('id', 'id'),
+        ('fecha', 'fecha_venta'),
+        ('numero_pedido', 'pedido__numero_pedido'),
+        ('email', 'usuario__email'),
+        ('items', 'items_count'),
+        ('total', 'total'),
+    ]
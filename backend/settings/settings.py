@@ -8,6 +8,8 @@ import os
 
 import environ
 import dj_database_url
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 # ──────────────────────────────────────────────
 # BASE
@@ -32,6 +34,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Terceros
     'rest_framework',
@@ -57,6 +60,7 @@ INSTALLED_APPS = [
 # ──────────────────────────────────────────────
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utils.instrumentacion.InstrumentacionMiddleware',  # Server-Timing + log muestreado
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Archivos estáticos en producción
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS antes de CommonMiddleware
@@ -106,6 +110,62 @@ else:
         }
     }
 
+# ──────────────────────────────────────────────
+# CACHÉ
+# En producción CACHE_URL apunta a Redis (redis://...) para compartir la caché
+# entre workers de gunicorn; en local y tests se usa memoria local.
+# ──────────────────────────────────────────────
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# Workers de gunicorn (el Procfile lo exporta, 1 por defecto). Con más de uno
+# la caché en memoria local no se comparte: las invalidaciones del catálogo y
+# del usuario autenticado solo llegarían a un worker y /metrics vería un solo
+# proceso. Para escalar hay que definir CACHE_URL.
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=1)
+if WEB_CONCURRENCY > 1 and CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    raise ImproperlyConfigured(
+        f'WEB_CONCURRENCY={WEB_CONCURRENCY} requiere una caché compartida: '
+        'define CACHE_URL (ej: redis://...).'
+    )
+CATALOGO_CACHE_TIMEOUT = env.int('CATALOGO_CACHE_TIMEOUT', default=300)
+# Usuario autenticado por JWT (apps/usuarios/authentication.py): segundos en caché
+USUARIOS_CACHE_TTL = env.int('USUARIOS_CACHE_TTL', default=60)
+
+# ──────────────────────────────────────────────
+# INVENTARIO — Reservas de stock durante el checkout
+# ──────────────────────────────────────────────
+RESERVA_STOCK_MINUTOS = env.int('RESERVA_STOCK_MINUTOS', default=30)
+# Productos "comprados juntos" que se guardan por producto (calcular_relacionados)
+RECOMENDACIONES_TOP_K = env.int('RECOMENDACIONES_TOP_K', default=12)
+# Cortes de los rangos de precio del endpoint de facetas (MXN)
+CATALOGO_RANGOS_PRECIO = env.list('CATALOGO_RANGOS_PRECIO', cast=int, default=[500, 1000, 2500, 5000])
+# Productos (ids + SKUs) por consulta de disponibilidad del carrito
+CATALOGO_DISPONIBILIDAD_MAX = env.int('CATALOGO_DISPONIBILIDAD_MAX', default=300)
+
+# ──────────────────────────────────────────────
+# IDEMPOTENCIA — Respuestas guardadas por Idempotency-Key (pedidos, pagos)
+# Una petición "en proceso" más antigua que IDEMPOTENCIA_BLOQUEO_SEGUNDOS se
+# considera abandonada (worker caído) y la clave puede reutilizarse.
+# ──────────────────────────────────────────────
+IDEMPOTENCIA_TTL_HORAS = env.int('IDEMPOTENCIA_TTL_HORAS', default=24)
+IDEMPOTENCIA_BLOQUEO_SEGUNDOS = env.int('IDEMPOTENCIA_BLOQUEO_SEGUNDOS', default=300)
+
+# ──────────────────────────────────────────────
+# INSTRUMENTACIÓN — Server-Timing (staff) y log por request
+# Fracción de requests registradas (0.0–1.0); las que superan
+# INSTRUMENTACION_LENTO_MS se registran siempre.
+# ──────────────────────────────────────────────
+INSTRUMENTACION_MUESTREO = env.float('INSTRUMENTACION_MUESTREO', default=0.01)
+INSTRUMENTACION_LENTO_MS = env.int('INSTRUMENTACION_LENTO_MS', default=1000)
+# Métricas (/metrics): cada proceso publica su snapshot en la caché cada
+# METRICAS_INTERVALO_VOLCADO segundos; los de procesos sin actividad en
+# METRICAS_TTL segundos expiran y dejan de leerse.
+METRICAS_INTERVALO_VOLCADO = env.int('METRICAS_INTERVALO_VOLCADO', default=15)
+METRICAS_TTL = env.int('METRICAS_TTL', default=3600)
+# Bearer token del scraper de Prometheus para /metrics (vacío: solo admin)
+METRICAS_TOKEN = env('METRICAS_TOKEN', default='')
+
 # ──────────────────────────────────────────────
 # MODELO DE USUARIO PERSONALIZADO
 # ──────────────────────────────────────────────
@@ -126,7 +186,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ──────────────────────────────────────────────
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.usuarios.authentication.JWTAutenticacionCacheada',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -136,6 +196,11 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    # JSONRenderer que mide el tiempo de serialización (utils/instrumentacion.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.instrumentacion.JSONRendererInstrumentado',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'utils.pagination.StandardResultsPagination',
     'PAGE_SIZE': 12,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -183,6 +248,7 @@ CSRF_TRUSTED_ORIGINS = env.list('CSRF_TRUSTED_ORIGINS', default=[
     'https://www.ocaso.com.mx',
 ])
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # ──────────────────────────────────────────────
 # SEGURIDAD — Producción (Railway usa HTTPS vía proxy)
@@ -227,6 +293,17 @@ CLOUDINARY_STORAGE = {
 MERCADOPAGO_ACCESS_TOKEN = env('MERCADOPAGO_ACCESS_TOKEN', default='')
 MERCADOPAGO_PUBLIC_KEY = env('MERCADOPAGO_PUBLIC_KEY', default='')
 MERCADOPAGO_WEBHOOK_SECRET = env('MERCADOPAGO_WEBHOOK_SECRET', default='')
+# Cliente HTTP: timeouts (segundos), reintentos y tamaño del pool keep-alive
+MERCADOPAGO_TIMEOUT_CONEXION = env.float('MERCADOPAGO_TIMEOUT_CONEXION', default=3.05)
+MERCADOPAGO_TIMEOUT_LECTURA = env.float('MERCADOPAGO_TIMEOUT_LECTURA', default=15)
+MERCADOPAGO_MAX_REINTENTOS = env.int('MERCADOPAGO_MAX_REINTENTOS', default=2)
+MERCADOPAGO_POOL_SIZE = env.int('MERCADOPAGO_POOL_SIZE', default=10)
+# Bandeja de webhooks: reintentos con backoff exponencial y tiempo que una
+# notificación reclamada queda oculta a otros workers (segundos, ver utils/bandeja.py)
+WEBHOOK_MAX_INTENTOS = env.int('WEBHOOK_MAX_INTENTOS', default=8)
+WEBHOOK_BACKOFF_BASE = env.int('WEBHOOK_BACKOFF_BASE', default=30)
+WEBHOOK_BACKOFF_MAX = env.int('WEBHOOK_BACKOFF_MAX', default=3600)
+WEBHOOK_BLOQUEO_SEGUNDOS = env.int('WEBHOOK_BLOQUEO_SEGUNDOS', default=300)
 
 # ──────────────────────────────────────────────
 # BREVO (Email transaccional)
@@ -237,6 +314,37 @@ BREVO_SENDER_NAME = env('BREVO_SENDER_NAME', default='Ocaso')
 BREVO_TEMPLATE_NEWSLETTER_CONFIRM = env.int('BREVO_TEMPLATE_NEWSLETTER_CONFIRM', default=0)
 BREVO_TEMPLATE_REGISTRO = env.int('BREVO_TEMPLATE_REGISTRO', default=0)
 BREVO_TEMPLATE_PEDIDO = env.int('BREVO_TEMPLATE_PEDIDO', default=0)
+# Bandeja de salida: cliente de envío (ClienteBrevoMemoria para desarrollo/tests),
+# reintentos con backoff exponencial y bloqueo del reclamo (segundos)
+EMAIL_CLIENTE = env('EMAIL_CLIENTE', default='apps.common.servicios.brevo_service.ClienteBrevo')
+EMAIL_MAX_INTENTOS = env.int('EMAIL_MAX_INTENTOS', default=6)
+EMAIL_BACKOFF_BASE = env.int('EMAIL_BACKOFF_BASE', default=60)
+EMAIL_BACKOFF_MAX = env.int('EMAIL_BACKOFF_MAX', default=3600)
+EMAIL_BLOQUEO_SEGUNDOS = env.int('EMAIL_BLOQUEO_SEGUNDOS', default=300)
+
+# ──────────────────────────────────────────────
+# EVENTOS DE DOMINIO — Bandeja de salida (comando despachar_eventos)
+# Suscriptores por tipo de evento (rutas de funciones que reciben el
+# EventoDominio); deben ser idempotentes. Reintentos con backoff y bloqueo
+# del reclamo (segundos).
+# ──────────────────────────────────────────────
+EVENTOS_SUSCRIPTORES = {
+    'pago.aprobado': [
+        'apps.pagos.servicios.post_pago_service.procesar_pago_aprobado',
+    ],
+    'pedido.pagado': [
+        'apps.descuentos.services.registrar_uso_cupon',
+        'apps.ventas.services.crear_venta_por_evento',
+        'apps.pagos.servicios.post_pago_service.notificar_pedido_pagado',
+    ],
+    'pedido.estado_cambiado': [],
+}
+EVENTOS_MAX_INTENTOS = env.int('EVENTOS_MAX_INTENTOS', default=8)
+EVENTOS_BACKOFF_BASE = env.int('EVENTOS_BACKOFF_BASE', default=30)
+EVENTOS_BACKOFF_MAX = env.int('EVENTOS_BACKOFF_MAX', default=3600)
+EVENTOS_BLOQUEO_SEGUNDOS = env.int('EVENTOS_BLOQUEO_SEGUNDOS', default=300)
+# Los eventos procesados se eliminan tras N días (limpiar_pedidos_expirados)
+EVENTOS_RETENCION_DIAS = env.int('EVENTOS_RETENCION_DIAS', default=7)
 
 # ──────────────────────────────────────────────
 # OAUTH — Social Login
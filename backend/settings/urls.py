@@ -8,6 +8,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from apps.usuarios.urls import auth_urlpatterns, usuarios_urlpatterns
+from utils.metricas import MetricasView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,6 +22,9 @@ urlpatterns = [
     path('api/v1/pagos/', include('apps.pagos.urls')),
     path('api/v1/ventas/', include('apps.ventas.urls')),
     path('api/v1/contacto/', include('apps.common.urls')),
+
+    # ── Métricas (Prometheus, solo admin) ──
+    path('metrics', MetricasView.as_view(), name='metrics'),
 ]
 
 # Servir archivos media en desarrollo
@@ -0,0 +1,179 @@
+"""
+Bandejas en base de datos (emails salientes, webhooks entrantes, eventos
+de dominio): reclamo con SKIP LOCKED, reintentos con backoff exponencial y
+el comando worker que las consume.
+
+Cada bandeja se configura con un prefijo de settings:
+    <PREFIJO>_MAX_INTENTOS      intentos antes de marcarla como fallida
+    <PREFIJO>_BACKOFF_BASE      espera tras el primer error (segundos)
+    <PREFIJO>_BACKOFF_MAX       tope de la espera (segundos)
+    <PREFIJO>_BLOQUEO_SEGUNDOS  tiempo que una fila reclamada queda oculta a
+                                otros workers; si el worker muere a mitad,
+                                vuelve a estar disponible al vencer. Debe
+                                superar lo que tarda en procesarse un lote.
+
+El modelo debe tener los campos estado, intentos, proximo_intento,
+ultimo_error y updated_at.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('clarte')
+
+
+class Bandeja:
+    """
+    Operaciones comunes de una bandeja.
+
+    Args:
+        modelo: modelo de la bandeja.
+        prefijo: prefijo de sus settings (ej: 'EMAIL').
+        pendiente / fallido: valores de estado del modelo; `fallido` es
+            también el resultado que retorna marcar_error al descartar.
+        describir: función instancia → texto para los logs.
+    """
+
+    def __init__(self, modelo, prefijo, pendiente, fallido, describir=str):
+        self.modelo = modelo
+        self.prefijo = prefijo
+        self.pendiente = pendiente
+        self.fallido = fallido
+        self.describir = describir
+
+    def config(self, nombre):
+        return getattr(settings, f'{self.prefijo}_{nombre}')
+
+    def reclamar(self, lote, ids=None):
+        """
+        Reclama hasta `lote` filas vencidas (las más antiguas primero), o solo
+        las de `ids` si se indica: las oculta <PREFIJO>_BLOQUEO_SEGUNDOS a otros
+        workers y cuenta el intento. Retorna las instancias reclamadas.
+        """
+        ahora = timezone.now()
+        pendientes = self.modelo.objects.filter(estado=self.pendiente, proximo_intento__lte=ahora)
+        if ids is not None:
+            pendientes = pendientes.filter(id__in=ids)
+        with transaction.atomic():
+            filas = list(
+                pendientes
+                .select_for_update(skip_locked=True)
+                .order_by('proximo_intento', 'id')[:lote]
+            )
+            if filas:
+                self.modelo.objects.filter(
+                    id__in=[f.id for f in filas],
+                ).update(
+                    intentos=F('intentos') + 1,
+                    proximo_intento=ahora + timedelta(seconds=self.config('BLOQUEO_SEGUNDOS')),
+                )
+        for fila in filas:
+            fila.intentos += 1
+        return filas
+
+    def calcular_backoff(self, intentos):
+        """Segundos de espera tras el intento N: base * 2^(N-1), con tope."""
+        return min(
+            self.config('BACKOFF_BASE') * 2 ** max(intentos - 1, 0),
+            self.config('BACKOFF_MAX'),
+        )
+
+    def marcar_error(self, fila, error):
+        """Programa el reintento o descarta la fila. Retorna 'reintento' o `fallido`."""
+        ahora = timezone.now()
+        if fila.intentos >= self.config('MAX_INTENTOS'):
+            self.modelo.objects.filter(id=fila.id).update(
+                estado=self.fallido,
+                ultimo_error=str(error),
+                updated_at=ahora,
+            )
+            logger.error(
+                '%s descartado tras %s intentos: %s',
+                self.describir(fila), fila.intentos, error,
+            )
+            return str(self.fallido)
+
+        espera = self.calcular_backoff(fila.intentos)
+        self.modelo.objects.filter(id=fila.id).update(
+            proximo_intento=ahora + timedelta(seconds=espera),
+            ultimo_error=str(error),
+            updated_at=ahora,
+        )
+        logger.warning(
+            '%s falló (intento %s), reintento en %ss: %s',
+            self.describir(fila), fila.intentos, espera, error,
+        )
+        return 'reintento'
+
+
+class ComandoBandeja(BaseCommand):
+    """
+    Management command base que consume una bandeja. Las subclases definen:
+      - procesar: ruta de la función procesar_pendientes(lote) → {resultado: n}.
+      - nombre: nombre de la bandeja para los mensajes (ej: 'Emails').
+      - etiquetas: lista de (resultado, etiqueta) del reporte.
+      - lote / intervalo: valores por defecto de --lote e --intervalo.
+    """
+    procesar = None
+    nombre = ''
+    etiquetas = []
+    lote = 50
+    intervalo = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=self.lote,
+            help=f'Filas a reclamar por iteración (default: {self.lote}).',
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            default=False,
+            help='Sigue consumiendo la bandeja hasta recibir Ctrl+C.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=self.intervalo,
+            help=f'Segundos de espera cuando la bandeja está vacía (default: {self.intervalo}).',
+        )
+
+    def handle(self, *args, **options):
+        # Import here to avoid AppRegistryNotReady at module level
+        from utils.metricas import volcar, volcar_si_toca
+
+        procesar_pendientes = import_string(self.procesar)
+        lote = options['lote']
+
+        if not options['continuo']:
+            conteo = procesar_pendientes(lote)
+            self._reportar(conteo)
+            volcar()  # publica las métricas antes de terminar
+            return
+
+        self.stdout.write(f'Worker de {self.nombre.lower()} iniciado (lote={lote}).')
+        try:
+            while True:
+                conteo = procesar_pendientes(lote)
+                total = sum(conteo.values())
+                if total:
+                    self._reportar(conteo)
+                volcar_si_toca()
+                # Con el lote lleno probablemente hay más trabajo: no esperar
+                if total < lote:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS(f'Worker de {self.nombre.lower()} detenido.'))
+
+    def _reportar(self, conteo):
+        detalle = ', '.join(f'{etiqueta}: {conteo[resultado]}' for resultado, etiqueta in self.etiquetas)
+        self.stdout.write(self.style.SUCCESS(f'{self.nombre} — {detalle}'))
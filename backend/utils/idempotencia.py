@@ -0,0 +1,152 @@
+"""
+Idempotency-Key para POST que crean recursos o cobran (pedidos, pagos).
+
+Con el decorador @idempotente('<ámbito>') sobre el método de la vista:
+  - Sin header Idempotency-Key, la vista se ejecuta normalmente.
+  - La primera petición con una clave registra la clave "en proceso",
+    ejecuta la vista y guarda su respuesta (status y cuerpo).
+  - Los reintentos con la misma clave reciben la respuesta guardada con una
+    sola consulta indexada, sin volver a ejecutar la vista (header
+    Idempotent-Replayed: true).
+  - Misma clave con otro cuerpo → 422. Misma clave mientras la primera
+    petición sigue en proceso → 409.
+  - Las respuestas 5xx y las excepciones no se guardan: la clave se libera
+    para que el reintento vuelva a ejecutar la vista.
+
+Las claves se separan por ámbito y por usuario (los invitados comparten el
+propietario "anonimo"; la clave es un UUID generado por el cliente) y se
+eliminan al vencer IDEMPOTENCIA_TTL_HORAS (limpiar_claves_expiradas).
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.common.models import ClaveIdempotencia
+
+logger = logging.getLogger('clarte')
+
+HEADER = 'Idempotency-Key'
+LONGITUD_MAXIMA = 255
+
+
+def _error(mensaje, codigo):
+    return Response(
+        {
+            'success': False,
+            'message': mensaje,
+            'data': None,
+            'errors': {'idempotency_key': mensaje},
+        },
+        status=codigo,
+    )
+
+
+def _huella(data):
+    """SHA-256 del cuerpo ya parseado (independiente del orden de las claves)."""
+    contenido = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _propietario(request):
+    return f'usuario:{request.user.pk}' if request.user.is_authenticated else 'anonimo'
+
+
+def _reclamar(ambito, propietario, clave, huella):
+    """
+    Retorna (registro, creado). Un registro vencido o abandonado en proceso
+    se descarta y la clave se vuelve a reclamar.
+    """
+    ahora = timezone.now()
+    registro, creado = ClaveIdempotencia.objects.get_or_create(
+        ambito=ambito,
+        propietario=propietario,
+        clave=clave,
+        defaults={
+            'huella': huella,
+            'expires_at': ahora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+        },
+    )
+    if creado:
+        return registro, True
+
+    abandonado = (
+        registro.estado == ClaveIdempotencia.EstadoChoices.EN_PROCESO
+        and registro.created_at < ahora - timedelta(seconds=settings.IDEMPOTENCIA_BLOQUEO_SEGUNDOS)
+    )
+    if registro.expires_at <= ahora or abandonado:
+        ClaveIdempotencia.objects.filter(pk=registro.pk, estado=registro.estado).delete()
+        return _reclamar(ambito, propietario, clave, huella)
+    return registro, False
+
+
+def idempotente(ambito):
+    """Decorador para métodos de vistas DRF (post / create). Ver docstring del módulo."""
+
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            clave = request.headers.get(HEADER, '').strip()
+            if not clave:
+                return metodo(self, request, *args, **kwargs)
+            if len(clave) > LONGITUD_MAXIMA:
+                return _error(
+                    f'{HEADER} admite como máximo {LONGITUD_MAXIMA} caracteres.',
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+            huella = _huella(request.data)
+            registro, creado = _reclamar(ambito, _propietario(request), clave, huella)
+
+            if not creado:
+                if registro.huella != huella:
+                    return _error(
+                        f'{HEADER} ya se usó con un cuerpo distinto.',
+                        status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if registro.estado == ClaveIdempotencia.EstadoChoices.EN_PROCESO:
+                    return _error(
+                        f'Hay una petición con este {HEADER} en curso.',
+                        status.HTTP_409_CONFLICT,
+                    )
+                logger.info('Respuesta idempotente reutilizada: %s %s', ambito, clave)
+                return Response(
+                    registro.respuesta,
+                    status=registro.status_code,
+                    headers={'Idempotent-Replayed': 'true'},
+                )
+
+            try:
+                response = metodo(self, request, *args, **kwargs)
+            except Exception:
+                ClaveIdempotencia.objects.filter(pk=registro.pk).delete()
+                raise
+
+            if response.status_code >= 500:
+                ClaveIdempotencia.objects.filter(pk=registro.pk).delete()
+            else:
+                ClaveIdempotencia.objects.filter(pk=registro.pk).update(
+                    estado=ClaveIdempotencia.EstadoChoices.COMPLETADA,
+                    status_code=response.status_code,
+                    respuesta=response.data,
+                )
+            return response
+
+        return envoltura
+
+    return decorador
+
+
+def limpiar_claves_expiradas():
+    """Elimina las claves vencidas (índice sobre expires_at). Retorna cuántas."""
+    eliminadas, _ = ClaveIdempotencia.objects.filter(expires_at__lte=timezone.now()).delete()
+    if eliminadas:
+        logger.info('Claves de idempotencia vencidas eliminadas: %d', eliminadas)
+    return eliminadas
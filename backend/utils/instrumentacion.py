@@ -0,0 +1,186 @@
+"""
+Instrumentación por request: consultas y tiempo de BD, tiempo de
+serialización y tiempo de llamadas externas (Mercado Pago, Brevo, Google).
+
+InstrumentacionMiddleware abre un registro por request (ContextVar):
+  - BD: connection.execute_wrapper cuenta cada consulta y su duración.
+  - Serialización: tiempo de render de la respuesta (JSONRendererInstrumentado,
+    renderer por defecto de DRF en settings). El to_representation de los
+    serializers corre dentro de la vista: sus consultas cuentan en BD.
+  - Externos: los clientes envuelven sus llamadas con medir_externo('mp'),
+    medir_externo('brevo') o medir_externo('google').
+
+Al terminar la request:
+  - Los usuarios staff reciben el header Server-Timing (visible en las
+    devtools del navegador).
+  - Una fracción INSTRUMENTACION_MUESTREO de las requests, y todas las que
+    superan INSTRUMENTACION_LENTO_MS, se registran como una línea JSON en
+    el logger `clarte`.
+  - La duración y el código de estado se acumulan en las métricas de
+    /metrics (ver utils/metricas.py).
+
+Fuera de una request (comandos, workers) medir_externo no registra nada.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+
+# Módulo, no nombres: utils.metricas importa las vistas de DRF, que cargan el
+# renderer de este módulo desde DEFAULT_RENDERER_CLASSES
+from utils import metricas
+
+logger = logging.getLogger('clarte')
+
+# Nombre en Server-Timing → descripción
+EXTERNOS = {
+    'mp': 'Mercado Pago',
+    'brevo': 'Brevo',
+    'google': 'Google',
+}
+
+_registro = ContextVar('instrumentacion_registro', default=None)
+
+
+class Registro:
+    """Acumuladores de una request."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.externos = {}  # {nombre: {'llamadas': n, 'ms': float}}
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def agregar_externo(self, nombre, duracion_ms):
+        externo = self.externos.setdefault(nombre, {'llamadas': 0, 'ms': 0.0})
+        externo['llamadas'] += 1
+        externo['ms'] += duracion_ms
+
+
+def registro_actual():
+    """Registro de la request en curso (None fuera de una request)."""
+    return _registro.get()
+
+
+@contextmanager
+def medir_externo(nombre):
+    """Acumula la duración del bloque como llamada externa `nombre`."""
+    registro = _registro.get()
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.agregar_externo(nombre, (time.perf_counter() - inicio) * 1000)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper: cuenta la consulta y su duración en el registro activo."""
+    registro = _registro.get()
+    if registro is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        registro.consultas += 1
+        registro.db_ms += (time.perf_counter() - inicio) * 1000
+
+
+class JSONRendererInstrumentado(JSONRenderer):
+    """JSONRenderer que acumula su duración como tiempo de serialización."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        registro = _registro.get()
+        if registro is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        inicio = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            registro.serializer_ms += (time.perf_counter() - inicio) * 1000
+
+
+def server_timing(registro, total_ms):
+    """Valor del header Server-Timing para un registro (solo ASCII)."""
+    partes = [
+        f'db;dur={registro.db_ms:.1f};desc="BD ({registro.consultas} consultas)"',
+        f'ser;dur={registro.serializer_ms:.1f};desc="Render"',
+    ]
+    for nombre, externo in registro.externos.items():
+        descripcion = EXTERNOS.get(nombre, nombre)
+        partes.append(
+            f'{nombre};dur={externo["ms"]:.1f};desc="{descripcion} ({externo["llamadas"]} llamadas)"'
+        )
+    partes.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(partes)
+
+
+def _es_staff(request):
+    # DRF copia el usuario autenticado (JWT) a la HttpRequest original
+    usuario = getattr(request, 'user', None)
+    return bool(usuario is not None and usuario.is_authenticated and usuario.is_staff)
+
+
+class InstrumentacionMiddleware:
+    """Mide cada request y expone el resultado (ver docstring del módulo)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registro = Registro()
+        token = _registro.set(registro)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _registro.reset(token)
+
+        total_ms = registro.total_ms()
+        if _es_staff(request):
+            response['Server-Timing'] = server_timing(registro, total_ms)
+        self._registrar(request, response, registro, total_ms)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name or match.route) if match else 'sin_ruta'
+        metricas.REQUESTS_DURACION.observar(total_ms / 1000, url_name=url_name, method=request.method)
+        metricas.RESPUESTAS.inc(url_name=url_name, status=response.status_code)
+        return response
+
+    def _registrar(self, request, response, registro, total_ms):
+        lenta = total_ms >= settings.INSTRUMENTACION_LENTO_MS
+        if not lenta and random.random() >= settings.INSTRUMENTACION_MUESTREO:
+            return
+        match = getattr(request, 'resolver_match', None)
+        linea = {
+            'metodo': request.method,
+            # La ruta sin ids (p. ej. "api/v1/productos/<slug:slug>/") agrupa por vista
+            'ruta': f'/{match.route}' if match else request.path,
+            'vista': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_consultas': registro.consultas,
+            'db_ms': round(registro.db_ms, 1),
+            'serializer_ms': round(registro.serializer_ms, 1),
+            'externos': {
+                nombre: {'llamadas': e['llamadas'], 'ms': round(e['ms'], 1)}
+                for nombre, e in registro.externos.items()
+            },
+        }
+        nivel = logging.WARNING if lenta else logging.INFO
+        logger.log(nivel, 'request %s', json.dumps(linea, ensure_ascii=False))
@@ -0,0 +1,326 @@
+"""
+Métricas en formato de texto de Prometheus (GET /metrics: admin, o el
+scraper con `Authorization: Bearer <METRICAS_TOKEN>`).
+
+Cada proceso (workers de gunicorn, procesar_webhooks, enviar_emails)
+acumula sus contadores e histogramas en memoria —registrar es un lock y
+una suma, sin E/S— y cada METRICAS_INTERVALO_VOLCADO segundos publica su
+snapshot completo en la caché compartida (Redis en producción) bajo una
+clave propia. /metrics suma los snapshots de todos los procesos, por lo
+que el resultado no depende del worker que atienda el scrape.
+
+Cada proceso publica bajo el slot "<host>:<pid>" y se anota en el registro
+de procesos vivos (CLAVE_PROCESOS: {slot: último registro}); /metrics solo
+lee los slots del registro. Los snapshots y las entradas del registro
+expiran tras METRICAS_TTL segundos sin actualizarse (procesos que ya no
+existen) y se podan del registro; Prometheus interpreta la baja como un
+reinicio del contador.
+"""
+import bisect
+import hmac
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework import permissions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+CLAVE_PROCESOS = 'metricas:procesos'
+
+# Segundos
+BUCKETS_HTTP = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_EXTERNOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_metricas = {}      # {nombre: Contador | Histograma}
+_valores = {}       # {(nombre, etiquetas): float | [buckets..., suma]}
+_pid = None
+_slot = None
+_ultimo_volcado = 0.0
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        _metricas[nombre] = self
+
+    def _clave(self, etiquetas):
+        return (self.nombre, tuple(str(etiquetas[e]) for e in self.etiquetas))
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            _reiniciar_si_fork()
+            _valores[clave] = _valores.get(clave, 0) + valor
+        volcar_si_toca()
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_HTTP):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        # Conteo por bucket (no acumulado) + suma; el acumulado se arma al exportar
+        indice = bisect.bisect_left(self.buckets, valor)
+        with _lock:
+            _reiniciar_si_fork()
+            serie = _valores.get(clave)
+            if serie is None:
+                serie = _valores[clave] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[indice] += 1
+            serie[-1] += valor
+        volcar_si_toca()
+
+
+class Indicador(_Metrica):
+    """
+    Valor instantáneo calculado en cada scrape por la función `ruta` (no se
+    acumula entre procesos): para estados que viven en la BD.
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, ruta):
+        super().__init__(nombre, ayuda)
+        self.ruta = ruta
+
+    def valor(self):
+        return import_string(self.ruta)()
+
+
+# ──────────────────────────────────────────────
+# Métricas de la aplicación
+# ──────────────────────────────────────────────
+
+REQUESTS_DURACION = Histograma(
+    'clarte_http_request_duration_seconds',
+    'Duración de las requests HTTP por nombre de URL.',
+    ('url_name', 'method'),
+)
+RESPUESTAS = Contador(
+    'clarte_http_responses_total',
+    'Respuestas HTTP por nombre de URL y código de estado.',
+    ('url_name', 'status'),
+)
+WEBHOOKS = Contador(
+    'clarte_webhooks_total',
+    'Notificaciones de Mercado Pago procesadas por resultado (updated, ignored, error).',
+    ('resultado',),
+)
+PAGOS = Contador(
+    'clarte_pagos_total',
+    'Cambios de estado de pagos por estado y origen (card, webhook).',
+    ('estado', 'origen'),
+)
+STOCK_RECHAZOS = Contador(
+    'clarte_stock_rechazos_total',
+    'Operaciones de stock rechazadas por falta de stock (reserva, decremento).',
+    ('operacion',),
+)
+EVENTOS = Contador(
+    'clarte_eventos_total',
+    'Eventos de dominio despachados por tipo y resultado (procesado, reintento, fallido).',
+    ('tipo', 'resultado'),
+)
+PAGOS_SIN_PROCESAR = Indicador(
+    'clarte_pagos_aprobados_sin_procesar',
+    'Pagos aprobados cuyo pedido sigue pendiente (post-pago fallido o en curso).',
+    'apps.pagos.servicios.post_pago_service.contar_pagos_sin_procesar',
+)
+EMAIL_ENVIO = Histograma(
+    'clarte_email_envio_seconds',
+    'Duración de las llamadas de envío de email por tipo (individual, lote) y resultado.',
+    ('tipo', 'resultado'),
+    buckets=BUCKETS_EXTERNOS,
+)
+MERCADOPAGO_LLAMADAS = Histograma(
+    'clarte_mercadopago_request_seconds',
+    'Duración de las llamadas a Mercado Pago por operación y resultado (ok, error).',
+    ('operacion', 'resultado'),
+    buckets=BUCKETS_EXTERNOS,
+)
+
+
+# ──────────────────────────────────────────────
+# Publicación entre procesos
+# ──────────────────────────────────────────────
+
+def _reiniciar_si_fork():
+    """
+    Un proceso hijo (fork) no debe volver a publicar lo que acumuló el
+    padre ni compartir su clave. Se llama con _lock tomado.
+    """
+    global _pid, _slot
+    pid = os.getpid()
+    if _pid != pid:
+        if _pid is not None:
+            _valores.clear()
+        _pid = pid
+        _slot = None
+
+
+def _clave_proceso(slot):
+    return f'metricas:proceso:{slot}'
+
+
+def _registrar_proceso(slot):
+    """
+    Anota `slot` en el registro de procesos vivos y poda los vencidos. Solo
+    escribe si falta o si su registro tiene más de METRICAS_TTL / 2: una
+    escritura concurrente puede perder la entrada, que se repone en el
+    siguiente volcado.
+    """
+    ahora = time.time()
+    procesos = cache.get(CLAVE_PROCESOS) or {}
+    if procesos.get(slot, 0) >= ahora - settings.METRICAS_TTL / 2:
+        return
+    procesos = {s: t for s, t in procesos.items() if t >= ahora - settings.METRICAS_TTL}
+    procesos[slot] = ahora
+    cache.set(CLAVE_PROCESOS, procesos, timeout=None)
+
+
+def volcar():
+    """Publica el snapshot de este proceso en la caché compartida."""
+    global _slot, _ultimo_volcado
+    with _lock:
+        _reiniciar_si_fork()
+        snapshot = {clave: list(v) if isinstance(v, list) else v for clave, v in _valores.items()}
+        _ultimo_volcado = time.monotonic()
+        if _slot is None:
+            _slot = f'{socket.gethostname()}:{_pid}'
+        slot = _slot
+    cache.set(_clave_proceso(slot), snapshot, timeout=settings.METRICAS_TTL)
+    _registrar_proceso(slot)
+
+
+def volcar_si_toca():
+    """Publica el snapshot si pasó METRICAS_INTERVALO_VOLCADO desde el último."""
+    if time.monotonic() - _ultimo_volcado >= settings.METRICAS_INTERVALO_VOLCADO:
+        volcar()
+
+
+def recolectar():
+    """Suma los snapshots de todos los procesos: {(nombre, etiquetas): valor}."""
+    volcar()
+    vigentes = time.time() - settings.METRICAS_TTL
+    procesos = cache.get(CLAVE_PROCESOS) or {}
+    snapshots = cache.get_many([_clave_proceso(slot) for slot, t in procesos.items() if t >= vigentes])
+    total = {}
+    for snapshot in snapshots.values():
+        for clave, valor in snapshot.items():
+            if isinstance(valor, list):
+                acumulado = total.setdefault(clave, [0] * len(valor))
+                for i, v in enumerate(valor):
+                    acumulado[i] += v
+            else:
+                total[clave] = total.get(clave, 0) + valor
+    return total
+
+
+# ──────────────────────────────────────────────
+# Exposición
+# ──────────────────────────────────────────────
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = [*zip(nombres, valores), *extra]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{n}="{_escapar(str(v))}"' for n, v in pares) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar(valores):
+    """Formato de texto de Prometheus (versión 0.0.4)."""
+    por_metrica = {}
+    for (nombre, etiquetas), valor in valores.items():
+        por_metrica.setdefault(nombre, []).append((etiquetas, valor))
+
+    lineas = []
+    for nombre, metrica in _metricas.items():
+        lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+        if metrica.tipo == 'gauge':
+            lineas.append(f'{nombre} {_numero(metrica.valor())}')
+            continue
+        for etiquetas, valor in sorted(por_metrica.get(nombre, [])):
+            if metrica.tipo == 'counter':
+                lineas.append(f'{nombre}{_etiquetas(metrica.etiquetas, etiquetas)} {_numero(valor)}')
+                continue
+            acumulado = 0
+            for limite, conteo in zip((*metrica.buckets, '+Inf'), valor[:-1]):
+                acumulado += conteo
+                le = (('le', limite if limite == '+Inf' else _numero(float(limite))),)
+                lineas.append(f'{nombre}_bucket{_etiquetas(metrica.etiquetas, etiquetas, le)} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(metrica.etiquetas, etiquetas)} {_numero(float(valor[-1]))}')
+            lineas.append(f'{nombre}_count{_etiquetas(metrica.etiquetas, etiquetas)} {acumulado}')
+    return '\n'.join(lineas) + '\n'
+
+
+class TokenMetricasAutenticacion(BaseAuthentication):
+    """
+    Autentica al scraper por `Authorization: Bearer <METRICAS_TOKEN>`, sin
+    usuario. Si el token no coincide (o no está configurado) deja pasar la
+    cabecera a la autenticación JWT, que la rechaza con 401.
+    """
+
+    def authenticate(self, request):
+        token = settings.METRICAS_TOKEN
+        partes = get_authorization_header(request).split()
+        if not token or len(partes) != 2 or partes[0].lower() != b'bearer':
+            return None
+        if not hmac.compare_digest(partes[1], token.encode()):
+            return None
+        from django.contrib.auth.models import AnonymousUser
+
+        return AnonymousUser(), self
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="metrics"'
+
+
+class EsScraperMetricas(permissions.BasePermission):
+    """Request autenticada con METRICAS_TOKEN."""
+
+    def has_permission(self, request, view):
+        return isinstance(request.auth, TokenMetricasAutenticacion)
+
+
+class MetricasView(APIView):
+    """
+    GET /metrics
+    Métricas de todos los procesos en formato de texto de Prometheus (admin o
+    scraper con METRICAS_TOKEN).
+    """
+    authentication_classes = [TokenMetricasAutenticacion, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [EsScraperMetricas | permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            exportar(recolectar()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
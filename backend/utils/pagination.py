@@ -1,21 +1,88 @@
 """
 Paginación personalizada para la API de Clarté.
 """
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
+class CursorResultsPagination(CursorPagination):
+    """
+    Paginador por cursor (keyset): no ejecuta COUNT(*) ni OFFSET, por lo que
+    cada página cuesta lo mismo sin importar su profundidad.
+    Respeta el ?ordering de la vista (validado contra sus ordering_fields);
+    si no hay, usa el `ordering` de la vista o el Meta.ordering del modelo.
+    Siempre desempata por -pk para que el orden sea total y ninguna fila se
+    repita ni se salte entre páginas.
+
+    El cursor reemplaza el orden del queryset: la vista declara en
+    `parametros_sin_cursor` los query params cuyo orden propio no puede
+    paginarse así (p. ej. la relevancia de ?q=) y la combinación responde 400.
+    Se puede asignar directamente como `pagination_class` de una vista.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        incompatibles = [
+            param for param in getattr(view, 'parametros_sin_cursor', ())
+            if request.query_params.get(param)
+        ]
+        if incompatibles:
+            raise ValidationError({
+                param: 'No se puede combinar con la paginación por cursor; usa la paginación por página.'
+                for param in incompatibles
+            })
+        self.ordering = tuple(queryset.model._meta.ordering) or ('-pk',)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering += ('-pk',)
+        return ordering
+
+    def get_paginated_response(self, data):
+        return Response({
+            'success': True,
+            'message': 'OK',
+            'data': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            },
+            'errors': None,
+        })
+
+
 class StandardResultsPagination(PageNumberPagination):
     """
     Paginador estándar con 12 elementos por página.
     Permite que el cliente solicite un tamaño diferente vía query param `page_size`.
     Máximo permitido: 100 elementos por página.
+    Con `?paginacion=cursor` (o al seguir un enlace con `?cursor=`) delega en
+    CursorResultsPagination, útil para scroll infinito y exportaciones profundas.
     """
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
+    modo_query_param = 'paginacion'
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            request.query_params.get(self.modo_query_param) == 'cursor'
+            or CursorResultsPagination.cursor_query_param in request.query_params
+        ):
+            self.cursor_paginator = CursorResultsPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
         return Response({
             'success': True,
             'message': 'OK',
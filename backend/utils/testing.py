@@ -0,0 +1,182 @@
+"""
+Utilidades para las pruebas de la API.
+  - sembrar_datos(): generador de datos deterministas (semilla fija).
+  - PresupuestoAPITestCase: TestCase con aserciones de presupuesto por endpoint
+    (número máximo de consultas SQL y, opcionalmente, tiempo de respuesta).
+Los presupuestos se fijan con el volumen sembrado: un patrón N+1 los supera.
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+Usuario = get_user_model()
+
+PASSWORD_PRUEBA = 'Clarte-Prueba-2024!'
+
+
+def sembrar_datos(n_productos=30, n_pedidos=12, items_por_pedido=3, semilla=1234):
+    """
+    Crea un conjunto de datos coherente para las pruebas:
+    usuarios (admin + clientes), categorías, productos, cupón, pedidos pagados
+    con su Pago y Venta, pedidos pendientes, reseñas, favoritos, contactos y
+    suscripciones. Retorna un dict con las instancias principales.
+    """
+    from apps.common.models import Contacto, SuscripcionNewsletter
+    from apps.descuentos.models import Cupon
+    from apps.inventario.models import Categoria, ListaDeseos, Producto, Resena
+    from apps.pagos.models import Pago
+    from apps.pedidos.models import ItemPedido, Pedido
+    from apps.ventas.services import crear_venta_desde_pedido
+
+    rnd = random.Random(semilla)
+
+    admin = Usuario.objects.create_superuser(
+        username='admin', email='admin@ocaso.test', password=PASSWORD_PRUEBA,
+    )
+    clientes = [
+        Usuario.objects.create_user(
+            username=f'cliente{i}', email=f'cliente{i}@ocaso.test', password=PASSWORD_PRUEBA,
+            first_name=f'Cliente {i}',
+        )
+        for i in range(3)
+    ]
+
+    categorias = [
+        Categoria.objects.create(nombre=nombre, orden=i)
+        for i, nombre in enumerate(['Lámparas de techo', 'Lámparas de mesa', 'Lámparas de pie'])
+    ]
+
+    productos = []
+    for i in range(n_productos):
+        precio = Decimal(rnd.randrange(300, 5000))
+        productos.append(Producto.objects.create(
+            nombre=f'Lámpara {i:03d}',
+            descripcion=f'Lámpara de diseño número {i}',
+            precio=precio,
+            precio_oferta=(precio - 100) if i % 4 == 0 else None,
+            sku=f'SKU-{i:04d}',
+            categoria=categorias[i % len(categorias)],
+            stock=rnd.randrange(0, 50) if i % 7 else 0,
+            destacado=i % 5 == 0,
+        ))
+
+    cupon = Cupon.objects.create(codigo='BIENVENIDA', nombre='Bienvenida', valor_descuento=Decimal('10'))
+
+    con_stock = [p for p in productos if p.stock >= 5]
+    pedidos_pagados, pedidos_pendientes = [], []
+    for i in range(n_pedidos):
+        usuario = clientes[i % len(clientes)]
+        pedido = Pedido.objects.create(
+            usuario=usuario,
+            direccion_envio='Calle 1', ciudad='CDMX', estado_envio='CDMX', codigo_postal='01000',
+        )
+        for producto in rnd.sample(con_stock, items_por_pedido):
+            ItemPedido.objects.create(
+                pedido=pedido, producto=producto,
+                cantidad=rnd.randrange(1, 3), precio_unitario=producto.precio_final,
+            )
+        pedido.calcular_totales()
+
+        if i % 3 == 2:
+            pedidos_pendientes.append(pedido)
+            continue
+
+        Pago.objects.create(
+            pedido=pedido, usuario=usuario, monto=pedido.total,
+            estado=Pago.EstadoChoices.APROBADO,
+            mercadopago_payment_id=f'MP-{i}', metodo='visa',
+        )
+        pedido.estado = Pedido.EstadoChoices.PAGADO
+        pedido.save(update_fields=['estado', 'updated_at'])
+        crear_venta_desde_pedido(pedido)
+        pedidos_pagados.append(pedido)
+
+    for i, producto in enumerate(productos[:5]):
+        for cliente in clientes:
+            Resena.objects.create(producto=producto, usuario=cliente, rating=rnd.randrange(1, 6))
+    for cliente in clientes:
+        for producto in productos[:4]:
+            ListaDeseos.objects.create(usuario=cliente, producto=producto)
+
+    for i in range(5):
+        Contacto.objects.create(
+            nombre=f'Contacto {i}', email=f'contacto{i}@ocaso.test', asunto='Consulta', mensaje='Hola',
+        )
+        SuscripcionNewsletter.objects.create(email=f'suscriptor{i}@ocaso.test')
+
+    return {
+        'admin': admin,
+        'clientes': clientes,
+        'categorias': categorias,
+        'productos': productos,
+        'cupon': cupon,
+        'pedidos_pagados': pedidos_pagados,
+        'pedidos_pendientes': pedidos_pendientes,
+    }
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PresupuestoAPITestCase(APITestCase):
+    """
+    TestCase base: siembra datos una vez por clase y ofrece assertPresupuesto().
+    El tiempo de respuesta solo se verifica si la prueba pasa `ms` o si se
+    define PRESUPUESTO_MS en settings: depende de la máquina y haría
+    intermitente la suite en CI; el número de consultas es determinista.
+    El hash de contraseñas usa MD5: el presupuesto mide el código propio,
+    no el costo (deliberado) de PBKDF2.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = sembrar_datos()
+
+    def setUp(self):
+        # Caché del catálogo y contadores de throttling limpios en cada prueba
+        cache.clear()
+
+    def autenticar(self, usuario):
+        """Autentica el cliente con un access token JWT real (como el frontend)."""
+        token = RefreshToken.for_user(usuario).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertPresupuesto(self, metodo, url, consultas, ms=None, status=200, **kwargs):
+        """
+        Ejecuta la petición y verifica status, número de consultas y, si hay
+        presupuesto de tiempo (`ms` o PRESUPUESTO_MS), la duración.
+        Retorna la respuesta.
+        """
+        ms = ms if ms is not None else getattr(settings, 'PRESUPUESTO_MS', None)
+        kwargs.setdefault('format', 'json')
+
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = getattr(self.client, metodo)(url, **kwargs)
+            if response.streaming:
+                # El contenido se genera al consumirlo: medirlo dentro del contexto
+                response.contenido = b''.join(response.streaming_content)
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        self.assertEqual(
+            response.status_code, status,
+            f'{metodo.upper()} {url} → {response.status_code}: {getattr(response, "data", "")}',
+        )
+        self.assertLessEqual(
+            len(capturadas), consultas,
+            f'{metodo.upper()} {url} ejecutó {len(capturadas)} consultas (presupuesto {consultas}):\n'
+            + '\n'.join(q['sql'] for q in capturadas.captured_queries),
+        )
+        if ms is not None:
+            self.assertLessEqual(
+                duracion_ms, ms,
+                f'{metodo.upper()} {url} tardó {duracion_ms:.0f} ms (presupuesto {ms} ms).',
+            )
+        return response
@@ -1,6 +1,6 @@
 import type { Metadata } from "next";
 import { notFound } from "next/navigation";
-import { getProductBySlug } from "@/shared/lib/services/products";
+import { getProductBySlug, getRelatedProducts } from "@/shared/lib/services/products";
 import { ProductDetail } from "@/features/products/components/product-detail";
 import { ProductInformation } from "@/features/products/components/product-information";
 import { ProductDesignSection } from "@/features/products/components/product-design-section";
@@ -16,7 +16,10 @@ export async function generateMetadata({
 }: ProductPageProps): Promise<Metadata> {
   const { slug } = await params;
   try {
-    const product = await getProductBySlug(slug);
+    const [product, related] = await Promise.all([
+      getProductBySlug(slug),
+      getRelatedProducts(slug),
+    ]);
     const description =
       product.descripcion?.slice(0, 155) || "Lámpara artesanal Ocaso";
     return {
@@ -39,7 +42,10 @@ export default async function ProductPage({ params }: ProductPageProps) {
   const { slug } = await params;
 
   try {
-    const product = await getProductBySlug(slug);
+    const [product, related] = await Promise.all([
+      getProductBySlug(slug),
+      getRelatedProducts(slug),
+    ]);
 
     const jsonLd = {
       "@context": "https://schema.org",
@@ -66,8 +72,12 @@ export default async function ProductPage({ params }: ProductPageProps) {
         <ProductDetail product={product} />
         <ProductInformation product={product} />
         <ProductDesignSection product={product} />
-        <RelatedProductsCarousel />
-        <ProductReviews slug={slug} />
+        <RelatedProductsCarousel products={related} />
+        <ProductReviews
+          slug={slug}
+          ratingPromedio={product.rating_promedio}
+          resenasCount={product.resenas_count}
+        />
       </>
     );
   } catch {
@@ -1,5 +1,6 @@
 "use client";
 
+import { useEffect } from "react";
 import Link from "next/link";
 import { toast } from "sonner";
 import {
@@ -34,6 +35,11 @@ export function CartSheet({ open, onOpenChange }: CartSheetProps) {
   const items = useCartStore((s) => s.items);
   const totalPrice = useCartStore((s) => s.totalPrice);
   const clearCart = useCartStore((s) => s.clearCart);
+  const refreshAvailability = useCartStore((s) => s.refreshAvailability);
+
+  useEffect(() => {
+    if (open) refreshAvailability();
+  }, [open, refreshAvailability]);
 
   return (
     <Sheet open={open} onOpenChange={onOpenChange}>
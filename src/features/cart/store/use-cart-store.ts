@@ -3,6 +3,7 @@
 import { create } from "zustand";
 import { persist } from "zustand/middleware";
 import type { Product } from "@/shared/types/api";
+import { getProductsAvailability } from "@/shared/lib/services/products-client";
 
 export interface CartItem {
   product: Product;
@@ -15,6 +16,7 @@ interface CartState {
   removeItem: (productId: number) => void;
   updateQuantity: (productId: number, quantity: number) => void;
   clearCart: () => void;
+  refreshAvailability: () => Promise<void>;
   totalItems: () => number;
   totalPrice: () => number;
 }
@@ -64,6 +66,32 @@ export const useCartStore = create<CartState>()(
 
       clearCart: () => set({ items: [] }),
 
+      // Revalida precio y stock de todas las líneas en una sola petición;
+      // quita los productos que ya no existen o fueron desactivados.
+      refreshAvailability: async () => {
+        const ids = get().items.map((item) => item.product.id);
+        const data = await getProductsAvailability(ids);
+        if (!data) return;
+
+        const fila = new Map(data.id.map((id, i) => [id, i]));
+        set((state) => ({
+          items: state.items.flatMap((item) => {
+            const i = fila.get(item.product.id);
+            if (i === undefined || !data.activo[i]) return [];
+            return [
+              {
+                ...item,
+                product: {
+                  ...item.product,
+                  precio_final: Number(data.precio_final[i]),
+                  en_stock: data.en_stock[i],
+                },
+              },
+            ];
+          }),
+        }));
+      },
+
       totalItems: () =>
         get().items.reduce((sum, item) => sum + item.quantity, 0),
 
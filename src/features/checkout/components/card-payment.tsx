@@ -75,20 +75,25 @@ export function CardPaymentBrick({
           setProcessing(true);
 
           try {
-            const result = await processCardPayment({
-              pedido_id: pedidoId,
-              token: formData.token,
-              payment_method_id: formData.payment_method_id,
-              issuer_id: formData.issuer_id,
-              installments: formData.installments,
-              payer: {
-                email: formData.payer.email || payerEmail,
-                identification: {
-                  type: formData.payer.identification?.type ?? "",
-                  number: formData.payer.identification?.number ?? "",
+            // El token de tarjeta es de un solo uso: como clave de idempotencia,
+            // un reenvío del mismo formulario no genera un segundo cobro
+            const result = await processCardPayment(
+              {
+                pedido_id: pedidoId,
+                token: formData.token,
+                payment_method_id: formData.payment_method_id,
+                issuer_id: formData.issuer_id,
+                installments: formData.installments,
+                payer: {
+                  email: formData.payer.email || payerEmail,
+                  identification: {
+                    type: formData.payer.identification?.type ?? "",
+                    number: formData.payer.identification?.number ?? "",
+                  },
                 },
               },
-            });
+              formData.token,
+            );
 
             if (result.status === "approved") {
               onSuccess();
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState } from "react";
+import { useRef, useState } from "react";
 import Link from "next/link";
 import { Lock } from "lucide-react";
 import { Button } from "@/shared/components/ui/button";
@@ -49,6 +49,8 @@ export function CheckoutForm({
   });
   const [error, setError] = useState("");
   const [loading, setLoading] = useState(false);
+  // Se conserva tras un error de red: el reintento no duplica el pedido
+  const orderKey = useRef<string>(crypto.randomUUID());
 
   // Coupon state
   const [couponInput, setCouponInput] = useState("");
@@ -111,14 +113,18 @@ export function CheckoutForm({
     setLoading(true);
 
     try {
-      const order = await createOrder({
-        ...formData,
-        ...(appliedCoupon ? { codigo_cupon: appliedCoupon } : {}),
-        items: items.map((item) => ({
-          producto_id: item.product.id,
-          cantidad: item.quantity,
-        })),
-      });
+      const order = await createOrder(
+        {
+          ...formData,
+          ...(appliedCoupon ? { codigo_cupon: appliedCoupon } : {}),
+          items: items.map((item) => ({
+            producto_id: item.product.id,
+            cantidad: item.quantity,
+          })),
+        },
+        orderKey.current,
+      );
+      orderKey.current = crypto.randomUUID();
       setOrderId(order.id);
       setOrderTotal(order.total);
       setGuestEmail(formData.guest_email);
@@ -126,6 +132,8 @@ export function CheckoutForm({
       onStepChange(2);
     } catch (err) {
       if (err instanceof ApiError) {
+        // El servidor respondió: el siguiente intento (datos corregidos) usa otra clave
+        orderKey.current = crypto.randomUUID();
         setError(err.data.message || "Error al crear el pedido.");
       } else {
         setError("Error de conexión. Intenta de nuevo.");
@@ -13,6 +13,8 @@ import type { ProductReview } from "@/shared/types/api";
 
 interface ProductReviewsProps {
   slug: string;
+  ratingPromedio: number;
+  resenasCount: number;
 }
 
 function StarDisplay({ rating }: { rating: number }) {
@@ -64,7 +66,11 @@ function StarSelector({
   );
 }
 
-export function ProductReviews({ slug }: ProductReviewsProps) {
+export function ProductReviews({
+  slug,
+  ratingPromedio,
+  resenasCount,
+}: ProductReviewsProps) {
   const { user, isAuthenticated } = useAuth();
   const [rating, setRating] = useState(0);
   const [comentario, setComentario] = useState("");
@@ -75,10 +81,9 @@ export function ProductReviews({ slug }: ProductReviewsProps) {
     () => getProductReviews(slug),
   );
 
-  const average =
-    reviews.length > 0
-      ? reviews.reduce((sum, r) => sum + r.rating, 0) / reviews.length
-      : 0;
+  // Promedio y total vienen agregados en el producto; la lista es solo la
+  // primera página de reseñas.
+  const average = Number(ratingPromedio);
 
   const userFullName = user
     ? [user.first_name, user.last_name].filter(Boolean).join(" ") || user.username
@@ -115,12 +120,12 @@ export function ProductReviews({ slug }: ProductReviewsProps) {
 
       <h2 className="text-2xl font-semibold tracking-tight">Reseñas</h2>
 
-      {reviews.length > 0 && (
+      {resenasCount > 0 && (
         <div className="mt-2 flex items-center gap-3">
           <StarDisplay rating={Math.round(average)} />
           <span className="text-sm text-muted-foreground">
-            {average.toFixed(1)} de 5 — {reviews.length}{" "}
-            {reviews.length === 1 ? "reseña" : "reseñas"}
+            {average.toFixed(1)} de 5 — {resenasCount}{" "}
+            {resenasCount === 1 ? "reseña" : "reseñas"}
           </span>
         </div>
       )}
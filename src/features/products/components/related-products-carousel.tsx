@@ -23,6 +23,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de mesa",
     en_stock: true,
     destacado: false,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
   {
     id: 9002,
@@ -36,6 +38,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de mesa",
     en_stock: true,
     destacado: true,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
   {
     id: 9003,
@@ -49,6 +53,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de techo",
     en_stock: true,
     destacado: false,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
   {
     id: 9004,
@@ -62,6 +68,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de piso",
     en_stock: false,
     destacado: false,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
   {
     id: 9005,
@@ -75,6 +83,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de mesa",
     en_stock: true,
     destacado: true,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
   {
     id: 9006,
@@ -88,6 +98,8 @@ const MOCK_RELATED: Product[] = [
     categoria_nombre: "Lámparas de techo",
     en_stock: true,
     destacado: false,
+    rating_promedio: 0,
+    resenas_count: 0,
   },
 ];
 
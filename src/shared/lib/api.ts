@@ -49,11 +49,13 @@ export class ApiError extends Error {
 interface FetchOptions extends Omit<RequestInit, "body"> {
   body?: unknown;
   auth?: boolean;
+  /** Header Idempotency-Key: los reintentos con la misma clave no duplican el recurso. */
+  idempotencyKey?: string;
 }
 
 export async function apiFetch<T>(
   endpoint: string,
-  { body, auth = false, headers: customHeaders, ...init }: FetchOptions = {},
+  { body, auth = false, idempotencyKey, headers: customHeaders, ...init }: FetchOptions = {},
 ): Promise<T> {
   const url = endpoint.startsWith("http")
     ? endpoint
@@ -64,6 +66,10 @@ export async function apiFetch<T>(
     ...customHeaders as Record<string, string>,
   };
 
+  if (idempotencyKey) {
+    headers["Idempotency-Key"] = idempotencyKey;
+  }
+
   if (auth) {
     const token = getAccessToken();
     if (token) {
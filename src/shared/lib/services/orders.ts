@@ -6,14 +6,15 @@ import type {
   CreateOrderData,
   PaginatedData,
 } from "@/shared/types/api";
-import { apiPost, apiGet } from "@/shared/lib/api";
+import { apiPost, apiGet, apiFetch } from "@/shared/lib/api";
 
-export async function createOrder(data: CreateOrderData) {
-  const res = await apiPost<ApiResponse<Order>>(
-    "/pedidos/crear/",
-    data,
-    true,
-  );
+export async function createOrder(data: CreateOrderData, idempotencyKey?: string) {
+  const res = await apiFetch<ApiResponse<Order>>("/pedidos/crear/", {
+    method: "POST",
+    body: data,
+    auth: true,
+    idempotencyKey,
+  });
   return res.data;
 }
 
@@ -3,13 +3,14 @@ import type {
   PaymentResult,
   CardPaymentData,
 } from "@/shared/types/api";
-import { apiPost } from "@/shared/lib/api";
+import { apiFetch } from "@/shared/lib/api";
 
-export async function processCardPayment(data: CardPaymentData) {
-  const res = await apiPost<ApiResponse<PaymentResult>>(
-    "/pagos/procesar-card/",
-    data,
-    true,
-  );
+export async function processCardPayment(data: CardPaymentData, idempotencyKey?: string) {
+  const res = await apiFetch<ApiResponse<PaymentResult>>("/pagos/procesar-card/", {
+    method: "POST",
+    body: data,
+    auth: true,
+    idempotencyKey,
+  });
   return res.data;
 }
@@ -3,21 +3,41 @@
  */
 import type {
   ApiResponse,
+  CursorPaginatedData,
+  ProductAvailability,
   ProductReview,
   WishlistItem,
 } from "@/shared/types/api";
 import { apiGet, apiPost, apiFetch } from "@/shared/lib/api";
 
+// ──────────────────────────────────────────────
+// Disponibilidad (hidratación del carrito)
+// ──────────────────────────────────────────────
+
+export async function getProductsAvailability(
+  ids: number[],
+): Promise<ProductAvailability | null> {
+  if (ids.length === 0) return null;
+  try {
+    const res = await apiGet<ApiResponse<ProductAvailability>>(
+      `/productos/disponibilidad/?ids=${ids.join(",")}`,
+    );
+    return res.data;
+  } catch {
+    return null;
+  }
+}
+
 // ──────────────────────────────────────────────
 // Reseñas
 // ──────────────────────────────────────────────
 
 export async function getProductReviews(slug: string): Promise<ProductReview[]> {
   try {
-    const res = await apiGet<ApiResponse<ProductReview[]>>(
+    const res = await apiGet<ApiResponse<CursorPaginatedData<ProductReview>>>(
       `/productos/${slug}/resenas/`,
     );
-    return res.data;
+    return res.data.results;
   } catch {
     return [];
   }
@@ -4,6 +4,7 @@ import type {
   PaginatedData,
   Product,
   ProductDetail,
+  ProductFacets,
   Category,
 } from "@/shared/types/api";
 import { API_BASE_URL } from "@/shared/lib/api";
@@ -52,6 +53,26 @@ export async function getProducts(
   }
 }
 
+export async function getProductFacets(
+  params?: Record<string, string>,
+): Promise<ProductFacets | null> {
+  "use cache";
+  cacheLife("catalog");
+  cacheTag("products");
+
+  try {
+    const query = params
+      ? "?" + new URLSearchParams(params).toString()
+      : "";
+    const res = await serverFetch<ApiResponse<ProductFacets>>(
+      `/productos/facetas/${query}`,
+    );
+    return res.data;
+  } catch {
+    return null;
+  }
+}
+
 export async function getProductBySlug(slug: string) {
   "use cache";
   cacheLife("product");
@@ -78,19 +99,16 @@ export async function getFeaturedProducts(): Promise<Product[]> {
   }
 }
 
-export async function getRelatedProducts(
-  categorySlug: string,
-  excludeId: number,
-): Promise<Product[]> {
+export async function getRelatedProducts(slug: string): Promise<Product[]> {
   "use cache";
   cacheLife("catalog");
-  cacheTag("products");
+  cacheTag("products", `product-${slug}`);
 
   try {
-    const data = await getProducts({ categoria: categorySlug });
-    return data.results
-      .filter((p) => p.id !== excludeId)
-      .slice(0, 8);
+    const res = await serverFetch<ApiResponse<Product[]>>(
+      `/productos/${slug}/relacionados/`,
+    );
+    return res.data;
   } catch {
     return [];
   }
@@ -18,6 +18,12 @@ export interface PaginatedData<T> {
   results: T[];
 }
 
+export interface CursorPaginatedData<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 // ──────────────────────────────────────────────
 // Producto (alineado con ProductoListSerializer / ProductoDetailSerializer)
 // ──────────────────────────────────────────────
@@ -34,6 +40,8 @@ export interface Product {
   categoria_nombre: string;
   en_stock: boolean;
   destacado: boolean;
+  rating_promedio: number;
+  resenas_count: number;
 }
 
 interface ProductDimensions {
@@ -52,6 +60,7 @@ export interface ProductDetail extends Product {
   dimensiones: ProductDimensions;
   detalles_tecnicos: Record<string, string>;
   materiales: string[];
+  rating_histograma: Record<string, number>;
   created_at: string;
   updated_at: string;
 }
@@ -70,6 +79,30 @@ export interface Category {
   productos_count: number;
 }
 
+// ──────────────────────────────────────────────
+// Facetas del catálogo (alineado con inventario/facetas.py)
+// ──────────────────────────────────────────────
+
+export interface ProductFacets {
+  total: number;
+  categorias: { id: number; nombre: string; slug: string; count: number }[];
+  precios: { min: number | null; max: number | null; count: number }[];
+  disponibilidad: { en_stock: number; agotado: number };
+}
+
+/** Respuesta columnar de /productos/disponibilidad/ (listas alineadas por posición). */
+export interface ProductAvailability {
+  id: number[];
+  sku: string[];
+  precio_final: string[];
+  stock: number[];
+  /** stock menos las reservas vigentes de pedidos pendientes */
+  disponible: number[];
+  en_stock: boolean[];
+  activo: boolean[];
+  no_encontrados: { ids: number[]; skus: string[] };
+}
+
 // ──────────────────────────────────────────────
 // Auth (alineado con JWT + UsuarioSerializer)
 // ──────────────────────────────────────────────